@@ -26,11 +26,20 @@ scheduled_tasks: list[asyncio.Task] = []
 
 def taproot_assets_start():
     """Start any scheduled tasks."""
-    # Add your scheduled tasks here if needed
-    # For example:
-    # from lnbits.tasks import create_permanent_unique_task
-    # task = create_permanent_unique_task("taproot_assets_task", some_periodic_function)
-    # scheduled_tasks.append(task)
+    from lnbits.tasks import create_permanent_unique_task, create_unique_task
+    from .services.invoice_expiry_service import InvoiceExpiryService
+    from .services.balance_verification_service import BalanceVerificationService
+    from .services.payment_metadata_store import PaymentMetadataStore
+
+    task = create_permanent_unique_task("ext_taproot_assets_invoice_expiry", InvoiceExpiryService.run_reaper)
+    scheduled_tasks.append(task)
+    task = create_permanent_unique_task("ext_taproot_assets_balance_verifier", BalanceVerificationService.run_verifier)
+    scheduled_tasks.append(task)
+    task = create_permanent_unique_task("ext_taproot_assets_metadata_purge", PaymentMetadataStore.run_purger)
+    scheduled_tasks.append(task)
+    scheduled_tasks.append(
+        create_unique_task("ext_taproot_assets_resume_monitoring", InvoiceExpiryService.resume_monitoring())
+    )
     logger.info("Taproot Assets extension started")
 
 def taproot_assets_stop():
@@ -0,0 +1,88 @@
+"""
+Benchmark of per-row cost for a 10k-invoice listing.
+
+Compares building a full TaprootInvoice per row (SELECT * with extra
+decoded and the model validated) against the InvoiceSummary wrapper used
+by the listing endpoint, both when only plain columns are read and when
+each row is serialised with to_dict().
+
+Needs pydantic; run from the extension directory:
+
+    python benchmarks/invoice_rows.py [rows]
+"""
+import importlib.util
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# models.py only needs pydantic, so it is loaded on its own without LNbits
+_spec = importlib.util.spec_from_file_location("taproot_assets_models", ROOT / "models.py")
+models = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(models)
+
+
+def make_rows(count: int):
+    """Rows as SQLite returns them: epoch timestamps and extra as JSON text."""
+    now = int(time.time())
+    return [
+        {
+            "id": f"inv{i:08d}",
+            "payment_hash": f"{i:064x}",
+            "payment_request": "lnbcrt" + "x" * 300,
+            "asset_id": "ab" * 32,
+            "asset_amount": 1000 + i,
+            "satoshi_amount": 1,
+            "description": f"invoice {i}",
+            "status": "pending" if i % 3 else "paid",
+            "user_id": "user0001",
+            "wallet_id": "wallet0001",
+            "created_at": now - i,
+            "expires_at": now - i + 3600,
+            "paid_at": None if i % 3 else now - i + 60,
+            "extra": json.dumps({"rfq_id": f"rfq{i}", "peer": "02" + "cd" * 32}),
+        }
+        for i in range(count)
+    ]
+
+
+def full_model(rows):
+    return [
+        models.TaprootInvoice(**{**row, "extra": models.decode_invoice_extra(row["extra"])})
+        for row in rows
+    ]
+
+
+def summary_columns(rows):
+    return [
+        (summary.id, summary.status, summary.asset_amount)
+        for summary in map(models.InvoiceSummary, rows)
+    ]
+
+
+def summary_to_dict(rows):
+    return [models.InvoiceSummary(row).to_dict() for row in rows]
+
+
+def bench(name: str, func, rows, repeat: int = 5) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(rows)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<28} {best * 1e3:9.2f} ms  {best / len(rows) * 1e6:7.2f} us/row")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rows = make_rows(count)
+    print(f"{count} invoice rows, best of 5")
+    bench("TaprootInvoice per row", full_model, rows)
+    bench("InvoiceSummary columns", summary_columns, rows)
+    bench("InvoiceSummary.to_dict()", summary_to_dict, rows)
+
+
+if __name__ == "__main__":
+    main()
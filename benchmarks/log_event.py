@@ -0,0 +1,104 @@
+"""
+Benchmark of log_event against eager f-string logging.
+
+Logs a payment event carrying a response-sized dict, once with the level
+disabled for the component and once with it enabled, comparing:
+
+- logger.debug/info with an f-string, formatted on every call
+- log_debug/log_info with an f-string, formatted before the level check
+- log_event, formatted only when the message is emitted
+
+Messages that are emitted go to a sink that discards them, so the timings
+cover formatting and loguru's dispatch but not I/O.
+
+Needs loguru; run from the extension directory:
+
+    python benchmarks/log_event.py [calls]
+"""
+import importlib
+import sys
+import time
+import types
+from pathlib import Path
+
+from loguru import logger
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Register the extension as a bare package so logging_utils and its
+# relative imports load without running __init__.py, which needs LNbits
+_package = types.ModuleType("taproot_assets")
+_package.__path__ = [str(ROOT)]
+sys.modules["taproot_assets"] = _package
+# Drop the settings messages logged on import
+logger.remove()
+logging_utils = importlib.import_module("taproot_assets.logging_utils")
+
+PAYMENT = logging_utils.PAYMENT
+
+RESPONSE = {
+    "payment_hash": "ab" * 32,
+    "status": "SUCCEEDED",
+    "fee_sat": 3,
+    "htlcs": [{"route": {"hops": [{"chan_id": 1000 + i, "amt_to_forward_msat": 1000}]}} for i in range(20)],
+}
+
+
+def eager_logger(level: str):
+    log = getattr(logger, level)
+
+    def run(count: int) -> None:
+        for i in range(count):
+            log(f"[{PAYMENT}] Payment update {i}: hash={RESPONSE['payment_hash']} response={RESPONSE}")
+    return run
+
+
+def eager_helper(level: str):
+    log = getattr(logging_utils, f"log_{level}")
+
+    def run(count: int) -> None:
+        for i in range(count):
+            log(PAYMENT, f"Payment update {i}: hash={RESPONSE['payment_hash']} response={RESPONSE}")
+    return run
+
+
+def lazy_event(level: str):
+    def run(count: int) -> None:
+        for i in range(count):
+            logging_utils.log_event(
+                PAYMENT, level, "Payment update",
+                seq=i, hash=RESPONSE["payment_hash"], response=RESPONSE
+            )
+    return run
+
+
+def bench(name: str, func, count: int, repeat: int = 5) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(count)
+        best = min(best, time.perf_counter() - start)
+    print(f"  {name:<30} {best * 1e3:9.2f} ms  {best / count * 1e6:7.2f} us/call")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    logger.add(lambda message: None, level="INFO")
+    # With PAYMENT at info, debug messages are dropped by the level check;
+    # the plain loguru call still formats its f-string first
+    logging_utils.configure_log_levels(f"{PAYMENT}=info")
+    print(f"{count} calls, best of 5")
+
+    print("debug, level disabled:")
+    bench("logger.debug(f-string)", eager_logger("debug"), count)
+    bench("log_debug(f-string)", eager_helper("debug"), count)
+    bench("log_event(debug)", lazy_event("debug"), count)
+
+    print("info, level enabled:")
+    bench("logger.info(f-string)", eager_logger("info"), count)
+    bench("log_info(f-string)", eager_helper("info"), count)
+    bench("log_event(info)", lazy_event("info"), count)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,16 @@
 Re-exports for CRUD operations in the Taproot Assets extension.
 """
 from .invoices import (
-    create_invoice, get_invoice, get_invoice_by_payment_hash,
+    create_invoice, get_invoice, get_invoice_by_payment_hash, get_invoices_by_payment_hashes,
     update_invoice_status, get_user_invoices, validate_invoice_for_settlement,
-    update_invoice_for_settlement
+    update_invoice_for_settlement, expire_pending_invoices,
+    get_user_invoice_summaries, get_invoice_status, get_invoice_owner, get_pending_invoice_owners,
+    transition_invoice_status
 )
+from .invoice_cache import InvoiceCache
+from .change_counters import ChangeCounters
 from .payments import (
-    create_payment_record, get_user_payments
+    create_payment_record, create_payment_records, get_user_payments
 )
 from .invoices import (
     is_internal_payment, is_self_payment
@@ -9,8 +9,12 @@ from lnbits.helpers import urlsafe_short_hash
 from ..models import TaprootAsset
 from ..db import db, get_table_name
 from ..db_utils import with_transaction
-from .utils import get_record_by_id, get_records_by_field
+from ..tracing import traced
+from .utils import get_records_by_field
 
+ASSETS_TABLE = get_table_name("assets")
+
+@traced
 @with_transaction
 async def create_asset(asset_data: Dict[str, Any], user_id: str, conn=None) -> TaprootAsset:
     """
@@ -47,11 +51,12 @@ async def create_asset(asset_data: Dict[str, Any], user_id: str, conn=None) -> T
     asset = TaprootAsset(**asset_dict)
     
     # Insert using standard pattern
-    await conn.insert(get_table_name("assets"), asset)
+    await conn.insert(ASSETS_TABLE, asset)
     
     return asset
 
 
+@traced
 async def get_assets(user_id: str, conn=None) -> List[TaprootAsset]:
     """
     Get all Taproot Assets for a user.
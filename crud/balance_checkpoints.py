@@ -0,0 +1,158 @@
+"""
+Balance checkpoint CRUD operations for Taproot Assets extension.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from lnbits.helpers import urlsafe_short_hash
+
+from ..models import AssetBalance, BalanceCheckpoint, parse_datetime
+from ..db import db, get_table_name
+from ..tracing import traced
+
+CHECKPOINTS_TABLE = get_table_name("balance_checkpoints")
+TRANSACTIONS_TABLE = get_table_name("asset_transactions")
+BALANCES_TABLE = get_table_name("asset_balances")
+
+
+@traced
+async def get_latest_checkpoint(
+    wallet_id: str,
+    asset_id: str,
+    as_of: Optional[datetime] = None,
+    conn=None
+) -> Optional[BalanceCheckpoint]:
+    """
+    Get the most recent checkpoint for a wallet and asset.
+
+    Args:
+        wallet_id: The wallet ID
+        asset_id: The asset ID
+        as_of: Optional time; only checkpoints covering transactions up to this time are considered
+        conn: Optional database connection to reuse
+
+    Returns:
+        Optional[BalanceCheckpoint]: The checkpoint if any, None otherwise
+    """
+    query = f"""
+        SELECT * FROM {CHECKPOINTS_TABLE}
+        WHERE wallet_id = :wallet_id AND asset_id = :asset_id
+    """
+    params: Dict[str, Any] = {"wallet_id": wallet_id, "asset_id": asset_id}
+    if as_of:
+        query += " AND last_tx_created_at <= :as_of"
+        params["as_of"] = as_of
+    query += " ORDER BY last_tx_created_at DESC, last_tx_id DESC LIMIT 1"
+
+    return await (conn or db).fetchone(query, params, BalanceCheckpoint)
+
+
+@traced
+async def create_checkpoint(
+    wallet_id: str,
+    asset_id: str,
+    balance: int,
+    last_tx_id: str,
+    last_tx_created_at: datetime,
+    conn=None
+) -> BalanceCheckpoint:
+    """
+    Record the ledger balance of a wallet and asset up to a transaction.
+
+    Args:
+        wallet_id: The wallet ID
+        asset_id: The asset ID
+        balance: The ledger balance including every transaction created up to last_tx_created_at
+        last_tx_id: ID of the newest transaction included
+        last_tx_created_at: Creation time of that transaction
+        conn: Optional database connection to reuse
+
+    Returns:
+        BalanceCheckpoint: The created checkpoint
+    """
+    checkpoint = BalanceCheckpoint(
+        id=urlsafe_short_hash(),
+        wallet_id=wallet_id,
+        asset_id=asset_id,
+        balance=balance,
+        last_tx_id=last_tx_id,
+        last_tx_created_at=last_tx_created_at,
+        created_at=datetime.now()
+    )
+    await (conn or db).insert(CHECKPOINTS_TABLE, checkpoint)
+    return checkpoint
+
+
+@traced
+async def get_ledger_delta(
+    wallet_id: str,
+    asset_id: str,
+    after: Optional[BalanceCheckpoint] = None,
+    until: Optional[datetime] = None,
+    conn=None
+) -> Tuple[int, int, Optional[Tuple[str, datetime]]]:
+    """
+    Sum the ledger for a wallet and asset after a checkpoint.
+
+    Credits add to the balance and debits subtract from it, matching how
+    TransactionService updates asset_balances. Pass an until time far
+    enough in the past when the result is checkpointed, so transactions
+    still being committed aren't skipped by later runs.
+
+    Args:
+        wallet_id: The wallet ID
+        asset_id: The asset ID
+        after: Optional checkpoint; only newer transactions are summed
+        until: Optional time; only transactions up to this time are summed
+        conn: Optional database connection to reuse
+
+    Returns:
+        Tuple of (balance change, number of transactions, (id, created_at) of
+        the newest transaction summed or None if there were none)
+    """
+    where = "wallet_id = :wallet_id AND asset_id = :asset_id"
+    params: Dict[str, Any] = {"wallet_id": wallet_id, "asset_id": asset_id}
+    if after:
+        # A checkpoint covers every transaction created up to its time,
+        # whatever their IDs, so only newer ones are summed
+        where += " AND created_at > :after_created_at"
+        params["after_created_at"] = after.last_tx_created_at
+    if until:
+        where += " AND created_at <= :until"
+        params["until"] = until
+
+    totals = await (conn or db).fetchone(
+        f"""
+        SELECT COUNT(*) AS count,
+               SUM(CASE WHEN type = 'credit' THEN amount ELSE -amount END) AS delta
+        FROM {TRANSACTIONS_TABLE} WHERE {where}
+        """,
+        params
+    )
+    count = int(totals["count"] or 0) if totals else 0
+    if not count:
+        return 0, 0, None
+
+    last = await (conn or db).fetchone(
+        f"SELECT id, created_at FROM {TRANSACTIONS_TABLE} WHERE {where} ORDER BY created_at DESC, id DESC LIMIT 1",
+        params
+    )
+    return int(totals["delta"] or 0), count, (last["id"], parse_datetime(last["created_at"]))
+
+
+@traced
+async def get_all_asset_balances(conn=None) -> List[AssetBalance]:
+    """
+    Get the stored balance of every wallet and asset.
+
+    Args:
+        conn: Optional database connection to reuse
+
+    Returns:
+        List[AssetBalance]: All asset balances
+    """
+    return await (conn or db).fetchall(
+        f"SELECT * FROM {BALANCES_TABLE}",
+        {},
+        AssetBalance
+    )
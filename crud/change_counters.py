@@ -0,0 +1,79 @@
+"""
+Change counters for Taproot Assets extension.
+Versions wallet and user data in memory so list endpoints can answer
+conditional requests without querying.
+"""
+import hashlib
+import itertools
+from collections import OrderedDict
+from typing import Any, Optional
+
+from lnbits.helpers import urlsafe_short_hash
+
+
+class ChangeCounters:
+    """
+    In-memory change counters keyed by wallet or user ID.
+
+    Every invoice, payment and ledger write bumps the counters of the
+    wallet and user it touched to a new value of one process-wide sequence.
+    An ETag built from the counters therefore changes whenever the data
+    behind it may have changed. Keys that were never written, or that were
+    evicted, report the highest value evicted so far, which is at least
+    their last value, so eviction can cause an extra full response but
+    never a stale 304. ETags carry a per-process epoch, so none survive a
+    restart.
+    """
+
+    # Maximum number of keys tracked
+    MAX_KEYS = 100000
+
+    EPOCH = urlsafe_short_hash()[:8]
+
+    _sequence = itertools.count(1)
+    _counters: "OrderedDict[str, int]" = OrderedDict()
+    _evicted_through = 0
+
+    @classmethod
+    def bump(cls, *keys: Optional[str]) -> None:
+        """
+        Record a write for wallet and user IDs.
+
+        Args:
+            *keys: Wallet or user IDs that were written for; None values are ignored
+        """
+        for key in keys:
+            if not key:
+                continue
+            cls._counters[key] = next(cls._sequence)
+            cls._counters.move_to_end(key)
+        while len(cls._counters) > cls.MAX_KEYS:
+            _, value = cls._counters.popitem(last=False)
+            cls._evicted_through = max(cls._evicted_through, value)
+
+    @classmethod
+    def get(cls, key: str) -> int:
+        """
+        Get the counter of a wallet or user ID.
+
+        Args:
+            key: The wallet or user ID
+
+        Returns:
+            int: The counter value
+        """
+        return cls._counters.get(key, cls._evicted_through)
+
+    @classmethod
+    def etag(cls, *parts: Any) -> str:
+        """
+        Build an ETag from counters and request parameters.
+
+        Args:
+            *parts: Values the response depends on, e.g. counters, cursor and limit
+
+        Returns:
+            str: A quoted ETag
+        """
+        digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()[:24]
+        return f'"{cls.EPOCH}-{digest}"'
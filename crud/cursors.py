@@ -0,0 +1,50 @@
+"""
+Keyset pagination cursors for Taproot Assets CRUD operations.
+A cursor carries the (created_at, id) of the last record on a page.
+"""
+import base64
+import binascii
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: datetime, record_id: str) -> str:
+    """
+    Encode a keyset pagination cursor for a record.
+    
+    Args:
+        created_at: The record's creation time
+        record_id: The record's ID
+        
+    Returns:
+        An opaque URL-safe cursor string
+    """
+    raw = f"{created_at.isoformat()}|{record_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Decode a keyset pagination cursor.
+    
+    Characters outside the URL-safe base64 alphabet are rejected rather than
+    skipped, so a tampered cursor fails instead of decoding to another one.
+    
+    Args:
+        cursor: A cursor produced by encode_cursor
+        
+    Returns:
+        Tuple of (created_at, id) of the last record on the previous page
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.b64decode(padded.encode("ascii"), altchars=b"-_", validate=True)
+        created_at, record_id = raw.decode().split("|", 1)
+        if not record_id:
+            raise ValueError("missing record ID")
+        return datetime.fromisoformat(created_at), record_id
+    except (ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
@@ -0,0 +1,116 @@
+"""
+In-process invoice cache for Taproot Assets extension.
+Serves invoice lookups by payment hash, including known-missing hashes.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from ..models import TaprootInvoice
+
+
+class InvoiceCache:
+    """
+    Bounded LRU cache of invoices keyed by payment hash.
+
+    Only lookups made outside a caller's transaction are cached, so entries
+    always come from committed data. Every invoice write invalidates the
+    payment hash it touched, both when it is made and once its transaction
+    commits, since a lookup in between still reads the old row. Hashes with
+    no local invoice are cached as negative entries, which lets external
+    payments be classified without a query. Entries also expire after a
+    TTL, bounding how long an entry read while a write was still in flight
+    can be served.
+    """
+
+    # Maximum number of payment hashes kept in memory
+    MAX_ENTRIES = 10000
+
+    # Seconds an invoice entry is served before it is reloaded
+    TTL_SECONDS = 60
+
+    # Seconds a "no such invoice" entry is served before it is reloaded
+    NEGATIVE_TTL_SECONDS = 30
+
+    _entries: "OrderedDict[str, Tuple[float, Optional[TaprootInvoice]]]" = OrderedDict()
+    _stats: Dict[str, int] = {
+        "hits": 0,
+        "negative_hits": 0,
+        "misses": 0,
+        "invalidations": 0,
+        "evictions": 0,
+    }
+
+    @classmethod
+    def get(cls, payment_hash: str) -> Tuple[bool, Optional[TaprootInvoice]]:
+        """
+        Look up a payment hash.
+
+        Args:
+            payment_hash: The payment hash to look up
+
+        Returns:
+            Tuple of (found, invoice); found is True for cached negative entries,
+            in which case invoice is None
+        """
+        entry = cls._entries.get(payment_hash)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del cls._entries[payment_hash]
+            cls._stats["misses"] += 1
+            return False, None
+
+        cls._entries.move_to_end(payment_hash)
+        invoice = entry[1]
+        if invoice is None:
+            cls._stats["negative_hits"] += 1
+            return True, None
+
+        cls._stats["hits"] += 1
+        # Callers may modify the model they get back
+        return True, invoice.copy()
+
+    @classmethod
+    def put(cls, payment_hash: str, invoice: Optional[TaprootInvoice]) -> None:
+        """
+        Cache the result of a committed lookup.
+
+        Args:
+            payment_hash: The payment hash that was looked up
+            invoice: The invoice found, or None if there is no local invoice
+        """
+        ttl = cls.TTL_SECONDS if invoice is not None else cls.NEGATIVE_TTL_SECONDS
+        cls._entries[payment_hash] = (time.monotonic() + ttl, invoice.copy() if invoice else None)
+        cls._entries.move_to_end(payment_hash)
+        while len(cls._entries) > cls.MAX_ENTRIES:
+            cls._entries.popitem(last=False)
+            cls._stats["evictions"] += 1
+
+    @classmethod
+    def invalidate(cls, payment_hash: str) -> None:
+        """Drop the entry for a payment hash after its invoice was written."""
+        if cls._entries.pop(payment_hash, None) is not None:
+            cls._stats["invalidations"] += 1
+
+    @classmethod
+    def clear(cls) -> None:
+        """Drop all entries."""
+        cls._entries.clear()
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """
+        Get the cache counters.
+
+        Returns:
+            Dict[str, Any]: Hit, negative hit, miss, invalidation and eviction
+            counts, the hit rate and the current size
+        """
+        lookups = cls._stats["hits"] + cls._stats["negative_hits"] + cls._stats["misses"]
+        hits = cls._stats["hits"] + cls._stats["negative_hits"]
+        return {
+            **cls._stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "size": len(cls._entries),
+            "max_entries": cls.MAX_ENTRIES,
+        }
@@ -1,17 +1,66 @@
 """
 Invoice-related CRUD operations for Taproot Assets extension.
 """
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
 import json
 
 from lnbits.helpers import urlsafe_short_hash
 
-from ..models import TaprootInvoice
-from ..db import db, get_table_name
-from ..db_utils import with_transaction
-from .utils import get_record_by_id, get_record_by_field, get_records_by_field
+from ..models import TaprootInvoice, InvoiceStatus, InvoiceOwner, InvoiceSummary, decode_invoice_extra
+from ..db import db, get_table_name, read_router
+from ..db_utils import with_transaction, after_commit
+from ..tracing import traced
+from .utils import get_records_page
+from .invoice_cache import InvoiceCache
+from .change_counters import ChangeCounters
 
+INVOICES_TABLE = get_table_name("invoices")
+
+# Statement text for the fixed queries, built once at import
+_INSERT_INVOICE = f"""
+    INSERT INTO {INVOICES_TABLE}
+    (id, payment_hash, payment_request, asset_id, asset_amount, satoshi_amount,
+     description, status, user_id, wallet_id, created_at, expires_at, paid_at, extra)
+    VALUES (:id, :payment_hash, :payment_request, :asset_id, :asset_amount, :satoshi_amount,
+            :description, :status, :user_id, :wallet_id, :created_at, :expires_at, :paid_at, :extra)
+"""
+_SELECT_BY_ID = f"SELECT * FROM {INVOICES_TABLE} WHERE id = :id"
+_SELECT_BY_PAYMENT_HASH = f"SELECT * FROM {INVOICES_TABLE} WHERE payment_hash = :payment_hash"
+_SELECT_STATUS_BY_PAYMENT_HASH = (
+    f"SELECT id, payment_hash, status FROM {INVOICES_TABLE} WHERE payment_hash = :payment_hash"
+)
+_SELECT_OWNER_BY_PAYMENT_HASH = (
+    f"SELECT id, payment_hash, user_id, wallet_id FROM {INVOICES_TABLE} WHERE payment_hash = :payment_hash"
+)
+_TRANSITION_STATUS = f"UPDATE {INVOICES_TABLE} SET status = :status WHERE id = :id"
+_TRANSITION_TO_PAID = f"UPDATE {INVOICES_TABLE} SET status = :status, paid_at = :paid_at WHERE id = :id"
+_EXPIRE_PENDING = f"""
+    UPDATE {INVOICES_TABLE} SET status = 'expired'
+    WHERE status = 'pending' AND id IN (
+        SELECT id FROM {INVOICES_TABLE}
+        WHERE status = 'pending' AND expires_at IS NOT NULL AND expires_at < :now
+        ORDER BY expires_at
+        LIMIT :limit
+    )
+    RETURNING *
+"""
+_SELECT_PENDING_OWNERS = f"""
+    SELECT id, payment_hash, user_id, wallet_id FROM {INVOICES_TABLE}
+    WHERE status = 'pending' AND (expires_at IS NULL OR expires_at >= :now)
+    ORDER BY created_at
+    LIMIT :limit
+"""
+
+def _invoice_from_row(row, **overrides) -> TaprootInvoice:
+    """Build a TaprootInvoice from a database row, decoding the extra column."""
+    row_dict = dict(row)
+    row_dict["extra"] = decode_invoice_extra(row_dict.get("extra"))
+    row_dict.update(overrides)
+    return TaprootInvoice(**row_dict)
+
+
+@traced
 @with_transaction
 async def create_invoice(
     asset_id: str,
@@ -72,20 +121,18 @@ async def create_invoice(
         invoice_dict["extra"] = json.dumps(invoice_dict["extra"])
     
     # Insert using raw SQL to handle the extra field properly
-    await conn.execute(
-        f"""
-        INSERT INTO {get_table_name("invoices")} 
-        (id, payment_hash, payment_request, asset_id, asset_amount, satoshi_amount, 
-         description, status, user_id, wallet_id, created_at, expires_at, paid_at, extra)
-        VALUES (:id, :payment_hash, :payment_request, :asset_id, :asset_amount, :satoshi_amount,
-                :description, :status, :user_id, :wallet_id, :created_at, :expires_at, :paid_at, :extra)
-        """,
-        invoice_dict
-    )
+    await conn.execute(_INSERT_INVOICE, invoice_dict)
+    # Drop any negative entry for this hash, and again once committed in
+    # case a lookup outside this transaction cached it in the meantime
+    InvoiceCache.invalidate(payment_hash)
+    read_router.note_write(user_id, wallet_id)
+    after_commit(conn, lambda: InvoiceCache.invalidate(payment_hash))
+    after_commit(conn, lambda: ChangeCounters.bump(user_id, wallet_id))
     
     return invoice
 
 
+@traced
 async def get_invoice(invoice_id: str, conn=None) -> Optional[TaprootInvoice]:
     """
     Get a specific Taproot Asset invoice by ID.
@@ -97,23 +144,13 @@ async def get_invoice(invoice_id: str, conn=None) -> Optional[TaprootInvoice]:
     Returns:
         Optional[TaprootInvoice]: The invoice if found, None otherwise
     """
-    row = await (conn or db).fetchone(
-        f"SELECT * FROM {get_table_name('invoices')} WHERE id = :id",
-        {"id": invoice_id}
-    )
+    row = await (conn or db).fetchone(_SELECT_BY_ID, {"id": invoice_id})
     if row:
-        # Convert row to dict to make it mutable
-        row_dict = dict(row)
-        # Parse the extra field from JSON if it exists
-        if row_dict.get("extra") and isinstance(row_dict["extra"], str):
-            try:
-                row_dict["extra"] = json.loads(row_dict["extra"])
-            except json.JSONDecodeError:
-                row_dict["extra"] = None
-        return TaprootInvoice(**row_dict)
+        return _invoice_from_row(row)
     return None
 
 
+@traced
 async def get_invoice_by_payment_hash(payment_hash: str, conn=None) -> Optional[TaprootInvoice]:
     """
     Get a specific Taproot Asset invoice by payment hash.
@@ -122,27 +159,117 @@ async def get_invoice_by_payment_hash(payment_hash: str, conn=None) -> Optional[
         payment_hash: The payment hash to look up
         conn: Optional database connection to reuse
         
+    Lookups without a connection are served from InvoiceCache, including
+    hashes with no local invoice. Lookups on a caller's connection always read
+    the database, so checks made inside a transaction see its own writes.
+    
     Returns:
         Optional[TaprootInvoice]: The invoice if found, None otherwise
     """
-    row = await (conn or db).fetchone(
-        f"SELECT * FROM {get_table_name('invoices')} WHERE payment_hash = :payment_hash",
-        {"payment_hash": payment_hash}
+    if conn is None:
+        found, invoice = InvoiceCache.get(payment_hash)
+        if found:
+            return invoice
+    
+    row = await (conn or db).fetchone(_SELECT_BY_PAYMENT_HASH, {"payment_hash": payment_hash})
+    invoice = _invoice_from_row(row) if row else None
+    if conn is None:
+        InvoiceCache.put(payment_hash, invoice)
+    return invoice
+
+
+@traced
+async def get_invoices_by_payment_hashes(
+    payment_hashes: List[str],
+    conn=None
+) -> Dict[str, TaprootInvoice]:
+    """
+    Get the Taproot Asset invoices for several payment hashes in one query.
+    
+    Without a connection, cached hashes are served from InvoiceCache and
+    only the rest are queried.
+    
+    Args:
+        payment_hashes: The payment hashes to look up
+        conn: Optional database connection to reuse
+        
+    Returns:
+        Dict[str, TaprootInvoice]: Invoices keyed by payment hash; unknown hashes are omitted
+    """
+    invoices = {}
+    missing = []
+    for payment_hash in dict.fromkeys(payment_hashes):
+        found, invoice = InvoiceCache.get(payment_hash) if conn is None else (False, None)
+        if not found:
+            missing.append(payment_hash)
+        elif invoice:
+            invoices[payment_hash] = invoice
+    if not missing:
+        return invoices
+    
+    params = {f"payment_hash_{i}": payment_hash for i, payment_hash in enumerate(missing)}
+    placeholders = ", ".join(f":{key}" for key in params)
+    rows = await (conn or db).fetchall(
+        f"SELECT * FROM {INVOICES_TABLE} WHERE payment_hash IN ({placeholders})",
+        params
     )
-    if row:
-        # Convert row to dict to make it mutable
-        row_dict = dict(row)
-        # Parse the extra field from JSON if it exists
-        if row_dict.get("extra") and isinstance(row_dict["extra"], str):
-            try:
-                row_dict["extra"] = json.loads(row_dict["extra"])
-            except json.JSONDecodeError:
-                row_dict["extra"] = None
-        return TaprootInvoice(**row_dict)
-    return None
+    for row in rows:
+        invoice = _invoice_from_row(row)
+        invoices[invoice.payment_hash] = invoice
+    if conn is None:
+        for payment_hash in missing:
+            InvoiceCache.put(payment_hash, invoices.get(payment_hash))
+    return invoices
 
 
+@traced
 @with_transaction
+async def transition_invoice_status(
+    invoice_id: str,
+    status: str,
+    expected_statuses: Optional[Sequence[str]] = None,
+    conn=None
+) -> Optional[TaprootInvoice]:
+    """
+    Move an invoice to a new status with a single conditional UPDATE.
+    
+    The status check and the write happen in one statement, so when several
+    callers race to make the same transition exactly one of them gets the
+    invoice back. That makes it usable as an idempotency guard.
+    
+    Args:
+        invoice_id: The ID of the invoice to update
+        status: The new status for the invoice
+        expected_statuses: Statuses the invoice may currently have; None allows any
+        conn: Optional database connection to reuse
+        
+    Returns:
+        Optional[TaprootInvoice]: The updated invoice, or None if the invoice
+        doesn't exist or its status was not one of expected_statuses
+    """
+    statement = _TRANSITION_TO_PAID if status == "paid" else _TRANSITION_STATUS
+    params: Dict[str, Any] = {"id": invoice_id, "status": status}
+    if status == "paid":
+        params["paid_at"] = datetime.now()
+    if expected_statuses:
+        expected = {f"expected_{i}": value for i, value in enumerate(expected_statuses)}
+        statement += f" AND status IN ({', '.join(f':{key}' for key in expected)})"
+        params.update(expected)
+    
+    row = await conn.fetchone(f"{statement} RETURNING *", params)
+    if not row:
+        return None
+    
+    invoice = _invoice_from_row(row)
+    # Invalidate again after the commit; a lookup in between caches the old status
+    InvoiceCache.invalidate(invoice.payment_hash)
+    read_router.note_write(invoice.user_id, invoice.wallet_id)
+    after_commit(conn, lambda: InvoiceCache.invalidate(invoice.payment_hash))
+    after_commit(conn, lambda: ChangeCounters.bump(invoice.user_id, invoice.wallet_id))
+    return invoice
+
+
+@traced
 async def update_invoice_status(invoice_id: str, status: str, conn=None) -> Optional[TaprootInvoice]:
     """
     Update the status of a Taproot Asset invoice.
@@ -155,57 +282,174 @@ async def update_invoice_status(invoice_id: str, status: str, conn=None) -> Opti
     Returns:
         Optional[TaprootInvoice]: The updated invoice if found, None otherwise
     """
-    invoice = await get_invoice(invoice_id, conn)
-    if not invoice:
-        return None
+    return await transition_invoice_status(invoice_id, status, conn=conn)
+
+
+@traced
+@with_transaction
+async def expire_pending_invoices(
+    now: datetime,
+    limit: int = 200,
+    conn=None
+) -> List[TaprootInvoice]:
+    """
+    Mark a batch of expired pending invoices as expired.
+    
+    Flips up to `limit` pending invoices whose expiry has passed with a
+    single UPDATE that returns the rows it changed. The status check is part
+    of the UPDATE, so an invoice settled in the meantime is neither marked
+    expired nor returned.
+    
+    Args:
+        now: The current time to compare expires_at against
+        limit: Maximum number of invoices to expire in this batch
+        conn: Optional database connection to reuse
         
-    now = datetime.now()
-    invoice.status = status
+    Returns:
+        List[TaprootInvoice]: The invoices that were marked expired
+    """
+    rows = await conn.fetchall(_EXPIRE_PENDING, {"now": now, "limit": limit})
+    if not rows:
+        return []
     
-    # Set paid_at timestamp if status is changing to paid
-    if status == "paid":
-        invoice.paid_at = now
+    invoices = [_invoice_from_row(row) for row in rows]
+    for invoice in invoices:
+        InvoiceCache.invalidate(invoice.payment_hash)
+        read_router.note_write(invoice.user_id, invoice.wallet_id)
+    owners = [key for invoice in invoices for key in (invoice.user_id, invoice.wallet_id)]
     
-    # Update the invoice in the database using standardized method
-    await conn.update(
-        get_table_name("invoices"),
-        invoice,
-        "WHERE id = :id"
-    )
+    def invalidate_committed() -> None:
+        for invoice in invoices:
+            InvoiceCache.invalidate(invoice.payment_hash)
+    
+    after_commit(conn, invalidate_committed)
+    after_commit(conn, lambda: ChangeCounters.bump(*owners))
     
-    # Return the updated invoice
-    return await get_invoice(invoice_id, conn)
+    return invoices
 
 
-async def get_user_invoices(user_id: str) -> List[TaprootInvoice]:
+@traced
+async def get_user_invoices(
+    user_id: str,
+    limit: int = 100,
+    cursor: Optional[str] = None
+) -> Tuple[List[TaprootInvoice], Optional[str]]:
     """
-    Get all Taproot Asset invoices for a user.
+    Get a page of Taproot Asset invoices for a user, newest first.
+    
+    Read through the read router, so it may be served by a replica.
     
     Args:
         user_id: The ID of the user to get invoices for
+        limit: Maximum number of invoices to return
+        cursor: Cursor returned with the previous page, None for the first page
         
     Returns:
-        List[TaprootInvoice]: List of invoices for the user
+        Tuple of (invoices, next_cursor); next_cursor is None on the last page
     """
-    rows = await db.fetchall(
-        f"SELECT * FROM {get_table_name('invoices')} WHERE user_id = :user_id ORDER BY created_at DESC LIMIT 100",
-        {"user_id": user_id}
-    )
-    invoices = []
-    for row in rows:
-        # Convert row to dict to make it mutable
-        row_dict = dict(row)
-        # Parse the extra field from JSON if it exists
-        if row_dict.get("extra") and isinstance(row_dict["extra"], str):
-            try:
-                row_dict["extra"] = json.loads(row_dict["extra"])
-            except json.JSONDecodeError:
-                row_dict["extra"] = None
-        invoices.append(TaprootInvoice(**row_dict))
-    return invoices
+    async with read_router.reader(user_id) as conn:
+        return await get_records_page(
+            "invoices", {"user_id": user_id}, _invoice_from_row, limit=limit, cursor=cursor, conn=conn
+        )
+
+
+@traced
+async def get_user_invoice_summaries(
+    user_id: str,
+    limit: int = 100,
+    cursor: Optional[str] = None
+) -> Tuple[List[InvoiceSummary], Optional[str]]:
+    """
+    Get a page of invoice summaries for a user, newest first.
+    
+    Same rows as get_user_invoices, but each row is wrapped without model
+    validation; extra and the full model are only decoded when accessed.
+    
+    Args:
+        user_id: The ID of the user to get invoices for
+        limit: Maximum number of invoices to return
+        cursor: Cursor returned with the previous page, None for the first page
+        
+    Returns:
+        Tuple of (summaries, next_cursor); next_cursor is None on the last page
+    """
+    async with read_router.reader(user_id) as conn:
+        return await get_records_page(
+            "invoices", {"user_id": user_id}, InvoiceSummary, limit=limit, cursor=cursor, conn=conn
+        )
+
+
+@traced
+async def get_invoice_status(payment_hash: str, conn=None) -> Optional[InvoiceStatus]:
+    """
+    Get only the status of the invoice for a payment hash.
+    
+    Args:
+        payment_hash: The payment hash to look up
+        conn: Optional database connection to reuse
+        
+    Returns:
+        Optional[InvoiceStatus]: The status projection if found, None otherwise
+    """
+    if conn is None:
+        found, invoice = InvoiceCache.get(payment_hash)
+        if found:
+            return InvoiceStatus(invoice.id, invoice.payment_hash, invoice.status) if invoice else None
+    
+    row = await (conn or db).fetchone(_SELECT_STATUS_BY_PAYMENT_HASH, {"payment_hash": payment_hash})
+    if row is None and conn is None:
+        InvoiceCache.put(payment_hash, None)
+    return InvoiceStatus(row["id"], row["payment_hash"], row["status"]) if row else None
+
+
+@traced
+async def get_invoice_owner(payment_hash: str, conn=None) -> Optional[InvoiceOwner]:
+    """
+    Get only the owner of the invoice for a payment hash.
+    
+    Args:
+        payment_hash: The payment hash to look up
+        conn: Optional database connection to reuse
+        
+    Returns:
+        Optional[InvoiceOwner]: The ownership projection if found, None otherwise
+    """
+    if conn is None:
+        found, invoice = InvoiceCache.get(payment_hash)
+        if found:
+            return InvoiceOwner(
+                invoice.id, invoice.payment_hash, invoice.user_id, invoice.wallet_id
+            ) if invoice else None
+    
+    row = await (conn or db).fetchone(_SELECT_OWNER_BY_PAYMENT_HASH, {"payment_hash": payment_hash})
+    if row is None and conn is None:
+        InvoiceCache.put(payment_hash, None)
+    return InvoiceOwner(row["id"], row["payment_hash"], row["user_id"], row["wallet_id"]) if row else None
+
+
+@traced
+async def get_pending_invoice_owners(
+    now: datetime,
+    limit: int = 1000,
+    conn=None
+) -> List[InvoiceOwner]:
+    """
+    Get the owners of pending invoices that have not expired yet.
+    
+    Args:
+        now: The current time to compare expires_at against
+        limit: Maximum number of invoices to return
+        conn: Optional database connection to reuse
+        
+    Returns:
+        List[InvoiceOwner]: Ownership projections, oldest invoice first
+    """
+    rows = await (conn or db).fetchall(_SELECT_PENDING_OWNERS, {"now": now, "limit": limit})
+    return [InvoiceOwner(row["id"], row["payment_hash"], row["user_id"], row["wallet_id"]) for row in rows]
 
 
 # Payment detection functions
+@traced
 async def is_self_payment(payment_hash: str, user_id: str) -> bool:
     """
     Determine if a payment hash belongs to an invoice created by the same user.
@@ -221,10 +465,11 @@ async def is_self_payment(payment_hash: str, user_id: str) -> bool:
     Returns:
         bool: True if this is a self-payment (same user), False otherwise
     """
-    invoice = await get_invoice_by_payment_hash(payment_hash)
-    return invoice is not None and invoice.user_id == user_id
+    owner = await get_invoice_owner(payment_hash)
+    return owner is not None and owner.user_id == user_id
 
 
+@traced
 async def is_internal_payment(payment_hash: str) -> bool:
     """
     Determine if a payment hash belongs to an invoice created by any user on the same node.
@@ -240,10 +485,11 @@ async def is_internal_payment(payment_hash: str) -> bool:
     Returns:
         bool: True if this is an internal payment (any user on same node), False otherwise
     """
-    invoice = await get_invoice_by_payment_hash(payment_hash)
-    return invoice is not None
+    owner = await get_invoice_owner(payment_hash)
+    return owner is not None
 
 
+@traced
 @with_transaction
 async def validate_invoice_for_settlement(payment_hash: str, conn=None) -> Tuple[bool, Optional[TaprootInvoice], Optional[str]]:
     """
@@ -277,6 +523,7 @@ async def validate_invoice_for_settlement(payment_hash: str, conn=None) -> Tuple
     return True, invoice, None
 
 
+@traced
 @with_transaction
 async def update_invoice_for_settlement(invoice: TaprootInvoice, conn=None) -> Optional[TaprootInvoice]:
     """
@@ -0,0 +1,118 @@
+"""
+Payment-hash metadata CRUD operations for Taproot Assets extension.
+"""
+from typing import Dict, List, Optional
+from datetime import datetime
+
+from ..models import PaymentMetadata
+from ..db import db, get_table_name
+from ..tracing import traced
+from .utils import get_record_by_field
+
+METADATA_TABLE = get_table_name("payment_metadata")
+
+# Columns that can be written through upsert_payment_metadata
+METADATA_FIELDS = ("preimage", "asset_id", "script_key", "settled")
+
+_DELETE_UPDATED_BEFORE = f"DELETE FROM {METADATA_TABLE} WHERE updated_at < :cutoff"
+
+
+@traced
+async def get_payment_metadata(payment_hash: str, conn=None) -> Optional[PaymentMetadata]:
+    """
+    Get the metadata stored for a payment hash.
+
+    Args:
+        payment_hash: The payment hash (hex)
+        conn: Optional database connection to reuse
+
+    Returns:
+        Optional[PaymentMetadata]: The metadata if found, None otherwise
+    """
+    return await get_record_by_field("payment_metadata", "payment_hash", payment_hash, PaymentMetadata, conn=conn)
+
+
+@traced
+async def get_payment_metadata_many(
+    payment_hashes: List[str],
+    conn=None
+) -> Dict[str, PaymentMetadata]:
+    """
+    Get the metadata for several payment hashes in one query.
+
+    Args:
+        payment_hashes: The payment hashes (hex)
+        conn: Optional database connection to reuse
+
+    Returns:
+        Dict[str, PaymentMetadata]: Metadata keyed by payment hash; unknown hashes are omitted
+    """
+    if not payment_hashes:
+        return {}
+
+    params = {f"payment_hash_{i}": payment_hash for i, payment_hash in enumerate(payment_hashes)}
+    placeholders = ", ".join(f":{key}" for key in params)
+    rows = await (conn or db).fetchall(
+        f"SELECT * FROM {METADATA_TABLE} WHERE payment_hash IN ({placeholders})",
+        params,
+        PaymentMetadata
+    )
+    return {row.payment_hash: row for row in rows}
+
+
+@traced
+async def get_payment_metadata_by_script_key(script_key: str, conn=None) -> Optional[PaymentMetadata]:
+    """
+    Get the metadata for the payment hash mapped to a script key.
+
+    Args:
+        script_key: The script key (hex)
+        conn: Optional database connection to reuse
+
+    Returns:
+        Optional[PaymentMetadata]: The metadata if found, None otherwise
+    """
+    return await get_record_by_field("payment_metadata", "script_key", script_key, PaymentMetadata, conn=conn)
+
+
+@traced
+async def upsert_payment_metadata(payment_hash: str, conn=None, **fields) -> None:
+    """
+    Insert or update metadata for a payment hash.
+
+    Only the given fields are written; existing values for other fields are kept.
+
+    Args:
+        payment_hash: The payment hash (hex)
+        conn: Optional database connection to reuse
+        **fields: Values for any of preimage, asset_id, script_key and settled
+    """
+    unknown = set(fields) - set(METADATA_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown payment metadata fields: {', '.join(sorted(unknown))}")
+
+    now = datetime.now()
+    params = {"payment_hash": payment_hash, "created_at": now, "updated_at": now, **fields}
+    columns = ["payment_hash", *fields, "created_at", "updated_at"]
+    updates = ", ".join(f"{column} = excluded.{column}" for column in [*fields, "updated_at"])
+
+    await (conn or db).execute(
+        f"""
+        INSERT INTO {METADATA_TABLE} ({", ".join(columns)})
+        VALUES ({", ".join(f":{column}" for column in columns)})
+        ON CONFLICT (payment_hash) DO UPDATE SET {updates}
+        """,
+        params
+    )
+
+
+@traced
+async def delete_payment_metadata_before(cutoff: datetime, conn=None) -> None:
+    """
+    Delete metadata that has not been updated since the cutoff.
+
+    Args:
+        cutoff: Rows last updated before this time are deleted
+        conn: Optional database connection to reuse
+    """
+    await (conn or db).execute(_DELETE_UPDATED_BEFORE, {"cutoff": cutoff})
@@ -1,16 +1,21 @@
 """
 Payment-related CRUD operations for Taproot Assets extension.
 """
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import datetime
 
 from lnbits.helpers import urlsafe_short_hash
 
 from ..models import TaprootPayment
-from ..db import db, get_table_name
-from ..db_utils import with_transaction
-from .utils import get_records_by_field
+from ..db import db, get_table_name, read_router
+from ..db_utils import with_transaction, after_commit
+from ..tracing import traced
+from .utils import get_records_page, insert_many
+from .change_counters import ChangeCounters
 
+PAYMENTS_TABLE = get_table_name("payments")
+
+@traced
 @with_transaction
 async def create_payment_record(
     payment_hash: str, 
@@ -62,19 +67,75 @@ async def create_payment_record(
     )
     
     # Insert using standardized method
-    await conn.insert(get_table_name("payments"), payment)
+    await conn.insert(PAYMENTS_TABLE, payment)
+    read_router.note_write(user_id, wallet_id)
+    after_commit(conn, lambda: ChangeCounters.bump(user_id, wallet_id))
     
     return payment
 
 
-async def get_user_payments(user_id: str) -> List[TaprootPayment]:
+@traced
+@with_transaction
+async def create_payment_records(payments: List[dict], conn=None) -> List[TaprootPayment]:
+    """
+    Create records for many sent payments with bulk inserts.
+    
+    Args:
+        payments: Dicts with the same fields as create_payment_record's arguments
+        conn: Optional database connection to reuse
+        
+    Returns:
+        List[TaprootPayment]: The created payment records
+    """
+    now = datetime.now()
+    records = [
+        TaprootPayment(
+            id=urlsafe_short_hash(),
+            payment_hash=payment["payment_hash"],
+            payment_request=payment["payment_request"],
+            asset_id=payment["asset_id"],
+            asset_amount=payment["asset_amount"],
+            fee_sats=payment["fee_sats"],
+            description=payment.get("description"),
+            status="completed",
+            user_id=payment["user_id"],
+            wallet_id=payment["wallet_id"],
+            created_at=now,
+            preimage=payment.get("preimage")
+        )
+        for payment in payments
+    ]
+    
+    await insert_many("payments", [record.dict() for record in records], conn=conn)
+    for record in records:
+        read_router.note_write(record.user_id, record.wallet_id)
+    owners = [key for record in records for key in (record.user_id, record.wallet_id)]
+    after_commit(conn, lambda: ChangeCounters.bump(*owners))
+    
+    return records
+
+
+@traced
+async def get_user_payments(
+    user_id: str,
+    limit: int = 100,
+    cursor: Optional[str] = None
+) -> Tuple[List[TaprootPayment], Optional[str]]:
     """
-    Get all sent payments for a user.
+    Get a page of sent payments for a user, newest first.
+    
+    Read through the read router, so it may be served by a replica.
     
     Args:
         user_id: The user ID to get payments for
+        limit: Maximum number of payments to return
+        cursor: Cursor returned with the previous page, None for the first page
         
     Returns:
-        List[TaprootPayment]: List of payments for the user
+        Tuple of (payments, next_cursor); next_cursor is None on the last page
     """
-    return await get_records_by_field("payments", "user_id", user_id, TaprootPayment)
+    async with read_router.reader(user_id) as conn:
+        return await get_records_page(
+            "payments", {"user_id": user_id}, lambda row: TaprootPayment(**row),
+            limit=limit, cursor=cursor, conn=conn
+        )
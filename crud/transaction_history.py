@@ -0,0 +1,153 @@
+"""
+Daily transaction rollup CRUD operations for Taproot Assets extension.
+"""
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..models import AssetTransaction, AssetDailyHistory
+from ..db import db, get_table_name
+from ..tracing import traced
+
+DAILY_TABLE = get_table_name("asset_transaction_daily")
+
+# Columns summed into a rollup row
+ROLLUP_FIELDS = ("credit_amount", "debit_amount", "credit_count", "debit_count", "fee_total")
+
+_UPSERT_ROLLUP = f"""
+    INSERT INTO {DAILY_TABLE}
+    (wallet_id, asset_id, day, {", ".join(ROLLUP_FIELDS)})
+    VALUES (:wallet_id, :asset_id, :day, {", ".join(f":{field}" for field in ROLLUP_FIELDS)})
+    ON CONFLICT (wallet_id, asset_id, day) DO UPDATE SET
+    {", ".join(f"{field} = {field} + excluded.{field}" for field in ROLLUP_FIELDS)}
+"""
+
+
+def utc_day(value: datetime) -> str:
+    """
+    The UTC calendar day (YYYY-MM-DD) a timestamp falls on.
+
+    Rollup days are always UTC, matching the backfill in the migrations;
+    naive timestamps are taken as local time, as datetime.now() returns them.
+    """
+    return value.astimezone(timezone.utc).date().isoformat()
+
+
+@traced
+async def add_to_daily_rollups(transactions: List[AssetTransaction], conn=None) -> None:
+    """
+    Add ledger rows to the daily rollups, one upsert per wallet, asset and day.
+
+    Should be called with the connection that wrote the ledger rows, so the
+    rollups commit or roll back together with them.
+
+    Args:
+        transactions: The asset transactions just recorded
+        conn: Optional database connection to reuse
+    """
+    rollups: Dict[Tuple[str, str, str], Dict[str, int]] = {}
+    for tx in transactions:
+        rollup = rollups.setdefault(
+            (tx.wallet_id, tx.asset_id, utc_day(tx.created_at)),
+            dict.fromkeys(ROLLUP_FIELDS, 0)
+        )
+        side = "credit" if tx.type == "credit" else "debit"
+        rollup[f"{side}_amount"] += tx.amount
+        rollup[f"{side}_count"] += 1
+        rollup["fee_total"] += tx.fee or 0
+
+    for (wallet_id, asset_id, day), rollup in rollups.items():
+        await (conn or db).execute(
+            _UPSERT_ROLLUP,
+            {"wallet_id": wallet_id, "asset_id": asset_id, "day": day, **rollup}
+        )
+
+
+def _range_filters(
+    wallet_id: str,
+    start: date,
+    end: date,
+    asset_id: Optional[str]
+) -> Tuple[str, Dict[str, Any]]:
+    where = "wallet_id = :wallet_id AND day >= :start_day AND day <= :end_day"
+    params: Dict[str, Any] = {
+        "wallet_id": wallet_id,
+        "start_day": start.isoformat(),
+        "end_day": end.isoformat()
+    }
+    if asset_id:
+        where += " AND asset_id = :asset_id"
+        params["asset_id"] = asset_id
+    return where, params
+
+
+@traced
+async def get_daily_history(
+    wallet_id: str,
+    start: date,
+    end: date,
+    asset_id: Optional[str] = None,
+    conn=None
+) -> List[AssetDailyHistory]:
+    """
+    Get the daily rollups for a wallet over a date range, oldest first.
+
+    Args:
+        wallet_id: The wallet ID
+        start: First day of the range (inclusive)
+        end: Last day of the range (inclusive)
+        asset_id: Optional asset ID to filter by
+        conn: Optional database connection to reuse
+
+    Returns:
+        List[AssetDailyHistory]: One row per asset and day with activity
+    """
+    where, params = _range_filters(wallet_id, start, end, asset_id)
+    return await (conn or db).fetchall(
+        f"""
+        SELECT * FROM {DAILY_TABLE}
+        WHERE {where}
+        ORDER BY day, asset_id
+        """,
+        params,
+        AssetDailyHistory
+    )
+
+
+@traced
+async def get_history_totals(
+    wallet_id: str,
+    start: date,
+    end: date,
+    asset_id: Optional[str] = None,
+    conn=None
+) -> Dict[str, Dict[str, int]]:
+    """
+    Sum the daily rollups for a wallet over a date range, per asset.
+
+    The cost depends on the number of days and assets in the range, not on
+    the number of ledger rows.
+
+    Args:
+        wallet_id: The wallet ID
+        start: First day of the range (inclusive)
+        end: Last day of the range (inclusive)
+        asset_id: Optional asset ID to filter by
+        conn: Optional database connection to reuse
+
+    Returns:
+        Dict[str, Dict[str, int]]: Totals for each rollup column, keyed by asset ID
+    """
+    where, params = _range_filters(wallet_id, start, end, asset_id)
+    rows = await (conn or db).fetchall(
+        f"""
+        SELECT asset_id, {", ".join(f"SUM({field}) AS {field}" for field in ROLLUP_FIELDS)}
+        FROM {DAILY_TABLE}
+        WHERE {where}
+        GROUP BY asset_id
+        """,
+        params
+    )
+    return {
+        row["asset_id"]: {field: int(row[field] or 0) for field in ROLLUP_FIELDS}
+        for row in rows
+    }
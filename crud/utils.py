@@ -1,16 +1,31 @@
 """
 Common database utilities for Taproot Assets CRUD operations.
 """
-from typing import Any, Dict, List, Optional, Type, TypeVar, Union, Callable
+import functools
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Type, TypeVar, Union, Callable
 from datetime import datetime
 from pydantic import BaseModel
 
 from lnbits.db import Database
-from ..db import db, get_table_name
+from ..db import db, get_table_name, read_router
 from ..db_utils import transaction
+from .cursors import encode_cursor, decode_cursor
 
 T = TypeVar('T', bound=BaseModel)
 
+
+@functools.lru_cache(maxsize=None)
+def select_by_field_sql(table: str, field: str) -> str:
+    """Statement text for selecting rows by one field, built once per table and field."""
+    return f"SELECT * FROM {get_table_name(table)} WHERE {field} = :{field}"
+
+
+@functools.lru_cache(maxsize=None)
+def select_recent_by_field_sql(table: str, field: str) -> str:
+    """Statement text for selecting the newest rows by one field, built once per table and field."""
+    return f"{select_by_field_sql(table, field)} ORDER BY created_at DESC LIMIT :limit"
+
+
 async def get_record_by_id(table: str, id: str, model_class: Type[T], conn=None) -> Optional[T]:
     """
     Get a record by ID from any table.
@@ -24,11 +39,7 @@ async def get_record_by_id(table: str, id: str, model_class: Type[T], conn=None)
     Returns:
         The model instance if found, None otherwise
     """
-    return await (conn or db).fetchone(
-        f"SELECT * FROM {get_table_name(table)} WHERE id = :id",
-        {"id": id},
-        model_class
-    )
+    return await (conn or db).fetchone(select_by_field_sql(table, "id"), {"id": id}, model_class)
 
 async def get_record_by_field(
     table: str, 
@@ -50,11 +61,7 @@ async def get_record_by_field(
     Returns:
         The model instance if found, None otherwise
     """
-    return await (conn or db).fetchone(
-        f"SELECT * FROM {get_table_name(table)} WHERE {field} = :{field}",
-        {field: value},
-        model_class
-    )
+    return await (conn or db).fetchone(select_by_field_sql(table, field), {field: value}, model_class)
 
 async def get_records_by_field(
     table: str, 
@@ -79,12 +86,7 @@ async def get_records_by_field(
         List of model instances
     """
     return await (conn or db).fetchall(
-        f"""
-        SELECT * FROM {get_table_name(table)} 
-        WHERE {field} = :{field} 
-        ORDER BY created_at DESC 
-        LIMIT :limit
-        """,
+        select_recent_by_field_sql(table, field),
         {field: value, "limit": limit},
         model_class
     )
@@ -108,3 +110,160 @@ async def get_records_by_user(
         List of model instances
     """
     return await get_records_by_field(table, "user_id", user_id, model_class, conn=conn)
+
+
+async def insert_many(
+    table: str,
+    rows: List[Dict[str, Any]],
+    conn=None,
+    chunk_size: int = 100
+) -> int:
+    """
+    Insert many records into a table using multi-row INSERT statements.
+    
+    Args:
+        table: The table name (without prefix)
+        rows: The records to insert; all rows must have the same keys
+        conn: Optional database connection to reuse
+        chunk_size: Maximum number of rows per INSERT statement
+        
+    Returns:
+        The number of rows inserted
+    """
+    if not rows:
+        return 0
+    
+    columns = list(rows[0].keys())
+    column_list = ", ".join(columns)
+    
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        values = []
+        params: Dict[str, Any] = {}
+        for index, row in enumerate(chunk):
+            placeholders = []
+            for column in columns:
+                key = f"{column}_{index}"
+                placeholders.append(f":{key}")
+                params[key] = row[column]
+            values.append(f"({', '.join(placeholders)})")
+        
+        await (conn or db).execute(
+            f"INSERT INTO {get_table_name(table)} ({column_list}) VALUES {', '.join(values)}",
+            params
+        )
+    
+    return len(rows)
+
+
+async def get_records_page(
+    table: str,
+    filters: Dict[str, Any],
+    parse_row: Callable[[Dict[str, Any]], T],
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    conn=None
+) -> Tuple[List[T], Optional[str]]:
+    """
+    Get one page of records, newest first, using keyset pagination on (created_at, id).
+    
+    Every page is an index range scan on the owner's (created_at, id) index,
+    so deep pages cost the same as the first one.
+    
+    Args:
+        table: The table name (without prefix)
+        filters: Equality filters, e.g. {"user_id": user_id}
+        parse_row: Function that turns a database row into a model instance
+        limit: Maximum number of records to return
+        cursor: Cursor returned with the previous page, None for the first page
+        conn: Optional database connection to reuse
+        
+    Returns:
+        Tuple of (records, next_cursor); next_cursor is None on the last page
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    where_clauses = [f"{field} = :{field}" for field in filters]
+    params: Dict[str, Any] = dict(filters)
+    
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        where_clauses.append(
+            "(created_at < :cursor_created_at OR (created_at = :cursor_created_at AND id < :cursor_id))"
+        )
+        params["cursor_created_at"] = cursor_created_at
+        params["cursor_id"] = cursor_id
+    
+    query = f"SELECT * FROM {get_table_name(table)}"
+    if where_clauses:
+        query += " WHERE " + " AND ".join(where_clauses)
+    # Fetch one extra row to know whether another page exists
+    query += " ORDER BY created_at DESC, id DESC LIMIT :limit"
+    params["limit"] = limit + 1
+    
+    rows = await (conn or db).fetchall(query, params)
+    records = [parse_row(dict(row)) for row in rows[:limit]]
+    
+    next_cursor = None
+    if len(rows) > limit and records:
+        last = records[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    
+    return records, next_cursor
+
+
+async def iter_record_chunks(
+    table: str,
+    filters: Dict[str, Any],
+    columns: Sequence[str],
+    chunk_size: int = 500,
+    read_key: Optional[str] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Iterate over all matching records, oldest first, in fixed-size chunks.
+    
+    Each chunk is a separate keyset query on (created_at, id), so memory use
+    stays at one chunk no matter how many rows match, and no connection or
+    transaction is held open between chunks.
+    
+    Args:
+        table: The table name (without prefix)
+        filters: Equality filters, e.g. {"wallet_id": wallet_id}
+        columns: Columns to select; created_at and id are always included
+        chunk_size: Number of rows per query
+        read_key: Wallet or user ID the rows belong to; chunks are read
+                  through the read router, so they may come from a replica
+        
+    Yields:
+        Lists of raw rows as dicts
+    """
+    selected = list(dict.fromkeys([*columns, "created_at", "id"]))
+    base_clauses = [f"{field} = :{field}" for field in filters]
+    params: Dict[str, Any] = {**filters, "limit": chunk_size}
+    last: Optional[Tuple[Any, str]] = None
+    
+    while True:
+        where_clauses = list(base_clauses)
+        if last:
+            where_clauses.append(
+                "(created_at > :after_created_at OR (created_at = :after_created_at AND id > :after_id))"
+            )
+            params["after_created_at"], params["after_id"] = last
+        
+        query = f"SELECT {', '.join(selected)} FROM {get_table_name(table)}"
+        if where_clauses:
+            query += " WHERE " + " AND ".join(where_clauses)
+        query += " ORDER BY created_at, id LIMIT :limit"
+        
+        async with read_router.reader(read_key) as conn:
+            rows = [dict(row) for row in await conn.fetchall(query, params)]
+        if not rows:
+            return
+        
+        yield rows
+        
+        if len(rows) < chunk_size:
+            return
+        # Raw values are passed back as-is so they compare in the stored format
+        last = (rows[-1]["created_at"], rows[-1]["id"])
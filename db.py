@@ -1,8 +1,17 @@
 """
 Database module for the Taproot Assets extension.
 """
+import functools
+import itertools
+import time
 from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Union
+
+from loguru import logger
 from lnbits.db import Connection, Database
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from .tapd_settings import taproot_settings
 
 # Create a database instance for the extension
 db = Database("ext_taproot_assets")
@@ -20,7 +29,10 @@ async def reuse_conn(conn):
 if not hasattr(db, 'reuse_conn'):
     db.reuse_conn = reuse_conn
 
-# Helper function to get proper table name with schema only when needed
+# Helper function to get proper table name with schema only when needed.
+# The database type is fixed once the instance above is created, so each
+# name is resolved once and then served from the cache.
+@functools.lru_cache(maxsize=None)
 def get_table_name(base_name):
     """
     Get the properly formatted table name based on database type.
@@ -36,6 +48,108 @@ def get_table_name(base_name):
     else:  # SQLite
         return base_name
 
+class ReadRouter:
+    """
+    Routes read-only list and history queries to Postgres read replicas.
+    
+    Replicas lag the primary, so reads keyed by a wallet or user that wrote
+    within the last sticky_seconds stay on the primary and see their own
+    writes. Everything that doesn't go through reader(), including all
+    settlement and balance paths, always uses the primary. Without replicas
+    configured, or on SQLite, reader() simply yields the primary.
+    """
+    
+    def __init__(self, database: Database, replica_urls: List[str], sticky_seconds: float):
+        """
+        Initialize the read router.
+        
+        Args:
+            database: The primary Database instance
+            replica_urls: Postgres URLs of the read replicas
+            sticky_seconds: How long reads stay on the primary after a write
+        """
+        self.primary = database
+        self.replica_urls = replica_urls
+        self.sticky_seconds = sticky_seconds
+        self._engines: List[AsyncEngine] = []
+        self._next_engine: Optional[itertools.cycle] = None
+        # key -> monotonic time until which reads stay on the primary
+        self._sticky_until: Dict[str, float] = {}
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether reads can be sent to replicas at all."""
+        return bool(self.replica_urls) and self.primary.type in ["POSTGRES", "COCKROACH"]
+    
+    def note_write(self, *keys: Optional[str]) -> None:
+        """
+        Pin reads for the given wallet and user IDs to the primary for a while.
+        
+        Args:
+            *keys: Wallet or user IDs that were just written for; None values are ignored
+        """
+        if not self.enabled:
+            return
+        
+        now = time.monotonic()
+        if len(self._sticky_until) > 10000:
+            self._sticky_until = {
+                key: until for key, until in self._sticky_until.items() if until > now
+            }
+        for key in keys:
+            if key:
+                self._sticky_until[key] = now + self.sticky_seconds
+    
+    def _engine(self) -> AsyncEngine:
+        """Get the next replica engine, creating the engines on first use."""
+        if self._next_engine is None:
+            self._engines = [
+                create_async_engine(
+                    url.replace("postgres://", "postgresql+asyncpg://", 1), pool_pre_ping=True
+                )
+                for url in self.replica_urls
+            ]
+            self._next_engine = itertools.cycle(self._engines)
+        return next(self._next_engine)
+    
+    @asynccontextmanager
+    async def reader(self, key: Optional[str] = None) -> AsyncIterator[Union[Database, Connection]]:
+        """
+        Get something to run a read-only query on.
+        
+        Args:
+            key: Wallet or user ID the read is for, used for read-your-writes
+            
+        Yields:
+            A replica connection, or the primary database if the read has
+            to see recent writes, no replica is configured or none is reachable
+        """
+        if not self.enabled or (key and self._sticky_until.get(key, 0) > time.monotonic()):
+            yield self.primary
+            return
+        
+        try:
+            replica_conn = await self._engine().connect()
+        except Exception as e:
+            logger.warning(f"Read replica unavailable, reading from primary: {e}")
+            replica_conn = None
+        
+        if replica_conn is None:
+            yield self.primary
+            return
+        
+        try:
+            yield Connection(replica_conn, self.primary.type, self.primary.name, self.primary.schema)
+        finally:
+            await replica_conn.close()
+
+
+read_router = ReadRouter(
+    db,
+    taproot_settings.db_replica_urls,
+    taproot_settings.db_replica_sticky_seconds
+)
+
 # Connect function that will be used during the migration process
 # This needs to return the database instance itself, which already has the proper async context manager
 def connect():
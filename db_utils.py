@@ -7,7 +7,7 @@ import functools
 import time
 import random
 from contextlib import asynccontextmanager
-from typing import Any, Callable, Dict, Optional, TypeVar, cast
+from typing import Any, Callable, Dict, List, Optional, TypeVar, cast
 from loguru import logger
 
 from sqlalchemy.ext.asyncio import AsyncConnection
@@ -88,6 +88,9 @@ async def transaction(conn=None, max_retries=3, retry_delay=0.1):
     """
     connection_pool._increment_stat('transactions_started')
     
+    # Callbacks registered with after_commit on a new connection
+    committed_callbacks: List[Callable[[], None]] = []
+    
     # If we're reusing a connection, we don't need to acquire the semaphore
     # as it should have been acquired by the parent transaction
     need_semaphore = conn is None
@@ -122,6 +125,7 @@ async def transaction(conn=None, max_retries=3, retry_delay=0.1):
                 # Get a new connection with a transaction
                 async with db.connect() as new_conn:
                     connection_pool._increment_stat('connections_created')
+                    committed_callbacks = new_conn._after_commit = []
                     try:
                         yield new_conn
                         # The connection context manager will commit automatically
@@ -178,6 +182,33 @@ async def transaction(conn=None, max_retries=3, retry_delay=0.1):
                 _transaction_semaphore.release()
                 logger.debug(f"Transaction semaphore released (available: {_transaction_semaphore._value})")
                 semaphore_acquired = False
+    
+    # The connection context manager has committed by now
+    for callback in committed_callbacks:
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"After-commit callback failed: {str(e)}")
+
+
+def after_commit(conn, callback: Callable[[], None]) -> None:
+    """
+    Run a callback once the transaction a connection belongs to has committed.
+    
+    Use this for in-memory state that must not change before other
+    connections can see the write. Callbacks are dropped if the transaction
+    rolls back. Connections not opened by transaction() have nothing to
+    wait for, so the callback runs right away.
+    
+    Args:
+        conn: The connection the write was made on
+        callback: Function to call after the commit
+    """
+    callbacks = getattr(conn, "_after_commit", None)
+    if callbacks is None:
+        callback()
+    else:
+        callbacks.append(callback)
 
 
 def with_transaction(func: Callable[..., Any]) -> Callable[..., Any]:
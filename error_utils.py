@@ -9,32 +9,53 @@ from http import HTTPStatus
 from loguru import logger
 
 from .logging_utils import log_error, log_warning, log_debug
+from .tracing import span
 
 class TaprootAssetError(Exception):
     """Base exception class for Taproot Assets extension."""
     pass
 
+class BackendUnavailableError(TaprootAssetError):
+    """Raised without calling tapd, lnd or the RFQ service while its circuit breaker is open."""
+    
+    def __init__(self, backend: str, retry_after: float):
+        """
+        Initialize the error.
+        
+        Args:
+            backend: The backend that is unavailable ("tapd", "lnd" or "rfq")
+            retry_after: Seconds until the backend is tried again
+        """
+        super().__init__(f"{backend} is unavailable, retry in {retry_after:.0f}s")
+        self.backend = backend
+        self.retry_after = retry_after
+
 class ErrorContext:
     """
     Context manager for standardized error handling.
-    Provides consistent error handling and logging across the codebase.
+    Provides consistent error handling and logging across the codebase,
+    and records the block as a tracing span.
     """
     
-    def __init__(self, context: str, log_category: str = None):
+    def __init__(self, context: str, log_category: str = None, **attributes: Any):
         """
         Initialize the error context.
         
         Args:
             context: A string describing the context where this error might occur
             log_category: Optional category for logging
+            **attributes: Span attributes, e.g. payment_hash or asset_id
         """
         self.context = context
         self.log_category = log_category
+        self.span = span(context, **attributes)
         
     def __enter__(self):
+        self.span.__enter__()
         return self
         
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self.span.__exit__(exc_type, exc_val, exc_tb)
         if exc_type is not None:
             # Log the error with context
             if self.log_category:
@@ -102,7 +123,8 @@ def raise_http_exception(
 def handle_api_error(func):
     """
     Decorator for API endpoints to standardize error handling.
-    Catches exceptions and returns appropriate HTTP responses.
+    Catches exceptions and returns appropriate HTTP responses, and records
+    the request as the root span of a trace.
     
     Args:
         func: The API endpoint function to wrap
@@ -114,29 +136,37 @@ def handle_api_error(func):
     
     @functools.wraps(func)
     async def wrapper(*args, **kwargs):
-        try:
-            return await func(*args, **kwargs)
-        except HTTPException:
-            # Re-raise HTTP exceptions as they're already properly formatted
-            raise
-        except Exception as e:
-            # Get function name for better error context
-            function_name = func.__name__
-            
-            # Log the error with traceback
-            log_error("API", f"Error in {function_name}: {str(e)}")
-            log_debug("API", f"Traceback: {traceback.format_exc()}")
-            
-            # Determine appropriate status code based on error type
-            status_code = HTTPStatus.INTERNAL_SERVER_ERROR
-            
-            # Create user-friendly error message
-            detail = f"API Error: {str(e)}"
-            
-            # Raise properly formatted HTTP exception
-            raise_http_exception(
-                status_code=status_code,
-                detail=detail
-            )
+        with span(f"api.{func.__name__}", kind="server"):
+            try:
+                return await func(*args, **kwargs)
+            except HTTPException:
+                # Re-raise HTTP exceptions as they're already properly formatted
+                raise
+            except BackendUnavailableError as e:
+                # Fail fast with 503 while a backend's circuit breaker is open
+                raise_http_exception(
+                    status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                    detail=str(e),
+                    headers={"Retry-After": str(max(1, int(e.retry_after)))}
+                )
+            except Exception as e:
+                # Get function name for better error context
+                function_name = func.__name__
+                
+                # Log the error with traceback
+                log_error("API", f"Error in {function_name}: {str(e)}")
+                log_debug("API", f"Traceback: {traceback.format_exc()}")
+                
+                # Determine appropriate status code based on error type
+                status_code = HTTPStatus.INTERNAL_SERVER_ERROR
+                
+                # Create user-friendly error message
+                detail = f"API Error: {str(e)}"
+                
+                # Raise properly formatted HTTP exception
+                raise_http_exception(
+                    status_code=status_code,
+                    detail=detail
+                )
     
     return wrapper
@@ -2,9 +2,14 @@
 Standardized logging utilities for the Taproot Assets extension.
 Provides consistent logging patterns and utilities.
 """
-from typing import Any, Dict, Optional
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 from loguru import logger
 
+from .tapd_settings import taproot_settings
+from .tracing import span
+
 # Component prefixes for consistent logging
 WALLET = "WALLET"
 NODE = "NODE"
@@ -29,6 +34,126 @@ LOG_LEVELS = {
     "critical": 50
 }
 
+# Minimum level per component; components not listed use _default_level
+_component_levels: Dict[str, int] = {}
+_default_level = LOG_LEVELS["debug"]
+
+
+def configure_log_levels(spec: str) -> None:
+    """
+    Set per-component minimum levels from a spec like "PAYMENT=info,WS=warning".
+    
+    A "*" entry sets the level of every component not listed. Messages
+    below a component's level are dropped before they are formatted or
+    reach loguru, whose own handler levels still apply on top.
+    
+    Args:
+        spec: Comma-separated component=level pairs
+    """
+    global _default_level
+    _component_levels.clear()
+    _default_level = LOG_LEVELS["debug"]
+    
+    for entry in spec.split(","):
+        component, _, level = entry.partition("=")
+        component, level = component.strip(), level.strip().lower()
+        if not component or level not in LOG_LEVELS:
+            continue
+        if component == "*":
+            _default_level = LOG_LEVELS[level]
+        else:
+            _component_levels[component] = LOG_LEVELS[level]
+
+
+def is_enabled(component: str, level: str) -> bool:
+    """
+    Check whether a component logs at a level.
+    
+    Use this to skip work done only for logging, such as an extra RPC.
+    
+    Args:
+        component: The component identifier (use constants from this module)
+        level: Log level (debug, info, warning, error, critical)
+        
+    Returns:
+        bool: Whether messages at this level are kept for the component
+    """
+    return LOG_LEVELS[level] >= _component_levels.get(component, _default_level)
+
+
+class _Sampler:
+    """Per-key rate limit for high-frequency messages."""
+    
+    # Maximum number of sample keys tracked
+    MAX_KEYS = 1000
+    
+    # key -> (start of the current window, messages suppressed in it)
+    _windows: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+    
+    @classmethod
+    def allow(cls, key: str, interval: float) -> Tuple[bool, int]:
+        """Check whether a message may be logged; returns (allowed, suppressed since the last one)."""
+        now = time.monotonic()
+        window = cls._windows.get(key)
+        if window is not None and now - window[0] < interval:
+            cls._windows[key] = (window[0], window[1] + 1)
+            return False, 0
+        
+        cls._windows[key] = (now, 0)
+        cls._windows.move_to_end(key)
+        while len(cls._windows) > cls.MAX_KEYS:
+            cls._windows.popitem(last=False)
+        return True, window[1] if window is not None else 0
+
+
+def _format_event(component: str, event: str, fields: Dict[str, Any], suppressed: int) -> str:
+    """Render an event and its fields as "[COMPONENT] event key=value ..."."""
+    parts = [f"[{component}] {event}"]
+    for key, value in fields.items():
+        if callable(value):
+            value = value()
+        parts.append(f"{key}={value}")
+    if suppressed:
+        parts.append(f"suppressed={suppressed}")
+    return " ".join(parts)
+
+
+def log_event(
+    component: str,
+    level: str,
+    event: str,
+    sample: Optional[str] = None,
+    **fields: Any
+) -> None:
+    """
+    Log a structured event with key=value fields, formatted only if it is emitted.
+    
+    Nothing is formatted when the component's level or loguru's handlers
+    drop the message, so fields may hold large objects; callable field
+    values are called only then too. With a sample key, at most one message
+    per key is logged every TAPD_LOG_SAMPLE_SECONDS, and the next one
+    carries the number suppressed in between.
+    
+    Args:
+        component: The component identifier (use constants from this module)
+        level: Log level (debug, info, warning, error, critical)
+        event: Short, constant description of the event
+        sample: Optional sample key for rate limiting
+        **fields: Values to include as key=value pairs
+    """
+    if not is_enabled(component, level):
+        return
+    
+    suppressed = 0
+    if sample is not None:
+        allowed, suppressed = _Sampler.allow(f"{component}:{sample}", taproot_settings.log_sample_seconds)
+        if not allowed:
+            return
+    
+    logger.opt(depth=1, lazy=True).log(
+        level.upper(), "{}", lambda: _format_event(component, event, fields, suppressed)
+    )
+
 
 def log_debug(component: str, message: str, **kwargs) -> None:
     """
@@ -39,6 +164,8 @@ def log_debug(component: str, message: str, **kwargs) -> None:
         message: The message to log
         **kwargs: Additional parameters to pass to the logger
     """
+    if not is_enabled(component, "debug"):
+        return
     logger.debug(f"[{component}] {message}", **kwargs)
 
 
@@ -51,6 +178,8 @@ def log_info(component: str, message: str, **kwargs) -> None:
         message: The message to log
         **kwargs: Additional parameters to pass to the logger
     """
+    if not is_enabled(component, "info"):
+        return
     logger.info(f"[{component}] {message}", **kwargs)
 
 
@@ -63,6 +192,8 @@ def log_warning(component: str, message: str, **kwargs) -> None:
         message: The message to log
         **kwargs: Additional parameters to pass to the logger
     """
+    if not is_enabled(component, "warning"):
+        return
     logger.warning(f"[{component}] {message}", **kwargs)
 
 
@@ -76,6 +207,8 @@ def log_error(component: str, message: str, exc_info: bool = False, **kwargs) ->
         exc_info: Whether to include exception info in the log
         **kwargs: Additional parameters to pass to the logger
     """
+    if not is_enabled(component, "error"):
+        return
     logger.error(f"[{component}] {message}", exc_info=exc_info, **kwargs)
 
 
@@ -89,6 +222,8 @@ def log_critical(component: str, message: str, exc_info: bool = False, **kwargs)
         exc_info: Whether to include exception info in the log
         **kwargs: Additional parameters to pass to the logger
     """
+    if not is_enabled(component, "critical"):
+        return
     logger.critical(f"[{component}] {message}", exc_info=exc_info, **kwargs)
 
 
@@ -120,6 +255,7 @@ def log_exception(component: str, exception: Exception, context: str = "", level
 class LogContext:
     """
     Context manager for standardized logging within a component.
+    The operation is also recorded as a tracing span.
     
     Example:
         with LogContext(PAYMENT, "processing invoice"):
@@ -127,7 +263,7 @@ class LogContext:
             # Automatically logs start and completion/error
     """
     
-    def __init__(self, component: str, operation: str, log_level: str = "debug"):
+    def __init__(self, component: str, operation: str, log_level: str = "debug", **attributes: Any):
         """
         Initialize the logging context.
         
@@ -135,13 +271,16 @@ class LogContext:
             component: The component identifier (use constants from this module)
             operation: Description of the operation being performed
             log_level: The log level to use for start/complete messages
+            **attributes: Span attributes, e.g. payment_hash or asset_id
         """
         self.component = component
         self.operation = operation
         self.log_level = log_level
+        self.span = span(operation, component=component, **attributes)
         
     def __enter__(self):
         """Log the start of the operation."""
+        self.span.__enter__()
         if self.log_level == "debug":
             log_debug(self.component, f"Starting {self.operation}")
         elif self.log_level == "info":
@@ -150,6 +289,7 @@ class LogContext:
         
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Log the completion or error of the operation."""
+        self.span.__exit__(exc_type, exc_val, exc_tb)
         if exc_val:
             log_exception(self.component, exc_val, f"Error in {self.operation}")
             return False
@@ -159,3 +299,6 @@ class LogContext:
         elif self.log_level == "info":
             log_info(self.component, f"Completed {self.operation}")
         return True
+
+
+configure_log_levels(taproot_settings.log_levels)
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from loguru import logger
 from .db import get_table_name
 
@@ -270,3 +272,332 @@ async def m007_add_extra_to_invoices(db):
     except Exception as e:
         # Column might already exist
         logger.warning(f"Error in migration m007_add_extra_to_invoices: {str(e)}")
+
+
+async def m008_create_payment_metadata_table(db):
+    """
+    Migration to create a table for per-payment-hash metadata
+    (preimages, asset IDs, script keys and settled flags).
+    """
+    try:
+        metadata_table = get_table_name("payment_metadata")
+        
+        await db.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {metadata_table} (
+                payment_hash TEXT PRIMARY KEY,
+                preimage TEXT,
+                asset_id TEXT,
+                script_key TEXT,
+                settled BOOLEAN NOT NULL DEFAULT FALSE,
+                created_at TIMESTAMP NOT NULL DEFAULT {db.timestamp_now},
+                updated_at TIMESTAMP NOT NULL DEFAULT {db.timestamp_now}
+            );
+            """
+        )
+        
+        # Use table name without schema for SQLite
+        index_table = metadata_table.split(".")[-1] if db.type == "SQLITE" else metadata_table
+        
+        await db.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS payment_metadata_script_key_idx
+            ON {index_table} (script_key);
+            """
+        )
+        
+        await db.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS payment_metadata_updated_at_idx
+            ON {index_table} (updated_at);
+            """
+        )
+        
+        logger.info("Created payment_metadata table")
+    except Exception as e:
+        logger.warning(f"Error in migration m008_create_payment_metadata_table: {str(e)}")
+
+
+async def m009_add_pending_invoice_expiry_index(db):
+    """
+    Migration to add a partial index over pending invoices by expiry,
+    used by the invoice expiry reaper.
+    """
+    try:
+        invoices_table = get_table_name("invoices")
+        
+        # Use table name without schema for SQLite
+        index_table = invoices_table.split(".")[-1] if db.type == "SQLITE" else invoices_table
+        
+        await db.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS invoices_pending_expires_at_idx
+            ON {index_table} (expires_at)
+            WHERE status = 'pending';
+            """
+        )
+        
+        logger.info("Added pending invoice expiry index")
+    except Exception as e:
+        logger.warning(f"Error in migration m009_add_pending_invoice_expiry_index: {str(e)}")
+
+
+async def m010_add_pagination_indexes(db):
+    """
+    Migration to add composite (owner, created_at, id) indexes used by
+    keyset pagination of invoices, payments and asset transactions.
+    """
+    try:
+        invoices_table = get_table_name("invoices")
+        payments_table = get_table_name("payments")
+        transactions_table = get_table_name("asset_transactions")
+        
+        # Use table names without schema for SQLite indexes
+        invoices_index_table = invoices_table.split(".")[-1] if db.type == "SQLITE" else invoices_table
+        payments_index_table = payments_table.split(".")[-1] if db.type == "SQLITE" else payments_table
+        transactions_index_table = transactions_table.split(".")[-1] if db.type == "SQLITE" else transactions_table
+        
+        await db.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS invoices_user_created_at_id_idx
+            ON {invoices_index_table} (user_id, created_at, id);
+            """
+        )
+        
+        await db.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS payments_user_created_at_id_idx
+            ON {payments_index_table} (user_id, created_at, id);
+            """
+        )
+        
+        await db.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS asset_transactions_wallet_created_at_id_idx
+            ON {transactions_index_table} (wallet_id, created_at, id);
+            """
+        )
+        
+        await db.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS asset_transactions_wallet_asset_created_at_id_idx
+            ON {transactions_index_table} (wallet_id, asset_id, created_at, id);
+            """
+        )
+        
+        logger.info("Added pagination indexes for Taproot Assets tables")
+    except Exception as e:
+        logger.warning(f"Error in migration m010_add_pagination_indexes: {str(e)}")
+
+
+async def m011_add_composite_and_unique_indexes(db):
+    """
+    Migration to add composite indexes for the remaining filter-and-sort
+    queries, make invoices.payment_hash unique and drop single-column
+    indexes that are now prefixes of composite ones.
+    """
+    try:
+        invoices_table = get_table_name("invoices")
+        balances_table = get_table_name("asset_balances")
+        assets_table = get_table_name("assets")
+        
+        # Use table names without schema for SQLite indexes
+        invoices_index_table = invoices_table.split(".")[-1] if db.type == "SQLITE" else invoices_table
+        balances_index_table = balances_table.split(".")[-1] if db.type == "SQLITE" else balances_table
+        assets_index_table = assets_table.split(".")[-1] if db.type == "SQLITE" else assets_table
+        
+        # Balances for a wallet are listed newest first
+        await db.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS asset_balances_wallet_updated_at_idx
+            ON {balances_index_table} (wallet_id, updated_at);
+            """
+        )
+        
+        # Assets for a user are listed newest first
+        await db.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS assets_user_created_at_idx
+            ON {assets_index_table} (user_id, created_at);
+            """
+        )
+        
+        # Only enforce uniqueness if existing data allows it
+        duplicate = await db.fetchone(
+            f"""
+            SELECT payment_hash FROM {invoices_table}
+            GROUP BY payment_hash
+            HAVING COUNT(*) > 1
+            LIMIT 1
+            """
+        )
+        if duplicate:
+            logger.warning(
+                "Duplicate invoice payment hashes found, keeping non-unique invoices_payment_hash_idx"
+            )
+            redundant_indexes = []
+        else:
+            await db.execute(
+                f"""
+                CREATE UNIQUE INDEX IF NOT EXISTS invoices_payment_hash_unique_idx
+                ON {invoices_index_table} (payment_hash);
+                """
+            )
+            redundant_indexes = ["invoices_payment_hash_idx"]
+        
+        # Covered by the (owner, created_at, id) pagination indexes, the
+        # (wallet_id, asset_id) unique constraint and the indexes above
+        redundant_indexes += [
+            "invoices_user_id_idx",
+            "payments_user_id_idx",
+            "asset_transactions_wallet_id_idx",
+            "asset_balances_wallet_id_idx",
+            "assets_user_id_idx",
+        ]
+        for index_name in redundant_indexes:
+            # Indexes live in the table's schema on Postgres
+            await db.execute(f"DROP INDEX IF EXISTS {get_table_name(index_name)};")
+        
+        logger.info("Added composite and unique indexes for Taproot Assets tables")
+    except Exception as e:
+        logger.warning(f"Error in migration m011_add_composite_and_unique_indexes: {str(e)}")
+
+
+async def m012_create_asset_transaction_daily_table(db):
+    """
+    Migration to create the daily rollup of asset transactions per wallet
+    and asset, and backfill it from the existing ledger.
+    """
+    try:
+        daily_table = get_table_name("asset_transaction_daily")
+        
+        await db.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {daily_table} (
+                wallet_id TEXT NOT NULL,
+                asset_id TEXT NOT NULL,
+                day TEXT NOT NULL, -- ISO date, YYYY-MM-DD
+                credit_amount {db.big_int} NOT NULL DEFAULT 0,
+                debit_amount {db.big_int} NOT NULL DEFAULT 0,
+                credit_count INTEGER NOT NULL DEFAULT 0,
+                debit_count INTEGER NOT NULL DEFAULT 0,
+                fee_total {db.big_int} NOT NULL DEFAULT 0,
+                PRIMARY KEY (wallet_id, asset_id, day)
+            );
+            """
+        )
+        
+        existing = await db.fetchone(f"SELECT COUNT(*) AS count FROM {daily_table}")
+        if existing and existing["count"]:
+            return
+        
+        # Days are UTC, as in crud.transaction_history.utc_day: SQLite stores
+        # timestamps as Unix epochs and Postgres stores the UTC wall time
+        if db.type == "SQLITE":
+            day = (
+                "CASE WHEN typeof(created_at) IN ('integer', 'real') "
+                "THEN date(created_at, 'unixepoch') ELSE date(created_at) END"
+            )
+        else:
+            day = "to_char(created_at, 'YYYY-MM-DD')"
+        
+        await db.execute(
+            f"""
+            INSERT INTO {daily_table}
+            (wallet_id, asset_id, day, credit_amount, debit_amount, credit_count, debit_count, fee_total)
+            SELECT wallet_id, asset_id, {day},
+                   SUM(CASE WHEN type = 'credit' THEN amount ELSE 0 END),
+                   SUM(CASE WHEN type = 'credit' THEN 0 ELSE amount END),
+                   SUM(CASE WHEN type = 'credit' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN type = 'credit' THEN 0 ELSE 1 END),
+                   SUM(COALESCE(fee, 0))
+            FROM {get_table_name("asset_transactions")}
+            GROUP BY wallet_id, asset_id, {day}
+            """
+        )
+        row = await db.fetchone(f"SELECT COUNT(*) AS count FROM {daily_table}")
+        count = row["count"] if row else 0
+        
+        logger.info(f"Created asset transaction daily rollups ({count} rows backfilled)")
+    except Exception as e:
+        logger.warning(f"Error in migration m012_create_asset_transaction_daily_table: {str(e)}")
+
+
+async def m013_create_balance_checkpoints_table(db):
+    """
+    Migration to create the balance checkpoints table used to verify
+    asset balances against the transaction ledger incrementally.
+    
+    Every stored balance gets a baseline checkpoint at its newest
+    transaction holding the stored balance, so credits made before every
+    balance change was written to the ledger don't show up as drift; drift
+    is measured from here on.
+    """
+    try:
+        from lnbits.helpers import urlsafe_short_hash
+        
+        checkpoints_table = get_table_name("balance_checkpoints")
+        transactions_table = get_table_name("asset_transactions")
+        
+        await db.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {checkpoints_table} (
+                id TEXT PRIMARY KEY,
+                wallet_id TEXT NOT NULL,
+                asset_id TEXT NOT NULL,
+                balance {db.big_int} NOT NULL,
+                last_tx_id TEXT NOT NULL,
+                last_tx_created_at TIMESTAMP NOT NULL,
+                created_at TIMESTAMP NOT NULL DEFAULT {db.timestamp_now}
+            );
+            """
+        )
+        
+        # Use table name without schema for SQLite
+        index_table = checkpoints_table.split(".")[-1] if db.type == "SQLITE" else checkpoints_table
+        
+        await db.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS balance_checkpoints_wallet_asset_last_tx_idx
+            ON {index_table} (wallet_id, asset_id, last_tx_created_at, last_tx_id);
+            """
+        )
+        
+        existing = await db.fetchone(f"SELECT COUNT(*) AS count FROM {checkpoints_table}")
+        if existing and existing["count"]:
+            return
+        
+        balances = await db.fetchall(
+            f"SELECT wallet_id, asset_id, balance FROM {get_table_name('asset_balances')}"
+        )
+        now = datetime.now()
+        for balance in balances:
+            last_tx = await db.fetchone(
+                f"""
+                SELECT id, created_at FROM {transactions_table}
+                WHERE wallet_id = :wallet_id AND asset_id = :asset_id
+                ORDER BY created_at DESC, id DESC
+                LIMIT 1
+                """,
+                {"wallet_id": balance["wallet_id"], "asset_id": balance["asset_id"]}
+            )
+            await db.execute(
+                f"""
+                INSERT INTO {checkpoints_table}
+                (id, wallet_id, asset_id, balance, last_tx_id, last_tx_created_at, created_at)
+                VALUES (:id, :wallet_id, :asset_id, :balance, :last_tx_id, :last_tx_created_at, :created_at)
+                """,
+                {
+                    "id": urlsafe_short_hash(),
+                    "wallet_id": balance["wallet_id"],
+                    "asset_id": balance["asset_id"],
+                    "balance": balance["balance"],
+                    "last_tx_id": last_tx["id"] if last_tx else "",
+                    "last_tx_created_at": last_tx["created_at"] if last_tx else now,
+                    "created_at": now
+                }
+            )
+        
+        logger.info(f"Created balance checkpoints table ({len(balances)} baseline checkpoints)")
+    except Exception as e:
+        logger.warning(f"Error in migration m013_create_balance_checkpoints_table: {str(e)}")
@@ -1,6 +1,7 @@
-from datetime import datetime
+import json
+from datetime import datetime, timezone
 from http import HTTPStatus
-from typing import Optional, List, Dict, Any, Generic, TypeVar, Union
+from typing import Optional, List, Dict, Any, Generic, NamedTuple, TypeVar, Union
 
 from pydantic import BaseModel, Field
 
@@ -42,6 +43,16 @@ class TaprootPaymentRequest(BaseModel):
     fee_limit_sats: Optional[int] = 10  # Default to 10 sats fee limit
     peer_pubkey: Optional[str] = None  # Add peer_pubkey for multi-channel support
     asset_id: Optional[str] = None  # Add asset_id to specify which asset to use for payment
+    async_payment: Optional[bool] = False  # Return a payment job immediately instead of waiting for the result
+
+
+class TaprootBatchPaymentRequest(BaseModel):
+    """Request model for paying many Taproot Asset invoices in one call."""
+    payment_requests: List[str]
+    fee_limit_sats: Optional[int] = 10  # Fee limit applied to each payment
+    peer_pubkey: Optional[str] = None  # Force a single channel peer for all payments
+    asset_id: Optional[str] = None  # Asset to use for payments that don't specify one
+    max_concurrency_per_channel: Optional[int] = 4  # Parallel SendPayment streams per asset channel
 
 
 class TaprootInvoice(BaseModel):
@@ -62,6 +73,147 @@ class TaprootInvoice(BaseModel):
     extra: Optional[dict] = None  # Store metadata from other extensions
 
 
+class InvoiceStatus(NamedTuple):
+    """Status-only projection of an invoice row."""
+    id: str
+    payment_hash: str
+    status: str
+
+
+class InvoiceOwner(NamedTuple):
+    """Ownership-only projection of an invoice row."""
+    id: str
+    payment_hash: str
+    user_id: str
+    wallet_id: str
+
+
+def parse_datetime(value: Union[datetime, str, int, float]) -> datetime:
+    """
+    Parse a timestamp column the way a datetime model field is validated.
+
+    SQLite rows hold Unix epochs (as numbers or numeric strings) and Postgres
+    rows hold datetimes; ISO 8601 strings are accepted too. Epochs are
+    returned in UTC, and values too large to be seconds are read as
+    milliseconds. This doesn't depend on the installed pydantic version.
+    """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            text = value.strip()
+            if text[-1:] in ("Z", "z"):
+                text = text[:-1] + "+00:00"
+            return datetime.fromisoformat(text)
+    seconds = float(value)
+    if abs(seconds) > 2e10:
+        seconds /= 1000
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+
+def decode_invoice_extra(value: Any) -> Optional[dict]:
+    """Decode the JSON stored in an invoice's extra column."""
+    if value and isinstance(value, str):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return None
+    return value
+
+
+class InvoiceSummary:
+    """
+    Invoice row for listings, without model validation.
+
+    Plain columns are read straight from the row. The extra column is decoded
+    and the full TaprootInvoice is built only when first accessed.
+    """
+
+    __slots__ = ("_row", "_extra", "_invoice")
+
+    _UNSET = object()
+
+    def __init__(self, row: Dict[str, Any]):
+        self._row = row
+        self._extra = self._UNSET
+        self._invoice = None
+
+    @property
+    def id(self) -> str:
+        return self._row["id"]
+
+    @property
+    def payment_hash(self) -> str:
+        return self._row["payment_hash"]
+
+    @property
+    def status(self) -> str:
+        return self._row["status"]
+
+    @property
+    def asset_id(self) -> str:
+        return self._row["asset_id"]
+
+    @property
+    def asset_amount(self) -> int:
+        return self._row["asset_amount"]
+
+    @property
+    def user_id(self) -> str:
+        return self._row["user_id"]
+
+    @property
+    def wallet_id(self) -> str:
+        return self._row["wallet_id"]
+
+    @property
+    def created_at(self) -> datetime:
+        return parse_datetime(self._row["created_at"])
+
+    @property
+    def extra(self) -> Optional[dict]:
+        if self._extra is self._UNSET:
+            self._extra = decode_invoice_extra(self._row.get("extra"))
+        return self._extra
+
+    @property
+    def invoice(self) -> TaprootInvoice:
+        """The full invoice model, built on first access."""
+        if self._invoice is None:
+            self._invoice = TaprootInvoice(**{**self._row, "extra": self.extra})
+        return self._invoice
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The invoice as a dict with the same fields as TaprootInvoice.dict()."""
+        data = dict(self._row)
+        data["extra"] = self.extra
+        for field in ("created_at", "expires_at", "paid_at"):
+            if data.get(field) is not None:
+                data[field] = parse_datetime(data[field])
+        return data
+
+
+class InvoiceClassification(BaseModel):
+    """Classification of a payment hash against the invoices stored on this node."""
+    payment_hash: str
+    payment_type: str = "external"  # Can be "external", "internal" or "self"
+    invoice: Optional[TaprootInvoice] = None  # Local invoice for internal and self payments
+    owner_user_id: Optional[str] = None
+    owner_wallet_id: Optional[str] = None
+
+    @property
+    def is_internal(self) -> bool:
+        """Whether the invoice belongs to any user on this node."""
+        return self.payment_type in ("internal", "self")
+
+    @property
+    def is_self(self) -> bool:
+        """Whether the invoice belongs to the paying user."""
+        return self.payment_type == "self"
+
+
 class TaprootPayment(BaseModel):
     """Model for a Taproot Asset payment."""
     id: str
@@ -102,6 +254,72 @@ class AssetTransaction(BaseModel):
     created_at: datetime
 
 
+class BalanceCheckpoint(BaseModel):
+    """Ledger-derived balance of one wallet and asset over all transactions created up to last_tx_created_at."""
+    id: str
+    wallet_id: str
+    asset_id: str
+    balance: int
+    last_tx_id: str
+    last_tx_created_at: datetime
+    created_at: datetime
+
+
+class BalanceVerification(BaseModel):
+    """Result of checking a stored asset balance against the ledger."""
+    wallet_id: str
+    asset_id: str
+    recorded_balance: int  # asset_balances.balance
+    ledger_balance: int  # Last checkpoint plus newer transactions
+    drift: int  # recorded_balance - ledger_balance
+    transactions_checked: int  # Transactions summed since the previous checkpoint
+
+
+class BalanceAsOf(BaseModel):
+    """Ledger balance of one wallet and asset at a point in time."""
+    wallet_id: str
+    asset_id: str
+    balance: int
+    as_of: datetime
+
+
+class AssetDailyHistory(BaseModel):
+    """Daily rollup of asset transactions for one wallet and asset."""
+    wallet_id: str
+    asset_id: str
+    day: str  # ISO date, YYYY-MM-DD
+    credit_amount: int = 0
+    debit_amount: int = 0
+    credit_count: int = 0
+    debit_count: int = 0
+    fee_total: int = 0
+
+
+class AssetHistorySummary(BaseModel):
+    """Per-asset transaction totals over a date range, with the current balance."""
+    asset_id: str
+    start_day: str
+    end_day: str
+    credit_amount: int = 0
+    debit_amount: int = 0
+    credit_count: int = 0
+    debit_count: int = 0
+    fee_total: int = 0
+    net_amount: int = 0  # credit_amount - debit_amount
+    balance: int = 0  # Current balance, independent of the range
+
+
+class PaymentMetadata(BaseModel):
+    """Model for metadata attached to a payment hash."""
+    payment_hash: str
+    preimage: Optional[str] = None
+    asset_id: Optional[str] = None
+    script_key: Optional[str] = None
+    settled: bool = False
+    created_at: datetime
+    updated_at: datetime
+
+
 # API Response Models
 
 class ErrorDetail(BaseModel):
@@ -177,6 +395,36 @@ class PaymentResponse(BaseModel):
     lnurl_success_action: Optional[Dict[str, Any]] = None  # LNURL success action if present
 
 
+class PaymentJob(BaseModel):
+    """Status of a payment submitted for background processing."""
+    id: str
+    payment_hash: str
+    user_id: str
+    wallet_id: str
+    status: str = "pending"  # Can be "pending", "success" or "failed"
+    created_at: datetime
+    updated_at: datetime
+    error: Optional[str] = None
+    result: Optional[PaymentResponse] = None
+
+
+class BatchPaymentReport(BaseModel):
+    """Aggregated result of a batch payment run."""
+    total: int
+    succeeded: int
+    failed: int
+    total_asset_amount: Dict[str, int] = {}  # Paid amount per asset ID
+    total_fee_sats: int = 0
+    unrecorded: List[str] = []  # Hashes of payments sent but not recorded in the database
+    results: List[PaymentResponse] = []
+
+
+class PaginatedResponse(BaseModel):
+    """One page of a keyset-paginated list."""
+    data: List[Any]
+    next_cursor: Optional[str] = None  # Pass as cursor to fetch the next page; None on the last page
+
+
 class ParsedInvoice(BaseModel):
     """Model for parsed invoice data."""
     payment_hash: str
@@ -3,13 +3,17 @@ Asset service for Taproot Assets extension.
 Handles asset-related business logic.
 """
 from typing import Dict, Any, Optional, List, Tuple, Union
+from datetime import date, datetime, timedelta, timezone
 from http import HTTPStatus
 from loguru import logger
 
 from lnbits.core.models import WalletTypeInfo, User
 from lnbits.core.crud import get_user
 
-from ..models import TaprootAsset, AssetBalance, AssetTransaction
+from ..models import (
+    TaprootAsset, AssetBalance, AssetTransaction, PaginatedResponse,
+    AssetHistorySummary, AssetDailyHistory
+)
 from ..tapd.taproot_factory import TaprootAssetsFactory
 from ..error_utils import raise_http_exception, ErrorContext
 from ..logging_utils import API, ASSET, log_info, log_warning, log_error
@@ -21,6 +25,7 @@ from ..crud import (
     get_asset_transactions
 )
 from .notification_service import NotificationService
+from .asset_state_store import AssetStateStore
 from .transaction_service import TransactionService
 
 
@@ -34,6 +39,10 @@ class AssetService:
     and without user context (get_raw_assets).
     """
     
+    # Default and maximum length of a history date range, in days
+    DEFAULT_HISTORY_DAYS = 30
+    MAX_HISTORY_DAYS = 366
+    
     @staticmethod
     async def list_assets(wallet: WalletTypeInfo, auto_sync: bool = True) -> List[Dict[str, Any]]:
         """
@@ -48,7 +57,9 @@ class AssetService:
             auto_sync: Whether to auto-sync balances with tapd (default True)
 
         Returns:
-            List[Dict[str, Any]]: List of assets with balance information
+            List[Dict[str, Any]]: List of assets with balance information; while
+                tapd or lnd is failing, the last good listing with "stale" and
+                "as_of" set on every asset, and without syncing or notifying
         """
         with ErrorContext("list_assets", ASSET):
             # Create a wallet instance using the factory
@@ -59,6 +70,8 @@ class AssetService:
 
             # Get assets from tapd - force refresh to ensure we have latest channel balances
             assets_data = await taproot_wallet.node.asset_manager.list_assets(force_refresh=True)
+            # Served from the last good listing while tapd or lnd is failing
+            stale = bool(assets_data) and assets_data[0].get("stale", False)
 
             # Get user information
             user = await get_user(wallet.wallet.user)
@@ -67,7 +80,7 @@ class AssetService:
 
             # Auto-sync balances with tapd if enabled
             # This ensures user_balance always matches actual tapd channel balances
-            if auto_sync:
+            if auto_sync and not stale:
                 try:
                     await AssetService.sync_balances_with_tapd(wallet)
                 except Exception as e:
@@ -88,12 +101,31 @@ class AssetService:
                 else:
                     asset["user_balance"] = 0
 
-            # Send WebSocket notification with assets data using NotificationService
-            if assets_data:
+            # Send the changes since the last notification, if any, using NotificationService
+            if assets_data and not stale:
                 await NotificationService.notify_assets_update(wallet.wallet.user, assets_data)
 
             return assets_data
     
+    @staticmethod
+    async def get_asset_state(wallet: WalletTypeInfo) -> Dict[str, Any]:
+        """
+        Get the current asset catalog and the user's balances with their sequence numbers.
+        
+        Used by clients to resync when they miss a catalog or balances delta,
+        and to learn the catalog channel. The assets are listed first, so the
+        state is current.
+        
+        Args:
+            wallet: The wallet information
+            
+        Returns:
+            Dict[str, Any]: See AssetStateStore.snapshot
+        """
+        with ErrorContext("get_asset_state", ASSET):
+            await AssetService.list_assets(wallet, auto_sync=False)
+            return AssetStateStore.snapshot(wallet.wallet.user)
+    
     @staticmethod
     async def get_raw_assets(force_refresh=False) -> List[Dict[str, Any]]:
         """
@@ -160,25 +192,102 @@ class AssetService:
     async def get_asset_transactions(
         wallet: WalletTypeInfo,
         asset_id: Optional[str] = None,
-        limit: int = 100
-    ) -> List[AssetTransaction]:
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> PaginatedResponse:
         """
-        Get asset transactions for the current wallet.
+        Get a page of asset transactions for the current wallet.
 
         Args:
             wallet: The wallet information
             asset_id: Optional asset ID to filter transactions
             limit: Maximum number of transactions to return
+            cursor: Cursor returned with the previous page, None for the first page
 
         Returns:
-            List[AssetTransaction]: List of asset transactions
+            PaginatedResponse: Transactions, newest first, and the cursor for the next page
 
         Raises:
-            HTTPException: If there's an error retrieving asset transactions
+            HTTPException: If the cursor is invalid or there's an error retrieving asset transactions
         """
         with ErrorContext("get_asset_transactions", ASSET):
-            transactions = await get_asset_transactions(wallet.wallet.id, asset_id, limit)
-            return transactions
+            try:
+                transactions, next_cursor = await get_asset_transactions(wallet.wallet.id, asset_id, limit, cursor)
+            except ValueError as e:
+                raise_http_exception(
+                    status_code=HTTPStatus.BAD_REQUEST,
+                    detail=str(e),
+                )
+            return PaginatedResponse(data=transactions, next_cursor=next_cursor)
+
+    @staticmethod
+    def _history_range(start: Optional[date], end: Optional[date]) -> Tuple[date, date]:
+        """Apply the default history range and validate it."""
+        end = end or datetime.now(timezone.utc).date()
+        start = start or end - timedelta(days=AssetService.DEFAULT_HISTORY_DAYS - 1)
+        if start > end:
+            raise_http_exception(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail="start must not be after end",
+            )
+        if (end - start).days >= AssetService.MAX_HISTORY_DAYS:
+            raise_http_exception(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=f"Date range must not exceed {AssetService.MAX_HISTORY_DAYS} days",
+            )
+        return start, end
+
+    @staticmethod
+    async def get_history_summary(
+        wallet: WalletTypeInfo,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        asset_id: Optional[str] = None
+    ) -> List[AssetHistorySummary]:
+        """
+        Get per-asset transaction totals for the current wallet over a date range.
+
+        Args:
+            wallet: The wallet information
+            start: First day of the range, defaults to DEFAULT_HISTORY_DAYS before end
+            end: Last day of the range, defaults to today (UTC)
+            asset_id: Optional asset ID to filter by
+
+        Returns:
+            List[AssetHistorySummary]: One summary per asset
+
+        Raises:
+            HTTPException: If the date range is invalid
+        """
+        with ErrorContext("get_history_summary", ASSET):
+            start, end = AssetService._history_range(start, end)
+            return await TransactionService.get_history_summary(wallet.wallet.id, start, end, asset_id)
+
+    @staticmethod
+    async def get_daily_history(
+        wallet: WalletTypeInfo,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        asset_id: Optional[str] = None
+    ) -> List[AssetDailyHistory]:
+        """
+        Get daily transaction totals for the current wallet over a date range.
+
+        Args:
+            wallet: The wallet information
+            start: First day of the range, defaults to DEFAULT_HISTORY_DAYS before end
+            end: Last day of the range, defaults to today (UTC)
+            asset_id: Optional asset ID to filter by
+
+        Returns:
+            List[AssetDailyHistory]: One row per asset and day with activity, oldest first
+
+        Raises:
+            HTTPException: If the date range is invalid
+        """
+        with ErrorContext("get_daily_history", ASSET):
+            start, end = AssetService._history_range(start, end)
+            return await TransactionService.get_daily_history(wallet.wallet.id, start, end, asset_id)
 
     @staticmethod
     async def sync_balances_with_tapd(wallet: WalletTypeInfo) -> Dict[str, Any]:
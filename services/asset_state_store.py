@@ -0,0 +1,218 @@
+"""
+Asset state store for Taproot Assets extension.
+Keeps the last asset catalog broadcast to all users and the last balances
+pushed to each user, so updates can be sent as sequence-numbered deltas.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from lnbits.helpers import urlsafe_short_hash
+
+
+def _entry_hash(entry: Dict[str, Any]) -> str:
+    """Hash everything a client shows for an entry, balances and channel state included."""
+    return hashlib.sha256(json.dumps(entry, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class _AssetState:
+    """Versioned list of entries."""
+
+    __slots__ = ("seq", "digest", "entries", "hashes")
+
+    def __init__(self):
+        self.seq = 0
+        self.digest = ""
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.hashes: Dict[str, str] = {}
+
+    def apply(
+        self,
+        entries: List[Dict[str, Any]],
+        key: Callable[[Dict[str, Any]], str],
+        complete: bool
+    ) -> Optional[Dict[str, Any]]:
+        """Apply a new list of entries and get the delta, or None if nothing changed."""
+        hashes = {key(entry): _entry_hash(entry) for entry in entries}
+
+        if complete:
+            digest = hashlib.sha256(
+                "".join(f"{entry_key}={hashes[entry_key]};" for entry_key in sorted(hashes)).encode()
+            ).hexdigest()
+            if digest == self.digest:
+                return None
+
+        changed = [entry for entry in entries if self.hashes.get(key(entry)) != hashes[key(entry)]]
+        removed = [entry_key for entry_key in self.hashes if entry_key not in hashes] if complete else []
+        if not changed and not removed:
+            return None
+
+        for entry in changed:
+            entry_key = key(entry)
+            self.entries[entry_key] = entry
+            self.hashes[entry_key] = hashes[entry_key]
+        for entry_key in removed:
+            del self.entries[entry_key]
+            del self.hashes[entry_key]
+
+        self.digest = digest if complete else ""
+        self.seq += 1
+        return {
+            "seq": self.seq,
+            "base_seq": self.seq - 1,
+            "changed": changed,
+            "removed": removed,
+        }
+
+
+class AssetStateStore:
+    """
+    Versioned asset catalog and per-user balances.
+
+    The catalog holds the node-level asset entries (channels, amounts,
+    decimal display, active state), which are the same for every user, and
+    is broadcast once on CATALOG_CHANNEL. Each user's state holds only their
+    user_balance per asset. Both are compared entry by entry with the last
+    state sent: only changed entries, and keys that disappeared from a
+    complete list, go out as a delta carrying the next sequence number, and
+    an unchanged state produces no delta at all. Clients apply a delta only
+    if its base_seq matches the last sequence they saw and otherwise fetch a
+    snapshot, which also covers states lost to eviction or a restart (the
+    sequences start again from 0).
+    """
+
+    # Maximum number of users whose state is kept in memory
+    MAX_USERS = 5000
+
+    # Shared WebSocket channel for catalog deltas. The random suffix keeps
+    # node channel details away from anyone who hasn't fetched a snapshot
+    # with a wallet key; it changes on restart, along with the sequences.
+    CATALOG_CHANNEL = f"taproot-assets-catalog-{urlsafe_short_hash()}"
+
+    _catalog = _AssetState()
+    _states: "OrderedDict[str, _AssetState]" = OrderedDict()
+
+    @staticmethod
+    def entry_key(asset: Dict[str, Any]) -> str:
+        """
+        Get the key of a catalog entry.
+
+        Assets with channels are listed once per channel, so the channel
+        point is part of the key.
+
+        Args:
+            asset: The asset entry
+
+        Returns:
+            str: asset_id, or asset_id:channel_point for channel entries
+        """
+        channel_point = (asset.get("channel_info") or {}).get("channel_point")
+        asset_id = asset.get("asset_id", "")
+        return f"{asset_id}:{channel_point}" if channel_point else asset_id
+
+    @staticmethod
+    def split(assets: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Split enriched asset entries into catalog entries and user balances.
+
+        Args:
+            assets: Asset entries with user_balance set
+
+        Returns:
+            Tuple of (catalog entries without user_balance, one
+            {"asset_id", "user_balance"} per asset)
+        """
+        catalog = [
+            {field: value for field, value in asset.items() if field != "user_balance"}
+            for asset in assets
+        ]
+        balances = {
+            asset["asset_id"]: {"asset_id": asset["asset_id"], "user_balance": asset.get("user_balance", 0)}
+            for asset in assets
+            if asset.get("asset_id")
+        }
+        return catalog, list(balances.values())
+
+    @classmethod
+    def _get_state(cls, user_id: str) -> _AssetState:
+        state = cls._states.get(user_id)
+        if state is None:
+            state = cls._states[user_id] = _AssetState()
+            while len(cls._states) > cls.MAX_USERS:
+                cls._states.popitem(last=False)
+        cls._states.move_to_end(user_id)
+        return state
+
+    @classmethod
+    def update_catalog(
+        cls,
+        catalog: List[Dict[str, Any]],
+        complete: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Apply a new node-level asset list and get the catalog delta to broadcast.
+
+        Args:
+            catalog: Catalog entries, without user_balance
+            complete: Whether catalog is the node's full list; entries missing
+                      from a complete list are reported as removed, while a
+                      partial list only adds and changes entries
+
+        Returns:
+            The delta ({"seq", "base_seq", "changed", "removed"}), or None if
+            nothing changed
+        """
+        return cls._catalog.apply(catalog, cls.entry_key, complete)
+
+    @classmethod
+    def update_balances(
+        cls,
+        user_id: str,
+        balances: List[Dict[str, Any]],
+        complete: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Apply new balances for a user and get the delta to send.
+
+        Args:
+            user_id: The user ID
+            balances: {"asset_id", "user_balance"} entries
+            complete: Whether balances covers all of the user's assets
+
+        Returns:
+            The delta ({"seq", "base_seq", "changed", "removed"}), or None if
+            nothing changed
+        """
+        return cls._get_state(user_id).apply(balances, lambda entry: entry["asset_id"], complete)
+
+    @classmethod
+    def catalog_seq(cls) -> int:
+        """
+        Get the sequence number of the catalog.
+
+        Returns:
+            int: The catalog sequence, which changes whenever the catalog does
+        """
+        return cls._catalog.seq
+
+    @classmethod
+    def snapshot(cls, user_id: str) -> Dict[str, Any]:
+        """
+        Get the catalog and a user's balances, for clients that need to resync.
+
+        Args:
+            user_id: The user ID
+
+        Returns:
+            Dict with catalog_channel, catalog_seq, catalog, balances_seq and
+            balances; deltas whose base_seq equals the matching seq apply on top
+        """
+        state = cls._get_state(user_id)
+        return {
+            "catalog_channel": cls.CATALOG_CHANNEL,
+            "catalog_seq": cls._catalog.seq,
+            "catalog": list(cls._catalog.entries.values()),
+            "balances_seq": state.seq,
+            "balances": list(state.entries.values()),
+        }
@@ -0,0 +1,155 @@
+"""
+Balance verification service for Taproot Assets extension.
+Checkpoints ledger balances and checks asset_balances against them.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import List
+
+from ..models import BalanceAsOf, BalanceVerification
+from ..db_utils import transaction
+from ..logging_utils import log_info, log_warning, log_error, TRANSFER
+from ..error_utils import ErrorContext
+from ..crud.balance_checkpoints import (
+    get_latest_checkpoint,
+    create_checkpoint,
+    get_ledger_delta,
+    get_all_asset_balances
+)
+from .transaction_service import TransactionService
+
+
+class BalanceVerificationService:
+    """
+    Service that verifies stored balances against the transaction ledger.
+
+    Each run sums only the transactions written since the last checkpoint of
+    a wallet and asset, compares the result with asset_balances and records
+    a new checkpoint. Balances at a point in time are served the same way,
+    from the nearest earlier checkpoint plus the transactions after it.
+
+    A transaction's created_at is set before it commits, so checkpoints only
+    cover transactions older than CHECKPOINT_LAG_SECONDS; a newer one may
+    still be committing and would otherwise be skipped by the next run.
+    """
+
+    # Seconds between verification runs
+    INTERVAL_SECONDS = 3600
+
+    # Age a transaction must reach before a checkpoint covers it
+    CHECKPOINT_LAG_SECONDS = 300
+
+    @classmethod
+    async def run_verifier(cls) -> None:
+        """Run verification forever; used as a scheduled task."""
+        log_info(TRANSFER, f"Balance verifier started (interval {cls.INTERVAL_SECONDS}s)")
+        while True:
+            try:
+                await cls.verify_all()
+            except Exception as e:
+                log_error(TRANSFER, f"Balance verification run failed: {str(e)}")
+            await asyncio.sleep(cls.INTERVAL_SECONDS)
+
+    @classmethod
+    async def verify_all(cls) -> List[BalanceVerification]:
+        """
+        Verify every stored asset balance.
+
+        Returns:
+            List[BalanceVerification]: Results for the balances that drifted
+        """
+        with ErrorContext("verify_all_balances", TRANSFER):
+            drifted = []
+            for balance in await get_all_asset_balances():
+                result = await cls.verify_balance(balance.wallet_id, balance.asset_id)
+                if result.drift:
+                    drifted.append(result)
+
+            if drifted:
+                log_warning(TRANSFER, f"Balance verification found drift in {len(drifted)} balances")
+            return drifted
+
+    @classmethod
+    async def verify_wallet(cls, wallet_id: str) -> List[BalanceVerification]:
+        """
+        Verify all asset balances of a wallet.
+
+        Args:
+            wallet_id: The wallet ID
+
+        Returns:
+            List[BalanceVerification]: One result per asset balance
+        """
+        balances = await TransactionService.get_wallet_asset_balances(wallet_id)
+        return [await cls.verify_balance(wallet_id, balance.asset_id) for balance in balances]
+
+    @classmethod
+    async def verify_balance(cls, wallet_id: str, asset_id: str) -> BalanceVerification:
+        """
+        Verify one asset balance and checkpoint the ledger balance.
+
+        The stored balance, the checkpoint and the newer transactions are
+        read in one transaction, so a concurrent write can't show up as drift.
+
+        Args:
+            wallet_id: The wallet ID
+            asset_id: The asset ID
+
+        Returns:
+            BalanceVerification: The stored and ledger balances and their difference
+        """
+        cutoff = datetime.now() - timedelta(seconds=cls.CHECKPOINT_LAG_SECONDS)
+        async with transaction() as conn:
+            balance = await TransactionService.get_asset_balance(wallet_id, asset_id, conn=conn)
+            checkpoint = await get_latest_checkpoint(wallet_id, asset_id, conn=conn)
+            base = checkpoint.balance if checkpoint else 0
+            delta, count, _ = await get_ledger_delta(wallet_id, asset_id, after=checkpoint, conn=conn)
+            settled_delta, _, last_tx = await get_ledger_delta(
+                wallet_id, asset_id, after=checkpoint, until=cutoff, conn=conn
+            )
+
+            ledger_balance = base + delta
+            if last_tx:
+                last_tx_id, last_tx_created_at = last_tx
+                await create_checkpoint(
+                    wallet_id, asset_id, base + settled_delta, last_tx_id, last_tx_created_at, conn=conn
+                )
+
+        recorded_balance = balance.balance if balance else 0
+        result = BalanceVerification(
+            wallet_id=wallet_id,
+            asset_id=asset_id,
+            recorded_balance=recorded_balance,
+            ledger_balance=ledger_balance,
+            drift=recorded_balance - ledger_balance,
+            transactions_checked=count
+        )
+        if result.drift:
+            log_warning(
+                TRANSFER,
+                f"Balance drift for wallet {wallet_id}, asset {asset_id}: "
+                f"recorded {recorded_balance}, ledger {ledger_balance}"
+            )
+        return result
+
+    @classmethod
+    async def get_balance_as_of(cls, wallet_id: str, asset_id: str, as_of: datetime) -> BalanceAsOf:
+        """
+        Get the ledger balance of a wallet and asset at a point in time.
+
+        Args:
+            wallet_id: The wallet ID
+            asset_id: The asset ID
+            as_of: The point in time
+
+        Returns:
+            BalanceAsOf: The balance including all transactions up to as_of
+        """
+        checkpoint = await get_latest_checkpoint(wallet_id, asset_id, as_of=as_of)
+        delta, _, _ = await get_ledger_delta(wallet_id, asset_id, after=checkpoint, until=as_of)
+        return BalanceAsOf(
+            wallet_id=wallet_id,
+            asset_id=asset_id,
+            balance=(checkpoint.balance if checkpoint else 0) + delta,
+            as_of=as_of
+        )
@@ -0,0 +1,351 @@
+"""
+Batch payment service for Taproot Assets extension.
+Pays many invoices in one request with bounded parallelism per asset channel.
+"""
+import asyncio
+from http import HTTPStatus
+from typing import Dict, Any, List, Optional, Tuple
+
+from lnbits.core.models import WalletTypeInfo
+
+from ..models import (
+    TaprootBatchPaymentRequest, TaprootPaymentRequest,
+    PaymentResponse, ParsedInvoice, BatchPaymentReport
+)
+from ..logging_utils import log_debug, log_info, log_warning, log_error, PAYMENT
+from ..error_utils import raise_http_exception, ErrorContext
+from ..tapd.taproot_factory import TaprootAssetsFactory
+from ..db_utils import transaction
+from ..crud import create_payment_records
+from .payment_service import PaymentService
+from .invoice_resolver import InvoiceResolver
+from .payment_metadata_store import PaymentMetadataStore
+from .transaction_service import TransactionService
+from .notification_service import NotificationService
+
+
+class BatchPaymentService:
+    """
+    Service for paying a list of Taproot Asset invoices in one call.
+
+    Shared setup (wallet, routing balance check, channel listing) runs once per
+    batch. External payments are grouped by asset and channel peer and each group
+    runs its SendPayment streams under its own concurrency limit, so one busy
+    channel does not hold up the others. Each payment is recorded with its
+    balance debit as soon as it completes; payments that went out but could
+    not be recorded are listed in the report's unrecorded field.
+    """
+
+    # Upper bound on invoices accepted in one batch
+    MAX_BATCH_SIZE = 500
+
+    # Default number of parallel payments per asset channel
+    DEFAULT_CHANNEL_CONCURRENCY = 4
+
+    # Number of invoices decoded concurrently
+    PARSE_CONCURRENCY = 16
+
+    @classmethod
+    async def process_batch(
+        cls,
+        data: TaprootBatchPaymentRequest,
+        wallet: WalletTypeInfo
+    ) -> BatchPaymentReport:
+        """
+        Pay a batch of invoices and return an aggregated report.
+
+        Args:
+            data: The batch payment request data
+            wallet: The wallet information
+
+        Returns:
+            BatchPaymentReport: Per-invoice results and totals
+
+        Raises:
+            HTTPException: If the batch is empty, too large, or routing balance is insufficient
+        """
+        with ErrorContext("process_batch", PAYMENT):
+            payment_requests = list(dict.fromkeys(data.payment_requests))
+            if not payment_requests:
+                raise_http_exception(
+                    status_code=HTTPStatus.BAD_REQUEST,
+                    detail="No payment requests provided"
+                )
+            if len(payment_requests) > cls.MAX_BATCH_SIZE:
+                raise_http_exception(
+                    status_code=HTTPStatus.BAD_REQUEST,
+                    detail=f"Batch too large: {len(payment_requests)} payment requests (max {cls.MAX_BATCH_SIZE})"
+                )
+
+            log_info(PAYMENT, f"Processing batch of {len(payment_requests)} payments for wallet {wallet.wallet.id}")
+
+            results: Dict[str, PaymentResponse] = {}
+            parsed = await cls._parse_invoices(payment_requests, results)
+
+            # Load all local invoices in one query and route internal ones through settlement
+            resolver = InvoiceResolver()
+            await resolver.prefetch(parsed_invoice.payment_hash for _, parsed_invoice in parsed)
+
+            external: List[Tuple[str, ParsedInvoice]] = []
+            for payment_request, parsed_invoice in parsed:
+                classification = await PaymentService.classify_payment(
+                    parsed_invoice.payment_hash, wallet.wallet.user, resolver
+                )
+                if classification.is_self:
+                    results[payment_request] = cls._failed(
+                        parsed_invoice,
+                        "Self-payments are not allowed. You cannot pay your own invoice."
+                    )
+                elif classification.is_internal:
+                    results[payment_request] = await PaymentService._process_internal_payment(
+                        cls._single_request(data, payment_request), wallet, parsed_invoice, classification
+                    )
+                else:
+                    external.append((payment_request, parsed_invoice))
+
+            if external:
+                await cls._pay_external(data, wallet, external, results)
+
+            report = cls._build_report(
+                [results[payment_request] for payment_request in payment_requests]
+            )
+            log_info(PAYMENT, f"Batch finished: {report.succeeded}/{report.total} succeeded, total fees {report.total_fee_sats} sats")
+            return report
+
+    @classmethod
+    async def _parse_invoices(
+        cls,
+        payment_requests: List[str],
+        results: Dict[str, PaymentResponse]
+    ) -> List[Tuple[str, ParsedInvoice]]:
+        """Decode invoices concurrently, recording failures and duplicate hashes in results."""
+        semaphore = asyncio.Semaphore(cls.PARSE_CONCURRENCY)
+
+        async def parse(payment_request: str) -> Optional[ParsedInvoice]:
+            async with semaphore:
+                try:
+                    return await PaymentService.parse_invoice(payment_request)
+                except Exception as e:
+                    detail = getattr(e, "detail", None) or str(e)
+                    results[payment_request] = PaymentResponse(
+                        success=False,
+                        payment_hash="",
+                        status="failed",
+                        error=f"Invalid invoice: {detail}",
+                        asset_amount=0
+                    )
+                    return None
+
+        parsed_invoices = await asyncio.gather(*(parse(pr) for pr in payment_requests))
+
+        parsed = []
+        seen_hashes = set()
+        for payment_request, parsed_invoice in zip(payment_requests, parsed_invoices):
+            if not parsed_invoice:
+                continue
+            if parsed_invoice.payment_hash in seen_hashes:
+                results[payment_request] = cls._failed(parsed_invoice, "Duplicate payment hash in batch")
+                continue
+            seen_hashes.add(parsed_invoice.payment_hash)
+            parsed.append((payment_request, parsed_invoice))
+        return parsed
+
+    @classmethod
+    async def _pay_external(
+        cls,
+        data: TaprootBatchPaymentRequest,
+        wallet: WalletTypeInfo,
+        external: List[Tuple[str, ParsedInvoice]],
+        results: Dict[str, PaymentResponse]
+    ) -> None:
+        """Send external payments grouped by channel, recording each as it completes."""
+        from ..tapd_settings import taproot_settings
+        from .asset_service import AssetService
+
+        taproot_wallet = await TaprootAssetsFactory.create_wallet(
+            user_id=wallet.wallet.user,
+            wallet_id=wallet.wallet.id
+        )
+        fee_limit_sats = max(data.fee_limit_sats or taproot_settings.default_sat_fee, 10)
+
+        # One routing balance check and one channel listing for the whole batch
+        await PaymentService.check_routing_balance(taproot_wallet.node)
+        assets = [] if data.peer_pubkey else await AssetService.list_assets(wallet)
+
+        groups: Dict[Tuple[Optional[str], Optional[str]], List[Tuple[str, ParsedInvoice]]] = {}
+        for payment_request, parsed_invoice in external:
+            asset_id = data.asset_id or parsed_invoice.asset_id
+            peer = data.peer_pubkey
+            if asset_id and not peer and parsed_invoice.destination:
+                peer = PaymentService.select_peer(assets, asset_id, parsed_invoice.destination)
+            groups.setdefault((asset_id, peer), []).append((payment_request, parsed_invoice))
+
+        concurrency = max(data.max_concurrency_per_channel or cls.DEFAULT_CHANNEL_CONCURRENCY, 1)
+        log_info(PAYMENT, f"Paying {len(external)} external invoices over {len(groups)} channel groups, concurrency={concurrency}")
+
+        async def pay(
+            semaphore: asyncio.Semaphore,
+            asset_id: Optional[str],
+            peer: Optional[str],
+            payment_request: str,
+            parsed_invoice: ParsedInvoice
+        ) -> Tuple[str, PaymentResponse]:
+            async with semaphore:
+                try:
+                    payment_result = await taproot_wallet.send_raw_payment(
+                        payment_request=payment_request,
+                        fee_limit_sats=fee_limit_sats,
+                        asset_id=asset_id,
+                        peer_pubkey=peer
+                    )
+                except Exception as e:
+                    log_error(PAYMENT, f"Batch payment {parsed_invoice.payment_hash[:8]}... failed: {str(e)}")
+                    return payment_request, cls._failed(parsed_invoice, getattr(e, "detail", None) or str(e))
+
+            if payment_result.get("status", "success") != "success":
+                error = f"Payment failed: {payment_result.get('error', 'Unknown error')}"
+                return payment_request, cls._failed(parsed_invoice, error)
+
+            routing_fees_sats = payment_result.get("fee_sats", 0)
+            response = PaymentResponse(
+                success=True,
+                payment_hash=payment_result.get("payment_hash") or parsed_invoice.payment_hash,
+                preimage=payment_result.get("payment_preimage", ""),
+                fee_msat=routing_fees_sats * 1000,
+                sat_fee_paid=0,
+                routing_fees_sats=routing_fees_sats,
+                asset_amount=parsed_invoice.amount,
+                asset_id=asset_id or payment_result.get("asset_id", ""),
+                description=parsed_invoice.description or None
+            )
+            record_error = await cls._record_payment(wallet, payment_request, response)
+            if record_error:
+                # The payment went out on the network, so it stays successful
+                response.error = f"Paid but not recorded: {record_error}"
+            return payment_request, response
+
+        await PaymentMetadataStore.prefetch(parsed_invoice.payment_hash for _, parsed_invoice in external)
+
+        tasks = []
+        for (asset_id, peer), invoices in groups.items():
+            semaphore = asyncio.Semaphore(concurrency)
+            for payment_request, parsed_invoice in invoices:
+                tasks.append(pay(semaphore, asset_id, peer, payment_request, parsed_invoice))
+
+        for payment_request, response in await asyncio.gather(*tasks):
+            results[payment_request] = response
+
+    @classmethod
+    async def _record_payment(
+        cls,
+        wallet: WalletTypeInfo,
+        payment_request: str,
+        response: PaymentResponse
+    ) -> Optional[str]:
+        """
+        Persist one successful external payment with its debit and notify the user.
+
+        Called as soon as the payment completes, so a failure or crash later
+        in the batch can't leave payments that went out unrecorded.
+
+        Returns:
+            Optional[str]: None if recorded (or already recorded by another path),
+                otherwise the error that kept it from being recorded
+        """
+        if await PaymentMetadataStore.is_settled(response.payment_hash):
+            return None
+
+        row = {
+            "payment_hash": response.payment_hash,
+            "payment_request": payment_request,
+            "asset_id": response.asset_id or "",
+            "asset_amount": response.asset_amount,
+            "fee_sats": response.routing_fees_sats or 0,
+            "description": response.description or "",
+            "user_id": wallet.wallet.user,
+            "wallet_id": wallet.wallet.id,
+            "preimage": response.preimage or ""
+        }
+        debit = {
+            "asset_id": row["asset_id"],
+            "amount": response.asset_amount,
+            "tx_type": "debit",
+            "payment_hash": response.payment_hash,
+            "description": row["description"]
+        }
+
+        try:
+            async with transaction(max_retries=5, retry_delay=0.2) as conn:
+                await create_payment_records([row], conn=conn)
+                success, _, _ = await TransactionService.record_transactions(
+                    wallet.wallet.id, [debit], conn=conn
+                )
+                if not success:
+                    raise RuntimeError("Failed to record asset debit")
+                await PaymentMetadataStore.mark_settled(row["payment_hash"], conn=conn)
+        except Exception as e:
+            log_error(PAYMENT, f"Batch payment {response.payment_hash} succeeded but failed to record in database: {str(e)}")
+            return str(e)
+
+        try:
+            await NotificationService.notify_payment_update(wallet.wallet.user, {
+                "payment_hash": row["payment_hash"],
+                "asset_id": row["asset_id"],
+                "asset_amount": row["asset_amount"],
+                "fee_sats": row["fee_sats"],
+                "description": row["description"],
+                "status": "completed",
+                "internal_payment": False
+            })
+        except Exception as e:
+            log_warning(PAYMENT, f"Failed to send update for batch payment {row['payment_hash'][:8]}...: {str(e)}")
+        return None
+
+    @staticmethod
+    def _single_request(data: TaprootBatchPaymentRequest, payment_request: str) -> TaprootPaymentRequest:
+        """Build a single payment request carrying the batch options."""
+        return TaprootPaymentRequest(
+            payment_request=payment_request,
+            fee_limit_sats=data.fee_limit_sats,
+            peer_pubkey=data.peer_pubkey,
+            asset_id=data.asset_id
+        )
+
+    @staticmethod
+    def _failed(parsed_invoice: ParsedInvoice, error: str) -> PaymentResponse:
+        """Build a failed payment response for a parsed invoice."""
+        return PaymentResponse(
+            success=False,
+            payment_hash=parsed_invoice.payment_hash,
+            status="failed",
+            error=error,
+            asset_amount=parsed_invoice.amount,
+            asset_id=parsed_invoice.asset_id or ""
+        )
+
+    @staticmethod
+    def _build_report(results: List[PaymentResponse]) -> BatchPaymentReport:
+        """Aggregate per-invoice results into a batch report."""
+        total_asset_amount: Dict[str, int] = {}
+        total_fee_sats = 0
+        succeeded = 0
+        unrecorded = []
+        for response in results:
+            if not response.success:
+                continue
+            succeeded += 1
+            if response.error:
+                unrecorded.append(response.payment_hash)
+            total_fee_sats += response.routing_fees_sats or 0
+            asset_id = response.asset_id or ""
+            total_asset_amount[asset_id] = total_asset_amount.get(asset_id, 0) + int(response.asset_amount)
+
+        return BatchPaymentReport(
+            total=len(results),
+            succeeded=succeeded,
+            failed=len(results) - succeeded,
+            total_asset_amount=total_asset_amount,
+            total_fee_sats=total_fee_sats,
+            unrecorded=unrecorded,
+            results=results
+        )
@@ -0,0 +1,192 @@
+"""
+Event stream service for Taproot Assets extension.
+Serves the WebSocket notification events as Server-Sent Events, with
+Last-Event-ID resume from a bounded in-memory history.
+"""
+import asyncio
+import itertools
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from lnbits.helpers import urlsafe_short_hash
+
+from ..logging_utils import log_debug, log_warning, WEBSOCKET
+
+
+class _ChannelHistory:
+    """Recent events of one channel."""
+
+    __slots__ = ("events", "dropped_through")
+
+    def __init__(self, size: int):
+        # (event number, encoded event)
+        self.events: Deque[Tuple[int, str]] = deque(maxlen=size)
+        # Highest event number that fell out of the history
+        self.dropped_through = 0
+
+
+class _Subscriber:
+    """Queue of one open stream."""
+
+    __slots__ = ("queue", "overflowed")
+
+    def __init__(self, size: int):
+        self.queue: "asyncio.Queue[Tuple[str, int, str]]" = asyncio.Queue(maxsize=size)
+        self.overflowed = False
+
+
+class EventStreamService:
+    """
+    Server-Sent Events for clients that can't keep a WebSocket open.
+
+    Every event queued by NotificationDispatcher is also published here,
+    already encoded, under its channel (item_id). Each channel keeps its
+    last HISTORY_SIZE events; event IDs are one process-wide sequence
+    prefixed with a per-process epoch, so a reconnecting client's
+    Last-Event-ID orders against every channel it follows. When the events
+    after that ID are no longer all held, or the ID is from before a
+    restart, the client gets a "resync" event and refetches its data
+    instead. A stream that falls QUEUE_SIZE events behind is handled the
+    same way, so a slow client never holds events back from the others.
+    """
+
+    # Events kept per channel for Last-Event-ID resume
+    HISTORY_SIZE = 200
+
+    # Maximum number of channels with a history
+    MAX_CHANNELS = 5000
+
+    # Events an open stream may fall behind before it is told to resync
+    QUEUE_SIZE = 500
+
+    # Seconds between keep-alive comments on an idle stream
+    HEARTBEAT_SECONDS = 15
+
+    EPOCH = urlsafe_short_hash()[:8]
+
+    _counter = itertools.count(1)
+    _histories: "OrderedDict[str, _ChannelHistory]" = OrderedDict()
+    _subscribers: Dict[str, Set[_Subscriber]] = {}
+
+    @classmethod
+    def publish(cls, item_id: str, encoded: str) -> None:
+        """
+        Record an event and hand it to the open streams following its channel.
+
+        Args:
+            item_id: The channel the event was sent on
+            encoded: The event, JSON encoded
+        """
+        number = next(cls._counter)
+
+        history = cls._histories.get(item_id)
+        if history is None:
+            history = cls._histories[item_id] = _ChannelHistory(cls.HISTORY_SIZE)
+            while len(cls._histories) > cls.MAX_CHANNELS:
+                cls._histories.popitem(last=False)
+        cls._histories.move_to_end(item_id)
+
+        if len(history.events) == history.events.maxlen:
+            history.dropped_through = history.events[0][0]
+        history.events.append((number, encoded))
+
+        for subscriber in cls._subscribers.get(item_id, ()):
+            if subscriber.overflowed:
+                continue
+            try:
+                subscriber.queue.put_nowait((item_id, number, encoded))
+            except asyncio.QueueFull:
+                subscriber.overflowed = True
+
+    @classmethod
+    def _parse_event_id(cls, last_event_id: Optional[str]) -> Optional[int]:
+        """Get the event number from a Last-Event-ID of this process, None otherwise."""
+        if not last_event_id:
+            return None
+        epoch, _, number = last_event_id.partition("-")
+        if epoch != cls.EPOCH or not number.isdigit():
+            return None
+        return int(number)
+
+    @classmethod
+    def _replay(cls, channels: List[str], after: int) -> Optional[List[Tuple[str, int, str]]]:
+        """Get the held events after an event number, or None if some are gone."""
+        events = []
+        for item_id in channels:
+            history = cls._histories.get(item_id)
+            if history is None:
+                continue
+            if history.dropped_through > after:
+                return None
+            events.extend((item_id, number, encoded) for number, encoded in history.events if number > after)
+        return sorted(events, key=lambda event: event[1])
+
+    @classmethod
+    def _format(cls, name: str, number: int, encoded: str) -> str:
+        return f"id: {cls.EPOCH}-{number}\nevent: {name}\ndata: {encoded}\n\n"
+
+    @classmethod
+    async def stream(
+        cls,
+        channels: Dict[str, str],
+        last_event_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream the events of some channels in SSE format.
+
+        Args:
+            channels: Event name to send for each followed channel, keyed by item_id
+            last_event_id: The Last-Event-ID header of a reconnecting client
+
+        Yields:
+            SSE-formatted events and keep-alive comments
+        """
+        subscriber = _Subscriber(cls.QUEUE_SIZE)
+        for item_id in channels:
+            cls._subscribers.setdefault(item_id, set()).add(subscriber)
+
+        try:
+            yield "retry: 5000\n\n"
+
+            if last_event_id:
+                after = cls._parse_event_id(last_event_id)
+                replay = cls._replay(list(channels), after) if after is not None else None
+                if replay is None:
+                    log_debug(WEBSOCKET, f"Event stream can't resume from {last_event_id}, asking for resync")
+                    yield cls._format("resync", next(cls._counter), "{}")
+                    after = None
+                else:
+                    for item_id, number, encoded in replay:
+                        yield cls._format(channels[item_id], number, encoded)
+                    after = replay[-1][1] if replay else after
+            else:
+                after = None
+
+            while True:
+                if subscriber.overflowed:
+                    log_warning(WEBSOCKET, "Event stream fell behind, asking for resync")
+                    while not subscriber.queue.empty():
+                        subscriber.queue.get_nowait()
+                    subscriber.overflowed = False
+                    yield cls._format("resync", next(cls._counter), "{}")
+                    continue
+
+                try:
+                    item_id, number, encoded = await asyncio.wait_for(
+                        subscriber.queue.get(), timeout=cls.HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                # Events published while the replay was read are already sent
+                if after is not None and number <= after:
+                    continue
+                yield cls._format(channels[item_id], number, encoded)
+        finally:
+            for item_id in channels:
+                followers = cls._subscribers.get(item_id)
+                if followers is not None:
+                    followers.discard(subscriber)
+                    if not followers:
+                        del cls._subscribers[item_id]
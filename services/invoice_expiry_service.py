@@ -0,0 +1,155 @@
+"""
+Invoice expiry service for Taproot Assets extension.
+Periodically marks expired pending invoices and cancels them on the node,
+and resumes monitoring of the pending ones after a restart.
+"""
+import asyncio
+from datetime import datetime
+from typing import Dict, List
+
+from ..models import TaprootInvoice
+from ..logging_utils import log_debug, log_info, log_warning, log_error, TRANSFER
+from ..error_utils import ErrorContext
+from ..tapd.taproot_adapter import invoices_pb2
+from ..tapd.taproot_factory import TaprootAssetsFactory
+from ..tapd.taproot_transfers import TaprootTransferManager
+from ..crud import expire_pending_invoices, get_pending_invoice_owners
+from .notification_service import NotificationService
+
+
+class InvoiceExpiryService:
+    """
+    Service that reaps expired invoices.
+
+    Expired pending invoices are flipped to "expired" in batches with one
+    UPDATE per batch. Their monitors are stopped and the HODL invoices are
+    cancelled in LND concurrently, and each affected user gets a single
+    WebSocket message per batch instead of one per invoice.
+    """
+
+    # Seconds between reaper runs
+    INTERVAL_SECONDS = 60
+
+    # Invoices expired per UPDATE statement
+    BATCH_SIZE = 200
+
+    # Upper bound on batches per run so one run can't monopolise the database
+    MAX_BATCHES_PER_RUN = 50
+
+    # Parallel CancelInvoice calls
+    CANCEL_CONCURRENCY = 10
+
+    # Upper bound on pending invoices whose monitors are resumed at startup
+    MAX_RESUMED_MONITORS = 5000
+
+    @classmethod
+    async def run_reaper(cls) -> None:
+        """Run the reaper forever; used as a scheduled task."""
+        log_info(TRANSFER, f"Invoice expiry reaper started (interval {cls.INTERVAL_SECONDS}s)")
+        while True:
+            try:
+                await cls.reap_expired_invoices()
+            except Exception as e:
+                log_error(TRANSFER, f"Invoice expiry reaper run failed: {str(e)}")
+            await asyncio.sleep(cls.INTERVAL_SECONDS)
+
+    @classmethod
+    async def resume_monitoring(cls) -> int:
+        """
+        Restart the monitors of unexpired pending invoices; used as a startup task.
+
+        Returns:
+            int: Number of monitors started
+        """
+        with ErrorContext("resume_invoice_monitoring", TRANSFER):
+            owners = await get_pending_invoice_owners(datetime.now(), limit=cls.MAX_RESUMED_MONITORS)
+            if not owners:
+                return 0
+
+            try:
+                # All wallets share the same LND connection, so any owner's node will do
+                taproot_wallet = await TaprootAssetsFactory.create_wallet(
+                    user_id=owners[0].user_id,
+                    wallet_id=owners[0].wallet_id
+                )
+            except Exception as e:
+                log_warning(TRANSFER, f"Could not connect to node to resume invoice monitoring: {str(e)}")
+                return 0
+
+            return await taproot_wallet.node.transfer_manager.resume_monitoring(owners)
+
+    @classmethod
+    async def reap_expired_invoices(cls) -> int:
+        """
+        Expire all pending invoices whose expiry time has passed.
+
+        Returns:
+            int: Number of invoices marked as expired
+        """
+        with ErrorContext("reap_expired_invoices", TRANSFER):
+            total = 0
+            for _ in range(cls.MAX_BATCHES_PER_RUN):
+                invoices = await expire_pending_invoices(datetime.now(), limit=cls.BATCH_SIZE)
+                if not invoices:
+                    break
+
+                total += len(invoices)
+                await cls._cancel_invoices(invoices)
+                await cls._notify_expired(invoices)
+
+                if len(invoices) < cls.BATCH_SIZE:
+                    break
+
+            if total:
+                log_info(TRANSFER, f"Expired {total} pending invoices")
+            return total
+
+    @classmethod
+    async def _cancel_invoices(cls, invoices: List[TaprootInvoice]) -> None:
+        """Stop monitors and cancel the HODL invoices in LND."""
+        for invoice in invoices:
+            TaprootTransferManager.cancel_monitor(invoice.payment_hash)
+
+        try:
+            # All wallets share the same LND connection, so any owner's node will do
+            taproot_wallet = await TaprootAssetsFactory.create_wallet(
+                user_id=invoices[0].user_id,
+                wallet_id=invoices[0].wallet_id
+            )
+            invoices_stub = taproot_wallet.node.invoices_stub
+        except Exception as e:
+            log_warning(TRANSFER, f"Could not connect to node to cancel expired invoices: {str(e)}")
+            return
+
+        semaphore = asyncio.Semaphore(cls.CANCEL_CONCURRENCY)
+
+        async def cancel(payment_hash: str) -> bool:
+            async with semaphore:
+                try:
+                    await invoices_stub.CancelInvoice(
+                        invoices_pb2.CancelInvoiceMsg(payment_hash=bytes.fromhex(payment_hash))
+                    )
+                    return True
+                except Exception as e:
+                    # Usually already cancelled by LND's own expiry handling
+                    log_debug(TRANSFER, f"CancelInvoice for {payment_hash[:8]}... failed: {str(e)}")
+                    return False
+
+        results = await asyncio.gather(*(cancel(invoice.payment_hash) for invoice in invoices))
+        log_debug(TRANSFER, f"Cancelled {sum(results)}/{len(invoices)} expired invoices in LND")
+
+    @classmethod
+    async def _notify_expired(cls, invoices: List[TaprootInvoice]) -> None:
+        """Send one batched invoice update per user."""
+        by_user: Dict[str, List[Dict]] = {}
+        for invoice in invoices:
+            by_user.setdefault(invoice.user_id, []).append({
+                "id": invoice.id,
+                "payment_hash": invoice.payment_hash,
+                "status": invoice.status,
+                "asset_id": invoice.asset_id,
+                "asset_amount": invoice.asset_amount
+            })
+
+        for user_id, invoice_data in by_user.items():
+            await NotificationService.notify_invoices_update(user_id, invoice_data)
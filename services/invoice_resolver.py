@@ -0,0 +1,85 @@
+"""
+Invoice resolver for Taproot Assets extension.
+Looks up local invoices once per payment hash and classifies payments against them.
+"""
+from typing import Dict, Iterable, Optional
+
+from ..models import TaprootInvoice, InvoiceClassification
+from ..logging_utils import log_debug, PAYMENT
+from ..crud import get_invoice_by_payment_hash, get_invoices_by_payment_hashes
+
+
+class InvoiceResolver:
+    """
+    Request-scoped resolver for local invoices.
+
+    Create one resolver per request (or per batch) and pass it, or the
+    classification it returns, down the payment and settlement pipeline. Each
+    payment hash is fetched from the database at most once for the lifetime of
+    the resolver, including hashes that turned out not to exist locally.
+    """
+
+    def __init__(self, conn=None):
+        """
+        Initialize the resolver.
+
+        Args:
+            conn: Optional database connection to reuse for lookups
+        """
+        self.conn = conn
+        self._invoices: Dict[str, Optional[TaprootInvoice]] = {}
+
+    async def get_invoice(self, payment_hash: str) -> Optional[TaprootInvoice]:
+        """
+        Get the local invoice for a payment hash.
+
+        Args:
+            payment_hash: The payment hash to look up
+
+        Returns:
+            Optional[TaprootInvoice]: The invoice if it exists on this node, None otherwise
+        """
+        if payment_hash not in self._invoices:
+            self._invoices[payment_hash] = await get_invoice_by_payment_hash(payment_hash, conn=self.conn)
+        return self._invoices[payment_hash]
+
+    async def prefetch(self, payment_hashes: Iterable[str]) -> None:
+        """
+        Load the invoices for several payment hashes with a single query.
+
+        Args:
+            payment_hashes: The payment hashes to load
+        """
+        missing = [payment_hash for payment_hash in dict.fromkeys(payment_hashes)
+                   if payment_hash not in self._invoices]
+        if not missing:
+            return
+
+        invoices = await get_invoices_by_payment_hashes(missing, conn=self.conn)
+        for payment_hash in missing:
+            self._invoices[payment_hash] = invoices.get(payment_hash)
+        log_debug(PAYMENT, f"Prefetched {len(missing)} payment hashes, {len(invoices)} local invoices")
+
+    async def classify(self, payment_hash: str, user_id: Optional[str]) -> InvoiceClassification:
+        """
+        Classify a payment hash for a paying user.
+
+        Args:
+            payment_hash: The payment hash to classify
+            user_id: The ID of the paying user, if known
+
+        Returns:
+            InvoiceClassification: "self" if the invoice belongs to the user,
+            "internal" if it belongs to another user on this node, "external" otherwise
+        """
+        invoice = await self.get_invoice(payment_hash)
+        if not invoice:
+            return InvoiceClassification(payment_hash=payment_hash, payment_type="external")
+
+        return InvoiceClassification(
+            payment_hash=payment_hash,
+            payment_type="self" if user_id and invoice.user_id == user_id else "internal",
+            invoice=invoice,
+            owner_user_id=invoice.user_id,
+            owner_wallet_id=invoice.wallet_id
+        )
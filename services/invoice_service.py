@@ -8,16 +8,16 @@ from loguru import logger
 
 from lnbits.core.models import WalletTypeInfo, User
 
-from ..models import TaprootInvoiceRequest, InvoiceResponse, TaprootInvoice
+from ..models import TaprootInvoiceRequest, InvoiceResponse, TaprootInvoice, PaginatedResponse
 from ..tapd.taproot_factory import TaprootAssetsFactory
 from ..error_utils import raise_http_exception, ErrorContext
-from ..logging_utils import API
+from ..logging_utils import log_event, API, INVOICE
 # Import from crud re-exports
 from ..crud import (
     create_invoice,
     get_invoice,
     get_invoice_by_payment_hash,
-    get_user_invoices
+    get_user_invoice_summaries
 )
 from .notification_service import NotificationService
 from .settlement_service import SettlementService
@@ -50,19 +50,16 @@ class InvoiceService:
         Raises:
             HTTPException: If invoice creation fails
         """
-        logger.info(f"Creating invoice for asset_id={data.asset_id}, amount={data.amount}")
-
-        # DEBUG: Log all parameters from both direct UI and bitcoinswitch
-        logger.info(f"TAPROOT_ASSETS DEBUG: InvoiceService.create_invoice called")
-        logger.info(f"TAPROOT_ASSETS DEBUG: user_id={user_id}")
-        logger.info(f"TAPROOT_ASSETS DEBUG: wallet_id={wallet_id}")
-        logger.info(f"TAPROOT_ASSETS DEBUG: TaprootInvoiceRequest data:")
-        logger.info(f"TAPROOT_ASSETS DEBUG:   asset_id={data.asset_id}")
-        logger.info(f"TAPROOT_ASSETS DEBUG:   amount={data.amount} (type: {type(data.amount)})")
-        logger.info(f"TAPROOT_ASSETS DEBUG:   description='{data.description}'")
-        logger.info(f"TAPROOT_ASSETS DEBUG:   expiry={data.expiry}")
-        logger.info(f"TAPROOT_ASSETS DEBUG:   peer_pubkey={data.peer_pubkey}")
-        logger.info(f"TAPROOT_ASSETS DEBUG:   extra={data.extra}")
+        log_event(
+            INVOICE, "info", "creating invoice",
+            asset_id=data.asset_id, amount=data.amount, user_id=user_id, wallet_id=wallet_id
+        )
+        # Full request, including what bitcoinswitch sends in extra
+        log_event(
+            INVOICE, "debug", "invoice request",
+            description=lambda: repr(data.description), expiry=data.expiry,
+            peer_pubkey=data.peer_pubkey, extra=data.extra
+        )
 
         with ErrorContext("create_invoice", API):
             # Create a wallet instance using the factory
@@ -220,22 +217,38 @@ class InvoiceService:
             return invoice
     
     @staticmethod
-    async def get_user_invoices(user_id: str) -> List[TaprootInvoice]:
+    async def get_user_invoices(
+        user_id: str,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> PaginatedResponse:
         """
-        Get all Taproot Asset invoices for a user.
+        Get a page of Taproot Asset invoices for a user.
         
         Args:
             user_id: The user ID
+            limit: Maximum number of invoices to return
+            cursor: Cursor returned with the previous page, None for the first page
             
         Returns:
-            List[TaprootInvoice]: List of invoices
+            PaginatedResponse: Invoices, newest first, and the cursor for the next page
             
         Raises:
-            HTTPException: If there's an error retrieving invoices
+            HTTPException: If the cursor is invalid or there's an error retrieving invoices
         """
         with ErrorContext("get_user_invoices", API):
-            invoices = await get_user_invoices(user_id)
-            return invoices
+            try:
+                summaries, next_cursor = await get_user_invoice_summaries(user_id, limit=limit, cursor=cursor)
+            except ValueError as e:
+                raise_http_exception(
+                    status_code=HTTPStatus.BAD_REQUEST,
+                    detail=str(e),
+                )
+            # Serialise rows directly instead of validating a model per invoice
+            return PaginatedResponse(
+                data=[summary.to_dict() for summary in summaries],
+                next_cursor=next_cursor
+            )
     
     @staticmethod
     async def update_invoice_status(
@@ -0,0 +1,109 @@
+"""
+Notification dispatcher for Taproot Assets extension.
+Debounces WebSocket events per channel and sends them as merged frames.
+"""
+import asyncio
+import itertools
+import json
+from typing import Any, Dict, Optional
+
+from lnbits.core.services.websockets import websocket_manager
+
+from ..logging_utils import log_debug, log_warning, log_error, WEBSOCKET
+from .event_stream_service import EventStreamService
+
+
+class _Channel:
+    """Events waiting to be sent on one WebSocket channel."""
+
+    __slots__ = ("pending", "task")
+
+    def __init__(self):
+        # coalescing key -> encoded event, in arrival order
+        self.pending: Dict[str, str] = {}
+        self.task: Optional[asyncio.Task] = None
+
+
+class NotificationDispatcher:
+    """
+    Coalescing sender for WebSocket notifications.
+
+    Events are encoded once when queued and collected per channel (item_id)
+    for DEBOUNCE_SECONDS. A single event is then sent as-is; several are sent
+    as one {"type": "batch", "events": [...]} frame. An event queued with a
+    key replaces a pending event with the same key, so a burst of updates to
+    one invoice sends only the latest. Queueing never waits on a socket:
+    sending happens in a per-channel task, each channel holds at most
+    MAX_PENDING_EVENTS (the oldest are dropped beyond that), and a send that
+    takes longer than SEND_TIMEOUT_SECONDS is abandoned. The encoded event
+    is also published to EventStreamService for Server-Sent Events clients.
+    """
+
+    # Seconds events are collected before a channel is flushed
+    DEBOUNCE_SECONDS = 0.05
+
+    # Maximum number of events waiting on one channel
+    MAX_PENDING_EVENTS = 100
+
+    # Seconds a frame may take to reach the channel's sockets
+    SEND_TIMEOUT_SECONDS = 5.0
+
+    _channels: Dict[str, _Channel] = {}
+    _sequence = itertools.count()
+
+    @classmethod
+    def enqueue(cls, item_id: str, event: Dict[str, Any], key: Optional[str] = None) -> None:
+        """
+        Queue an event for a channel.
+
+        Args:
+            item_id: The WebSocket channel, e.g. taproot-assets-invoices-<user_id>
+            event: The message, with a "type" field
+            key: Optional coalescing key; a pending event with the same key is replaced
+        """
+        channel = cls._channels.get(item_id)
+        if channel is None:
+            channel = cls._channels[item_id] = _Channel()
+
+        encoded = json.dumps(event)
+        EventStreamService.publish(item_id, encoded)
+
+        key = key or f"_{next(cls._sequence)}"
+        channel.pending.pop(key, None)
+        channel.pending[key] = encoded
+
+        if len(channel.pending) > cls.MAX_PENDING_EVENTS:
+            channel.pending.pop(next(iter(channel.pending)))
+            log_warning(WEBSOCKET, f"Notification buffer full for {item_id}, dropped oldest event")
+
+        if channel.task is None:
+            channel.task = asyncio.create_task(cls._flush(item_id, channel))
+
+    @classmethod
+    async def _flush(cls, item_id: str, channel: _Channel) -> None:
+        """Send the pending events of a channel until none are left."""
+        try:
+            while channel.pending:
+                await asyncio.sleep(cls.DEBOUNCE_SECONDS)
+                events = list(channel.pending.values())
+                channel.pending.clear()
+
+                if len(events) == 1:
+                    frame = events[0]
+                else:
+                    frame = '{"type": "batch", "events": [' + ", ".join(events) + "]}"
+
+                try:
+                    await asyncio.wait_for(
+                        websocket_manager.send_data(frame, item_id),
+                        timeout=cls.SEND_TIMEOUT_SECONDS
+                    )
+                    log_debug(WEBSOCKET, f"Sent {len(events)} events to {item_id}")
+                except asyncio.TimeoutError:
+                    log_warning(WEBSOCKET, f"Sending {len(events)} events to {item_id} timed out")
+                except Exception as e:
+                    log_error(WEBSOCKET, f"Error sending events to {item_id}: {str(e)}")
+        finally:
+            channel.task = None
+            if not channel.pending:
+                cls._channels.pop(item_id, None)
@@ -2,20 +2,24 @@
 Notification service for Taproot Assets extension.
 Centralizes WebSocket notification logic.
 """
-import json
 from typing import Dict, Any, List, Optional, Union
 from loguru import logger
 
-from lnbits.core.services.websockets import websocket_manager
 from ..logging_utils import (
     log_debug, log_info, log_warning, log_error, 
     WEBSOCKET, ASSET
 )
+from .asset_state_store import AssetStateStore
+from .notification_dispatcher import NotificationDispatcher
 
 class NotificationService:
     """
     Service for sending notifications to users about Taproot Assets events.
     Centralizes notification logic and provides batch notification capabilities.
+    
+    Events are handed to NotificationDispatcher, which debounces them per
+    channel and sends them as merged frames, so notifying never waits on a
+    user's sockets.
     """
     
     @staticmethod
@@ -23,12 +27,15 @@ class NotificationService:
         """
         Send invoice update notification to a user.
         
+        Updates for the same invoice that are still waiting to be sent are
+        replaced by the newest one.
+        
         Args:
             user_id: ID of the user to notify
             invoice_data: Invoice data to send
             
         Returns:
-            bool: True if notification was sent successfully, False otherwise
+            bool: True if notification was queued successfully, False otherwise
         """
         if not user_id or not invoice_data:
             log_warning(WEBSOCKET, "Cannot send invoice notification with empty user_id or data")
@@ -38,20 +45,44 @@ class NotificationService:
             # Create a unique item_id for this user and event type
             item_id = f"taproot-assets-invoices-{user_id}"
             
-            # Prepare message with type and data
-            message = json.dumps({
-                "type": "invoice_update",
-                "data": invoice_data
-            })
-            
-            # Send directly through core WebSocket manager
-            await websocket_manager.send_data(message, item_id)
-            log_debug(WEBSOCKET, f"Sent invoice update notification for user {user_id}")
+            payment_hash = invoice_data.get("payment_hash")
+            NotificationDispatcher.enqueue(
+                item_id,
+                {"type": "invoice_update", "data": invoice_data},
+                key=f"invoice:{payment_hash}" if payment_hash else None
+            )
+            log_debug(WEBSOCKET, f"Queued invoice update notification for user {user_id}")
             return True
         except Exception as e:
             log_error(WEBSOCKET, f"Error sending invoice update: {str(e)}")
             return False
     
+    @staticmethod
+    async def notify_invoices_update(user_id: str, invoices_data: List[Dict[str, Any]]) -> bool:
+        """
+        Send one notification covering several invoice updates to a user.
+        
+        Args:
+            user_id: ID of the user to notify
+            invoices_data: List of invoice data to send
+            
+        Returns:
+            bool: True if notification was queued successfully, False otherwise
+        """
+        if not user_id or not invoices_data:
+            log_warning(WEBSOCKET, "Cannot send invoices notification with empty user_id or data")
+            return False
+            
+        try:
+            item_id = f"taproot-assets-invoices-{user_id}"
+            
+            NotificationDispatcher.enqueue(item_id, {"type": "invoices_update", "data": invoices_data})
+            log_debug(WEBSOCKET, f"Queued {len(invoices_data)} invoice updates for user {user_id}")
+            return True
+        except Exception as e:
+            log_error(WEBSOCKET, f"Error sending invoices update: {str(e)}")
+            return False
+    
     @staticmethod
     async def notify_payment_update(user_id: str, payment_data: Dict[str, Any]) -> bool:
         """
@@ -62,7 +93,7 @@ class NotificationService:
             payment_data: Payment data to send
             
         Returns:
-            bool: True if notification was sent successfully, False otherwise
+            bool: True if notification was queued successfully, False otherwise
         """
         if not user_id or not payment_data:
             log_warning(WEBSOCKET, "Cannot send payment notification with empty user_id or data")
@@ -72,49 +103,101 @@ class NotificationService:
             # Create a unique item_id for this user and event type
             item_id = f"taproot-assets-payments-{user_id}"
             
-            # Prepare message with type and data
-            message = json.dumps({
-                "type": "payment_update",
-                "data": payment_data
-            })
-            
-            # Send directly through core WebSocket manager
-            await websocket_manager.send_data(message, item_id)
-            log_debug(WEBSOCKET, f"Sent payment update notification for user {user_id}")
+            payment_hash = payment_data.get("payment_hash")
+            NotificationDispatcher.enqueue(
+                item_id,
+                {"type": "payment_update", "data": payment_data},
+                key=f"payment:{payment_hash}" if payment_hash else None
+            )
+            log_debug(WEBSOCKET, f"Queued payment update notification for user {user_id}")
             return True
         except Exception as e:
             log_error(WEBSOCKET, f"Error sending payment update: {str(e)}")
             return False
     
     @staticmethod
-    async def notify_assets_update(user_id: str, assets_data: List[Dict[str, Any]]) -> bool:
+    async def notify_payment_job_update(user_id: str, job_data: Dict[str, Any]) -> bool:
         """
-        Send assets update notification to a user.
+        Send the status of a background payment job to a user.
         
         Args:
             user_id: ID of the user to notify
-            assets_data: List of asset data to send
+            job_data: Job status data, with a job_id
             
         Returns:
-            bool: True if notification was sent successfully, False otherwise
+            bool: True if notification was queued successfully, False otherwise
+        """
+        if not user_id or not job_data:
+            log_warning(WEBSOCKET, "Cannot send payment job notification with empty user_id or data")
+            return False
+            
+        try:
+            NotificationDispatcher.enqueue(
+                f"taproot-assets-payments-{user_id}",
+                {"type": "payment_job_update", "data": job_data},
+                key=f"payment_job:{job_data.get('job_id')}"
+            )
+            log_debug(WEBSOCKET, f"Queued payment job update notification for user {user_id}")
+            return True
+        except Exception as e:
+            log_error(WEBSOCKET, f"Error sending payment job update: {str(e)}")
+            return False
+    
+    @staticmethod
+    async def notify_assets_update(
+        user_id: str, 
+        assets_data: List[Dict[str, Any]], 
+        complete: bool = True
+    ) -> bool:
+        """
+        Send the changes in the asset catalog and a user's balances.
+        
+        Node-level changes go out once as a catalog delta on the shared
+        catalog channel; the user's own channel only gets a delta of their
+        balances. Each message carries only changed and removed entries with
+        a sequence number (see AssetStateStore), and nothing is sent for a
+        part that didn't change.
+        
+        Args:
+            user_id: ID of the user to notify
+            assets_data: List of asset data with user_balance set
+            complete: Whether assets_data is the full asset list
+            
+        Returns:
+            bool: True if the notifications were queued or not needed, False otherwise
         """
         if not user_id or not assets_data:
             log_warning(WEBSOCKET, "Cannot send assets notification with empty user_id or data")
             return False
             
         try:
-            # Create a unique item_id for this user and event type
-            item_id = f"taproot-assets-balances-{user_id}"
+            catalog, balances = AssetStateStore.split(assets_data)
             
-            # Prepare message with type and data
-            message = json.dumps({
-                "type": "assets_update",
-                "data": assets_data
-            })
+            # Deltas build on each other, so they are never coalesced
+            catalog_delta = AssetStateStore.update_catalog(catalog, complete=complete)
+            if catalog_delta:
+                NotificationDispatcher.enqueue(
+                    AssetStateStore.CATALOG_CHANNEL, {"type": "catalog_delta", **catalog_delta}
+                )
+                log_debug(
+                    WEBSOCKET, 
+                    f"Queued catalog delta {catalog_delta['seq']}: "
+                    f"{len(catalog_delta['changed'])} changed, {len(catalog_delta['removed'])} removed"
+                )
             
-            # Send directly through core WebSocket manager
-            await websocket_manager.send_data(message, item_id)
-            log_debug(WEBSOCKET, f"Sent assets update notification for user {user_id}")
+            balances_delta = AssetStateStore.update_balances(user_id, balances, complete=complete)
+            if balances_delta:
+                # Create a unique item_id for this user and event type
+                item_id = f"taproot-assets-balances-{user_id}"
+                NotificationDispatcher.enqueue(item_id, {"type": "balances_delta", **balances_delta})
+                log_debug(
+                    WEBSOCKET, 
+                    f"Queued balances delta {balances_delta['seq']} for user {user_id}: "
+                    f"{len(balances_delta['changed'])} changed"
+                )
+            
+            if not catalog_delta and not balances_delta:
+                log_debug(WEBSOCKET, f"Assets unchanged for user {user_id}, skipping notification")
             return True
         except Exception as e:
             log_error(WEBSOCKET, f"Error sending assets update: {str(e)}")
@@ -128,6 +211,9 @@ class NotificationService:
         """
         Send multiple notifications to a user in one batch.
         
+        Events for the same channel are sent together in one frame by the
+        dispatcher.
+        
         Args:
             user_id: ID of the user to notify
             updates: Dictionary mapping update types to their data
@@ -157,7 +243,10 @@ class NotificationService:
                 elif update_type == "payment" and isinstance(data, dict):
                     results[update_type] = await NotificationService.notify_payment_update(user_id, data)
                 elif update_type == "assets" and isinstance(data, list):
-                    results[update_type] = await NotificationService.notify_assets_update(user_id, data)
+                    # Batched asset lists only cover the assets a transaction touched
+                    results[update_type] = await NotificationService.notify_assets_update(
+                        user_id, data, complete=False
+                    )
                 else:
                     log_warning(WEBSOCKET, f"Unknown notification type: {update_type}")
                     results[update_type] = False
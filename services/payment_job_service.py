@@ -0,0 +1,223 @@
+"""
+Payment job service for Taproot Assets extension.
+Runs payments in the background so API requests return immediately.
+"""
+import asyncio
+from datetime import datetime
+from http import HTTPStatus
+from typing import Dict, Optional, Set
+
+import bolt11
+from lnbits.core.models import WalletTypeInfo
+from lnbits.helpers import urlsafe_short_hash
+
+from ..models import TaprootPaymentRequest, PaymentJob
+from ..logging_utils import log_debug, log_info, log_warning, log_error, PAYMENT
+from ..error_utils import raise_http_exception
+from .notification_service import NotificationService
+from .payment_service import PaymentService
+
+
+class PaymentJobService:
+    """
+    Service for submitting payments as background jobs.
+
+    A job is created and returned to the caller straight away while a task
+    drives the SendPayment stream. Job status can be polled by id and is
+    also pushed to the user over the payments WebSocket channel as a
+    payment_job_update event. At most MAX_PENDING_JOBS jobs may be pending
+    at once, and at most MAX_CONCURRENT_PAYMENTS of them run at a time; the
+    rest wait their turn. Jobs are held in memory only, so a restart loses
+    their status (the payments themselves are recorded as usual).
+    """
+
+    # Finished jobs are kept for status polling for this long
+    JOB_RETENTION_SECONDS = 3600  # 1 hour
+
+    # Upper bound on tracked jobs to keep memory use flat
+    MAX_JOBS = 10000
+
+    # Upper bound on jobs waiting for or running a payment
+    MAX_PENDING_JOBS = 200
+
+    # Payments run at the same time
+    MAX_CONCURRENT_PAYMENTS = 10
+
+    _jobs: Dict[str, PaymentJob] = {}
+    _tasks: Set[asyncio.Task] = set()
+    _semaphore: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    async def submit_payment(
+        cls,
+        data: TaprootPaymentRequest,
+        wallet: WalletTypeInfo
+    ) -> PaymentJob:
+        """
+        Submit a payment for background processing.
+
+        Args:
+            data: The payment request data
+            wallet: The wallet information
+
+        Returns:
+            PaymentJob: The pending job tracking the payment
+
+        Raises:
+            HTTPException: If the payment request cannot be decoded, or too
+                many jobs are pending
+        """
+        try:
+            payment_hash = bolt11.decode(data.payment_request).payment_hash
+        except Exception as e:
+            raise_http_exception(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=f"Invalid payment request: {str(e)}"
+            )
+
+        # Don't start a second payment for a hash that is still in flight
+        existing = cls._find_pending_job(payment_hash, wallet.wallet.user)
+        if existing:
+            log_info(PAYMENT, f"Payment {payment_hash[:8]}... already in progress as job {existing.id}")
+            return existing
+
+        cls._prune_jobs()
+
+        pending = sum(1 for job in cls._jobs.values() if job.status == "pending")
+        if pending >= cls.MAX_PENDING_JOBS:
+            raise_http_exception(
+                status_code=HTTPStatus.TOO_MANY_REQUESTS,
+                detail=f"Too many payments in progress ({pending}), try again later"
+            )
+
+        now = datetime.now()
+        job = PaymentJob(
+            id=urlsafe_short_hash(),
+            payment_hash=payment_hash,
+            user_id=wallet.wallet.user,
+            wallet_id=wallet.wallet.id,
+            status="pending",
+            created_at=now,
+            updated_at=now
+        )
+        cls._jobs[job.id] = job
+
+        task = asyncio.create_task(cls._run_payment(job.id, data, wallet))
+        cls._tasks.add(task)
+        task.add_done_callback(cls._tasks.discard)
+
+        log_info(PAYMENT, f"Submitted payment job {job.id} for hash {payment_hash[:8]}...")
+        await cls._notify_job_update(job)
+        return job
+
+    @classmethod
+    def get_job(cls, job_id: str, user_id: str) -> Optional[PaymentJob]:
+        """
+        Get a payment job owned by a user.
+
+        Args:
+            job_id: The payment job ID
+            user_id: The ID of the user requesting the job
+
+        Returns:
+            Optional[PaymentJob]: The job if found and owned by the user, None otherwise
+        """
+        job = cls._jobs.get(job_id)
+        if not job or job.user_id != user_id:
+            return None
+        return job
+
+    @classmethod
+    async def _run_payment(
+        cls,
+        job_id: str,
+        data: TaprootPaymentRequest,
+        wallet: WalletTypeInfo
+    ) -> None:
+        """Drive a payment to completion and record the outcome on its job."""
+        job = cls._jobs.get(job_id)
+        if not job:
+            return
+
+        if cls._semaphore is None:
+            cls._semaphore = asyncio.Semaphore(cls.MAX_CONCURRENT_PAYMENTS)
+
+        try:
+            async with cls._semaphore:
+                response = await PaymentService.process_payment(data, wallet)
+            job.result = response
+            job.status = "success" if response.success else "failed"
+            job.error = response.error
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.error = "Payment task was cancelled"
+            raise
+        except Exception as e:
+            log_error(PAYMENT, f"Payment job {job_id} failed: {str(e)}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.updated_at = datetime.now()
+            log_info(PAYMENT, f"Payment job {job_id} finished with status {job.status}")
+            await cls._notify_job_update(job)
+
+    @classmethod
+    async def _notify_job_update(cls, job: PaymentJob) -> None:
+        """
+        Push the current job status to the owning user.
+
+        Sent as its own event type, keyed by job ID: the payment record
+        itself reaches the client as a payment_update once it is stored.
+        """
+        job_data = {
+            "job_id": job.id,
+            "payment_hash": job.payment_hash,
+            "status": job.status,
+            "error": job.error,
+            "created_at": job.created_at.isoformat()
+        }
+        if job.result:
+            job_data.update({
+                "asset_id": job.result.asset_id,
+                "asset_amount": job.result.asset_amount,
+                "fee_sats": job.result.routing_fees_sats or 0,
+                "description": job.result.description or "",
+                "preimage": job.result.preimage,
+                "internal_payment": job.result.internal_payment
+            })
+
+        try:
+            await NotificationService.notify_payment_job_update(job.user_id, job_data)
+        except Exception as e:
+            log_warning(PAYMENT, f"Failed to send update for payment job {job.id}: {str(e)}")
+
+    @classmethod
+    def _find_pending_job(cls, payment_hash: str, user_id: str) -> Optional[PaymentJob]:
+        """Find a pending job for the same payment hash and user."""
+        for job in cls._jobs.values():
+            if job.status == "pending" and job.payment_hash == payment_hash and job.user_id == user_id:
+                return job
+        return None
+
+    @classmethod
+    def _prune_jobs(cls) -> None:
+        """Drop expired finished jobs and cap the number of tracked jobs."""
+        now = datetime.now()
+        expired = [
+            job_id for job_id, job in cls._jobs.items()
+            if job.status != "pending"
+            and (now - job.updated_at).total_seconds() > cls.JOB_RETENTION_SECONDS
+        ]
+        for job_id in expired:
+            del cls._jobs[job_id]
+
+        if len(cls._jobs) >= cls.MAX_JOBS:
+            finished = sorted(
+                (job for job in cls._jobs.values() if job.status != "pending"),
+                key=lambda job: job.updated_at
+            )
+            for job in finished[:len(cls._jobs) - cls.MAX_JOBS + 1]:
+                del cls._jobs[job.id]
+
+        if expired:
+            log_debug(PAYMENT, f"Pruned {len(expired)} finished payment jobs")
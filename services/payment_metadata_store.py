@@ -0,0 +1,268 @@
+"""
+Payment-hash metadata store for Taproot Assets extension.
+Keeps preimages, asset IDs, script keys and settled flags in a bounded
+in-memory LRU backed by the payment_metadata table.
+"""
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from ..logging_utils import log_debug, log_info, log_warning, log_error, TRANSFER
+from ..db_utils import after_commit
+from ..crud.payment_metadata import (
+    get_payment_metadata,
+    get_payment_metadata_many,
+    get_payment_metadata_by_script_key,
+    upsert_payment_metadata,
+    delete_payment_metadata_before
+)
+
+
+class _MetadataEntry:
+    """In-memory metadata for one payment hash, held as raw bytes."""
+
+    __slots__ = ("preimage", "asset_id", "script_key", "settled")
+
+    def __init__(
+        self,
+        preimage: Optional[bytes] = None,
+        asset_id: Optional[bytes] = None,
+        script_key: Optional[bytes] = None,
+        settled: bool = False
+    ):
+        self.preimage = preimage
+        self.asset_id = asset_id
+        self.script_key = script_key
+        self.settled = settled
+
+
+def _to_bytes(value: Optional[str]) -> Optional[bytes]:
+    return bytes.fromhex(value) if value else None
+
+
+def _to_hex(value: Optional[bytes]) -> Optional[str]:
+    return value.hex() if value is not None else None
+
+
+class PaymentMetadataStore:
+    """
+    Store for metadata keyed by payment hash.
+
+    The memory tier is an LRU keyed by the 32-byte payment hash with values
+    held as bytes, so its footprint is fixed per entry and bounded by
+    MAX_ENTRIES. Every write goes through to the database, so metadata
+    survives restarts and evicted entries are reloaded on demand. Lookups
+    that miss both tiers are remembered as empty entries so repeated checks
+    for unknown hashes don't hit the database.
+    """
+
+    # Maximum number of payment hashes kept in memory
+    MAX_ENTRIES = 20000
+
+    # Metadata not updated for this long is removed by purge()
+    RETENTION_SECONDS = 30 * 86400  # 30 days
+
+    # Seconds between runs of the purge task
+    PURGE_INTERVAL_SECONDS = 86400  # 1 day
+
+    _entries: "OrderedDict[bytes, _MetadataEntry]" = OrderedDict()
+    _script_keys: "OrderedDict[bytes, bytes]" = OrderedDict()
+
+    @classmethod
+    async def get_preimage(cls, payment_hash: str) -> Optional[str]:
+        """Get the preimage (hex) stored for a payment hash."""
+        entry = await cls._load(payment_hash)
+        return _to_hex(entry.preimage)
+
+    @classmethod
+    async def set_preimage(cls, payment_hash: str, preimage: str) -> None:
+        """Store the preimage (hex) for a payment hash."""
+        entry = await cls._load(payment_hash)
+        entry.preimage = _to_bytes(preimage)
+        await upsert_payment_metadata(payment_hash, preimage=preimage)
+
+    @classmethod
+    async def get_asset_id(cls, payment_hash: str) -> Optional[str]:
+        """Get the asset ID (hex) stored for a payment hash."""
+        entry = await cls._load(payment_hash)
+        return _to_hex(entry.asset_id)
+
+    @classmethod
+    async def set_asset_id(cls, payment_hash: str, asset_id: str) -> None:
+        """Store the asset ID (hex) for a payment hash."""
+        entry = await cls._load(payment_hash)
+        entry.asset_id = _to_bytes(asset_id)
+        await upsert_payment_metadata(payment_hash, asset_id=asset_id)
+
+    @classmethod
+    async def set_script_key(cls, payment_hash: str, script_key: str) -> None:
+        """Map a script key (hex) to a payment hash."""
+        entry = await cls._load(payment_hash)
+        entry.script_key = _to_bytes(script_key)
+        cls._remember_script_key(entry.script_key, bytes.fromhex(payment_hash))
+        await upsert_payment_metadata(payment_hash, script_key=script_key)
+
+    @classmethod
+    async def get_payment_hash_by_script_key(cls, script_key: str) -> Optional[str]:
+        """Get the payment hash (hex) mapped to a script key."""
+        key = bytes.fromhex(script_key)
+        payment_hash = cls._script_keys.get(key)
+        if payment_hash is not None:
+            cls._script_keys.move_to_end(key)
+            return payment_hash.hex()
+
+        row = await get_payment_metadata_by_script_key(script_key)
+        if not row:
+            return None
+        cls._remember_loaded(bytes.fromhex(row.payment_hash), cls._entry_from_row(row))
+        return row.payment_hash
+
+    @classmethod
+    async def is_settled(cls, payment_hash: str) -> bool:
+        """Whether a payment hash has been marked as settled."""
+        entry = await cls._load(payment_hash)
+        return entry.settled
+
+    @classmethod
+    async def mark_settled(cls, payment_hash: str, conn=None) -> None:
+        """
+        Mark a payment hash as settled.
+
+        Args:
+            payment_hash: The payment hash (hex)
+            conn: Optional database connection, to write the flag inside a caller's transaction
+        """
+        entry = await cls._load(payment_hash)
+        if entry.settled:
+            return
+        await upsert_payment_metadata(payment_hash, conn=conn, settled=True)
+
+        # Only flag the entry once the write is visible; a rolled back
+        # settlement must still read as unsettled
+        key = bytes.fromhex(payment_hash)
+
+        def _flag_settled() -> None:
+            cached = cls._entries.get(key)
+            if cached is not None:
+                cached.settled = True
+
+        after_commit(conn, _flag_settled)
+
+    @classmethod
+    async def prefetch(cls, payment_hashes: Iterable[str]) -> int:
+        """
+        Load metadata for many payment hashes into memory with one query.
+
+        Used when resuming invoice monitoring so that settlement checks for the
+        recovered invoices are served from memory.
+
+        Args:
+            payment_hashes: The payment hashes (hex) to load
+
+        Returns:
+            int: Number of payment hashes that had stored metadata
+        """
+        missing = [
+            payment_hash for payment_hash in dict.fromkeys(payment_hashes)
+            if bytes.fromhex(payment_hash) not in cls._entries
+        ]
+        if not missing:
+            return 0
+
+        found = 0
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            rows = await get_payment_metadata_many(chunk)
+            for payment_hash in chunk:
+                row = rows.get(payment_hash)
+                cls._remember_loaded(bytes.fromhex(payment_hash), cls._entry_from_row(row) if row else _MetadataEntry())
+            found += len(rows)
+
+        log_debug(TRANSFER, f"Prefetched metadata for {len(missing)} payment hashes ({found} stored)")
+        return found
+
+    @classmethod
+    async def purge(cls, max_age_seconds: Optional[int] = None) -> None:
+        """
+        Delete stored metadata that has not been updated recently.
+
+        Args:
+            max_age_seconds: Age limit in seconds, defaults to RETENTION_SECONDS
+        """
+        cutoff = datetime.now() - timedelta(seconds=max_age_seconds or cls.RETENTION_SECONDS)
+        await delete_payment_metadata_before(cutoff)
+        cls._entries.clear()
+        cls._script_keys.clear()
+        log_info(TRANSFER, f"Purged payment metadata last updated before {cutoff.isoformat()}")
+
+    @classmethod
+    async def run_purger(cls) -> None:
+        """Run purge() forever; used as a scheduled task."""
+        log_info(TRANSFER, f"Payment metadata purger started (interval {cls.PURGE_INTERVAL_SECONDS}s)")
+        while True:
+            try:
+                await cls.purge()
+            except Exception as e:
+                log_error(TRANSFER, f"Payment metadata purge failed: {str(e)}")
+            await asyncio.sleep(cls.PURGE_INTERVAL_SECONDS)
+
+    @classmethod
+    async def _load(cls, payment_hash: str) -> _MetadataEntry:
+        """Get the entry for a payment hash from memory, falling back to the database."""
+        key = bytes.fromhex(payment_hash)
+        entry = cls._entries.get(key)
+        if entry is not None:
+            cls._entries.move_to_end(key)
+            return entry
+
+        try:
+            row = await get_payment_metadata(payment_hash)
+        except Exception as e:
+            # Serve from memory only; the entry is reloaded once it's evicted
+            log_warning(TRANSFER, f"Failed to load metadata for {payment_hash[:8]}...: {str(e)}")
+            row = None
+
+        return cls._remember_loaded(key, cls._entry_from_row(row) if row else _MetadataEntry())
+
+    @classmethod
+    def _remember(cls, key: bytes, entry: _MetadataEntry) -> None:
+        """Add an entry to the memory tier, evicting the least recently used ones."""
+        cls._entries[key] = entry
+        cls._entries.move_to_end(key)
+        while len(cls._entries) > cls.MAX_ENTRIES:
+            cls._entries.popitem(last=False)
+        if entry.script_key:
+            cls._remember_script_key(entry.script_key, key)
+
+    @classmethod
+    def _remember_loaded(cls, key: bytes, entry: _MetadataEntry) -> _MetadataEntry:
+        """
+        Add an entry read from the database, unless one was added meanwhile.
+
+        Another task may have loaded the hash and set fields on its entry
+        while this one awaited the database; that entry is kept and returned.
+        """
+        existing = cls._entries.get(key)
+        if existing is not None:
+            cls._entries.move_to_end(key)
+            return existing
+        cls._remember(key, entry)
+        return entry
+
+    @classmethod
+    def _remember_script_key(cls, script_key: bytes, payment_hash: bytes) -> None:
+        """Add a script key mapping to the memory tier."""
+        cls._script_keys[script_key] = payment_hash
+        cls._script_keys.move_to_end(script_key)
+        while len(cls._script_keys) > cls.MAX_ENTRIES:
+            cls._script_keys.popitem(last=False)
+
+    @staticmethod
+    def _entry_from_row(row) -> _MetadataEntry:
+        return _MetadataEntry(
+            preimage=_to_bytes(row.preimage),
+            asset_id=_to_bytes(row.asset_id),
+            script_key=_to_bytes(row.script_key),
+            settled=bool(row.settled)
+        )
@@ -13,19 +13,19 @@ import bolt11
 
 from lnbits.core.models import WalletTypeInfo
 
-from ..models import TaprootPaymentRequest, PaymentResponse, ParsedInvoice, TaprootPayment
-from ..logging_utils import log_debug, log_info, log_warning, log_error, PAYMENT, API
+from ..models import (
+    TaprootPaymentRequest, PaymentResponse, ParsedInvoice, TaprootPayment, InvoiceClassification,
+    PaginatedResponse
+)
+from ..logging_utils import log_debug, log_info, log_warning, log_error, log_event, is_enabled, PAYMENT, API
 from ..tapd.taproot_factory import TaprootAssetsFactory
 from ..error_utils import raise_http_exception, ErrorContext, handle_error
+from ..tracing import set_span_attributes
 from ..tapd.taproot_adapter import lightning_pb2
 # Import from crud re-exports
-from ..crud import (
-    get_invoice_by_payment_hash,
-    is_internal_payment,
-    is_self_payment,
-    get_user_payments
-)
+from ..crud import get_user_payments
 from .settlement_service import SettlementService
+from .invoice_resolver import InvoiceResolver
 
 
 class PaymentService:
@@ -56,30 +56,26 @@ class PaymentService:
         """
         try:
             with ErrorContext("process_payment", PAYMENT):
-                # RFQ Debug: Generate session ID for tracking
-                import hashlib
-                import time
-                rfq_session_id = hashlib.sha256(f"{data.payment_request}{time.time()}".encode()).hexdigest()[:16]
-                log_info(PAYMENT, f"RFQ_DEBUG: Session {rfq_session_id} - Starting payment process")
-                log_info(PAYMENT, f"RFQ_DEBUG: Session {rfq_session_id} - Asset ID: {data.asset_id}")
-                log_info(PAYMENT, f"RFQ_DEBUG: Session {rfq_session_id} - Fee limit: {data.fee_limit_sats}")
-                
                 # Parse the invoice to get payment details
                 parsed_invoice = await cls.parse_invoice(data.payment_request)
-                log_info(PAYMENT, f"RFQ_DEBUG: Session {rfq_session_id} - Invoice amount: {parsed_invoice.amount}")
-                log_info(PAYMENT, f"RFQ_DEBUG: Session {rfq_session_id} - Payment hash: {parsed_invoice.payment_hash}")
                 
-                # Determine the payment type if not forced
-                if force_payment_type:
-                    payment_type = force_payment_type
-                    log_info(PAYMENT, f"Using forced payment type: {payment_type}")
-                else:
-                    payment_type = await cls.determine_payment_type(
-                        parsed_invoice.payment_hash, wallet.wallet.user
-                    )
-                    log_info(PAYMENT, f"Payment type determined: {payment_type}")
+                # Look the invoice up once and carry the classification through
+                classification = await cls.classify_payment(
+                    parsed_invoice.payment_hash, wallet.wallet.user
+                )
                 
-                log_info(PAYMENT, f"RFQ_DEBUG: Session {rfq_session_id} - Payment type: {payment_type}")
+                # Determine the payment type if not forced
+                payment_type = force_payment_type or classification.payment_type
+                set_span_attributes(
+                    payment_hash=parsed_invoice.payment_hash, asset_id=data.asset_id,
+                    payment_type=payment_type
+                )
+                log_event(
+                    PAYMENT, "info", "processing payment",
+                    payment_hash=parsed_invoice.payment_hash, payment_type=payment_type,
+                    forced=bool(force_payment_type), asset_id=data.asset_id,
+                    amount=parsed_invoice.amount, fee_limit_sats=data.fee_limit_sats
+                )
                 
                 # Reject self-payments
                 if payment_type == "self":
@@ -95,7 +91,7 @@ class PaymentService:
                 
                 # Process based on payment type
                 if payment_type == "internal":
-                    return await cls._process_internal_payment(data, wallet, parsed_invoice)
+                    return await cls._process_internal_payment(data, wallet, parsed_invoice, classification)
                 else:
                     return await cls._process_external_payment(data, wallet, parsed_invoice)
         except Exception as e:
@@ -131,7 +127,8 @@ class PaymentService:
         cls,
         data: TaprootPaymentRequest,
         wallet: WalletTypeInfo,
-        parsed_invoice: ParsedInvoice
+        parsed_invoice: ParsedInvoice,
+        classification: Optional[InvoiceClassification] = None
     ) -> PaymentResponse:
         """
         Process an internal payment (between users on the same node).
@@ -140,13 +137,18 @@ class PaymentService:
             data: The payment request data
             wallet: The wallet information
             parsed_invoice: The parsed invoice data
+            classification: Optional classification already resolved for this payment hash
             
         Returns:
             PaymentResponse: The payment result
         """
         with ErrorContext("process_internal_payment", PAYMENT):
             # Get the invoice to retrieve asset_id
-            invoice = await get_invoice_by_payment_hash(parsed_invoice.payment_hash)
+            if not classification:
+                classification = await cls.classify_payment(
+                    parsed_invoice.payment_hash, wallet.wallet.user
+                )
+            invoice = classification.invoice
             if not invoice:
                 log_error(PAYMENT, f"Invoice not found for payment hash: {parsed_invoice.payment_hash}")
                 return PaymentResponse(
@@ -164,9 +166,6 @@ class PaymentService:
                 wallet_id=wallet.wallet.id
             )
             
-            # Check if this is a self-payment
-            is_self = await is_self_payment(parsed_invoice.payment_hash, wallet.wallet.user)
-            
             # Create sender information dictionary
             sender_info = {
                 "wallet_id": wallet.wallet.id,
@@ -187,9 +186,10 @@ class PaymentService:
                     wallet_id=wallet.wallet.id,
                     node=taproot_wallet.node,
                     is_internal=True,
-                    is_self_payment=is_self,
+                    is_self_payment=classification.is_self,
                     description=invoice.description or "",
-                    sender_info=sender_info
+                    sender_info=sender_info,
+                    invoice=invoice
                 )
                 
                 if not success:
@@ -270,37 +270,7 @@ class PaymentService:
                 asset_id_to_use = None
                 
             # Check Bitcoin balance before attempting payment
-            try:
-                # Get channel balances before payment using existing Lightning stub
-                channels_before = await taproot_wallet.node.ln_stub.ListChannels(lightning_pb2.ListChannelsRequest())
-                log_info(PAYMENT, f"RFQ_DEBUG: Channels before payment: {len(channels_before.channels)} channels")
-                
-                # Check if we have sufficient Bitcoin balance for Lightning routing
-                total_local_balance = 0
-                total_local_reserve = 0
-                min_htlc_amount = 0
-                for ch in channels_before.channels:
-                    if ch.active:
-                        log_info(PAYMENT, f"RFQ_DEBUG: Channel {ch.channel_point[:30]}... - Local: {ch.local_balance}, Remote: {ch.remote_balance}")
-                        total_local_balance += ch.local_balance
-                        total_local_reserve += ch.local_constraints.chan_reserve_sat
-                        # Use dust limit as minimum for Taproot Asset payments (354 sats)
-                        min_htlc_amount = max(min_htlc_amount, ch.local_constraints.dust_limit_sat)
-                
-                # Check if we have enough Bitcoin balance above reserves + minimum payment amount
-                # Use higher threshold (5500 sats) for Taproot Asset payments due to anchor channels and routing requirements
-                required_balance = max(total_local_reserve + min_htlc_amount, 5500)
-                if total_local_balance <= required_balance:
-                    raise HTTPException(
-                        status_code=HTTPStatus.BAD_REQUEST,
-                        detail="Insufficient Bitcoin balance for Lightning routing"
-                    )
-                    
-            except HTTPException:
-                # Re-raise HTTP exceptions
-                raise
-            except Exception as e:
-                log_warning(PAYMENT, f"RFQ_DEBUG: Could not get channel state before: {e}")
+            await cls.check_routing_balance(taproot_wallet.node)
             
             # Smart peer selection: If no peer specified, try to find the right one
             peer_to_use = data.peer_pubkey
@@ -319,32 +289,7 @@ class PaymentService:
                     wallet_info = WalletTypeInfo(key_type=KeyType.admin, wallet=wallet_obj)
                     assets = await AssetService.list_assets(wallet_info)
                     
-                    # Find a channel with matching asset_id and destination peer
-                    for asset in assets:
-                        if (asset.get("asset_id") == asset_id_to_use and 
-                            asset.get("channel_info") and 
-                            asset["channel_info"].get("peer_pubkey")):
-                            
-                            channel_peer = asset["channel_info"]["peer_pubkey"]
-                            if channel_peer == destination_node:
-                                peer_to_use = channel_peer
-                                peer_alias = asset["channel_info"].get("peer_alias", f"{peer_to_use[:16]}...")
-                                log_info(PAYMENT, f"Auto-selected matching peer {peer_alias} for payment")
-                                break
-                    
-                    # If no exact match found, use any available channel for this asset
-                    if not peer_to_use:
-                        log_warning(PAYMENT, f"No channel found for destination {destination_node[:16]}..., will try any available channel")
-                        for asset in assets:
-                            if (asset.get("asset_id") == asset_id_to_use and 
-                                asset.get("channel_info") and 
-                                asset["channel_info"].get("peer_pubkey") and
-                                asset["channel_info"].get("active", True)):
-                                
-                                peer_to_use = asset["channel_info"]["peer_pubkey"]
-                                peer_alias = asset["channel_info"].get("peer_alias", f"{peer_to_use[:16]}...")
-                                log_info(PAYMENT, f"Using available peer {peer_alias} for payment (no exact match)")
-                                break
+                    peer_to_use = cls.select_peer(assets, asset_id_to_use, destination_node)
                 else:
                     log_warning(PAYMENT, f"No destination node in invoice, using any available channel")
             
@@ -358,17 +303,20 @@ class PaymentService:
                 peer_pubkey=peer_to_use
             )
             
-            log_info(PAYMENT, f"Raw payment result: {payment_result}")
-            
-            # RFQ Debug: Get channel state after payment
-            try:
-                channels_after = await taproot_wallet.node.ln_stub.ListChannels(lightning_pb2.ListChannelsRequest())
-                log_info(PAYMENT, f"RFQ_DEBUG: Channels after payment: {len(channels_after.channels)} channels")
-                for ch in channels_after.channels:
-                    if ch.active:
-                        log_info(PAYMENT, f"RFQ_DEBUG: Channel {ch.channel_point[:30]}... - Local: {ch.local_balance}, Remote: {ch.remote_balance}")
-            except Exception as e:
-                log_warning(PAYMENT, f"RFQ_DEBUG: Could not get channel state after: {e}")
+            log_event(PAYMENT, "debug", "raw payment result", result=payment_result)
+            
+            # Channel state after payment, for debugging RFQ payments; skips the RPC unless logged
+            if is_enabled(PAYMENT, "debug"):
+                try:
+                    channels_after = await taproot_wallet.node.ln_stub.ListChannels(lightning_pb2.ListChannelsRequest())
+                    for ch in channels_after.channels:
+                        if ch.active:
+                            log_event(
+                                PAYMENT, "debug", "channel after payment",
+                                channel=ch.channel_point[:30], local=ch.local_balance, remote=ch.remote_balance
+                            )
+                except Exception as e:
+                    log_warning(PAYMENT, f"Could not get channel state after payment: {e}")
 
             # Verify payment success
             if "status" in payment_result and payment_result["status"] != "success":
@@ -433,6 +381,98 @@ class PaymentService:
                 description=description
             )
     
+    @staticmethod
+    async def check_routing_balance(node) -> None:
+        """
+        Check that the node has enough Bitcoin balance for Lightning routing.
+        
+        Args:
+            node: The TaprootAssetsNodeExtension instance
+            
+        Raises:
+            HTTPException: If the local balance does not cover reserves and the minimum HTLC
+        """
+        try:
+            # Get channel balances before payment using existing Lightning stub
+            channels_before = await node.ln_stub.ListChannels(lightning_pb2.ListChannelsRequest())
+            
+            # Check if we have sufficient Bitcoin balance for Lightning routing
+            total_local_balance = 0
+            total_local_reserve = 0
+            min_htlc_amount = 0
+            for ch in channels_before.channels:
+                if ch.active:
+                    log_event(
+                        PAYMENT, "debug", "channel before payment",
+                        channel=ch.channel_point[:30], local=ch.local_balance, remote=ch.remote_balance
+                    )
+                    total_local_balance += ch.local_balance
+                    total_local_reserve += ch.local_constraints.chan_reserve_sat
+                    # Use dust limit as minimum for Taproot Asset payments (354 sats)
+                    min_htlc_amount = max(min_htlc_amount, ch.local_constraints.dust_limit_sat)
+            
+            # Check if we have enough Bitcoin balance above reserves + minimum payment amount
+            # Use higher threshold (5500 sats) for Taproot Asset payments due to anchor channels and routing requirements
+            required_balance = max(total_local_reserve + min_htlc_amount, 5500)
+            if total_local_balance <= required_balance:
+                raise HTTPException(
+                    status_code=HTTPStatus.BAD_REQUEST,
+                    detail="Insufficient Bitcoin balance for Lightning routing"
+                )
+                
+        except HTTPException:
+            # Re-raise HTTP exceptions
+            raise
+        except Exception as e:
+            log_warning(PAYMENT, f"Could not get channel state before payment: {e}")
+    
+    @staticmethod
+    def select_peer(
+        assets: List[Dict[str, Any]],
+        asset_id: str,
+        destination_node: str
+    ) -> Optional[str]:
+        """
+        Select the channel peer to pay an invoice through.
+        
+        Prefers a channel for the asset whose peer is the invoice destination,
+        falling back to any active channel for the asset.
+        
+        Args:
+            assets: Assets with channel information, as returned by AssetService.list_assets
+            asset_id: The asset ID used for the payment
+            destination_node: The invoice destination node pubkey
+            
+        Returns:
+            Optional[str]: The selected peer pubkey, or None if no channel matches
+        """
+        # Find a channel with matching asset_id and destination peer
+        for asset in assets:
+            if (asset.get("asset_id") == asset_id and 
+                asset.get("channel_info") and 
+                asset["channel_info"].get("peer_pubkey")):
+                
+                channel_peer = asset["channel_info"]["peer_pubkey"]
+                if channel_peer == destination_node:
+                    peer_alias = asset["channel_info"].get("peer_alias", f"{channel_peer[:16]}...")
+                    log_info(PAYMENT, f"Auto-selected matching peer {peer_alias} for payment")
+                    return channel_peer
+        
+        # If no exact match found, use any available channel for this asset
+        log_warning(PAYMENT, f"No channel found for destination {destination_node[:16]}..., will try any available channel")
+        for asset in assets:
+            if (asset.get("asset_id") == asset_id and 
+                asset.get("channel_info") and 
+                asset["channel_info"].get("peer_pubkey") and
+                asset["channel_info"].get("active", True)):
+                
+                peer_to_use = asset["channel_info"]["peer_pubkey"]
+                peer_alias = asset["channel_info"].get("peer_alias", f"{peer_to_use[:16]}...")
+                log_info(PAYMENT, f"Using available peer {peer_alias} for payment (no exact match)")
+                return peer_to_use
+        
+        return None
+    
     @staticmethod
     async def parse_invoice(payment_request: str) -> ParsedInvoice:
         """
@@ -523,9 +563,30 @@ class PaymentService:
             )
     
     @staticmethod
+    async def classify_payment(
+        payment_hash: str,
+        user_id: str,
+        resolver: Optional[InvoiceResolver] = None
+    ) -> InvoiceClassification:
+        """
+        Classify a payment with a single invoice lookup.
+        
+        Args:
+            payment_hash: The payment hash to check
+            user_id: The current user's ID
+            resolver: Optional request-scoped resolver to share lookups with
+            
+        Returns:
+            InvoiceClassification: Payment type, local invoice and owning wallet
+        """
+        return await (resolver or InvoiceResolver()).classify(payment_hash, user_id)
+    
+    @classmethod
     async def determine_payment_type(
+        cls,
         payment_hash: str, 
-        user_id: str
+        user_id: str,
+        resolver: Optional[InvoiceResolver] = None
     ) -> str:
         """
         Determine the type of payment (external, internal, or self).
@@ -533,37 +594,42 @@ class PaymentService:
         Args:
             payment_hash: The payment hash to check
             user_id: The current user's ID
+            resolver: Optional request-scoped resolver to share lookups with
             
         Returns:
             str: Payment type - "external", "internal", or "self"
         """
-        # Check if this is an internal payment
-        is_internal_pay = await is_internal_payment(payment_hash)
-        
-        if is_internal_pay:
-            # Check if this is a self-payment
-            is_self_pay = await is_self_payment(payment_hash, user_id)
-            return "self" if is_self_pay else "internal"
-        
-        return "external"
+        classification = await cls.classify_payment(payment_hash, user_id, resolver)
+        return classification.payment_type
     
     @staticmethod
-    async def get_user_payments(user_id: str) -> List[TaprootPayment]:
+    async def get_user_payments(
+        user_id: str,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> PaginatedResponse:
         """
-        Get all Taproot Asset payments for a user.
+        Get a page of Taproot Asset payments for a user.
         
         Args:
             user_id: The user ID
+            limit: Maximum number of payments to return
+            cursor: Cursor returned with the previous page, None for the first page
             
         Returns:
-            List[TaprootPayment]: List of payments
+            PaginatedResponse: Payments, newest first, and the cursor for the next page
             
         Raises:
-            HTTPException: If there's an error retrieving payments
+            HTTPException: If the cursor is invalid or there's an error retrieving payments
         """
         try:
-            payments = await get_user_payments(user_id)
-            return payments
+            payments, next_cursor = await get_user_payments(user_id, limit=limit, cursor=cursor)
+            return PaginatedResponse(data=payments, next_cursor=next_cursor)
+        except ValueError as e:
+            raise_http_exception(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=str(e),
+            )
         except Exception as e:
             log_error(PAYMENT, f"Error retrieving payments: {str(e)}")
             raise_http_exception(
@@ -11,16 +11,17 @@ import grpc.aio
 from abc import ABC, abstractmethod
 from loguru import logger
 
-from lnbits.utils.cache import cache
 from ..tapd.taproot_adapter import invoices_pb2
 from .notification_service import NotificationService
+from .payment_metadata_store import PaymentMetadataStore
 from ..models import TaprootInvoice, TaprootPayment
-from ..db_utils import transaction, with_transaction
+from ..db_utils import transaction
 
 # Import database functions from crud re-exports
 from ..crud import (
     get_invoice_by_payment_hash,
-    update_invoice_status,
+    get_invoice_status,
+    transition_invoice_status,
     is_internal_payment,
     is_self_payment,
     record_asset_transaction,
@@ -33,7 +34,11 @@ from ..logging_utils import (
     log_debug, log_info, log_warning, log_error, 
     log_exception, PAYMENT, TRANSFER, LogContext
 )
-from ..error_utils import ErrorContext, handle_error
+from ..error_utils import ErrorContext, TaprootAssetError, handle_error
+
+# Statuses an invoice can be settled from; a paid invoice is never settled twice
+SETTLEABLE_STATUSES = ("pending", "expired", "cancelled")
+
 
 # Define a settlement strategy abstract base class
 class SettlementStrategy(ABC):
@@ -63,30 +68,31 @@ class SettlementStrategy(ABC):
         """
         pass
     
-    async def update_invoice_status(
+    async def mark_invoice_paid(
         self, 
         invoice_id: str, 
-        status: str, 
         conn=None
-    ) -> Tuple[bool, Optional[TaprootInvoice]]:
+    ) -> Optional[TaprootInvoice]:
         """
-        Update the status of an invoice.
+        Mark an invoice as paid unless it already is.
+        
+        The check and the write are one conditional UPDATE, so of several
+        concurrent settlements of the same invoice exactly one gets the
+        invoice back and goes on to move funds.
         
         Args:
             invoice_id: The ID of the invoice to update
-            status: The new status
             conn: Optional database connection
             
         Returns:
-            Tuple containing:
-                - Success status (bool)
-                - Updated invoice if successful, None otherwise
+            The updated invoice if this call settled it, None if it was already paid
         """
-        updated_invoice = await update_invoice_status(invoice_id, status, conn=conn)
-        if not updated_invoice or updated_invoice.status != status:
-            log_error(TRANSFER, f"Failed to update invoice {invoice_id} status in database")
-            return False, None
-        return True, updated_invoice
+        updated_invoice = await transition_invoice_status(
+            invoice_id, "paid", expected_statuses=SETTLEABLE_STATUSES, conn=conn
+        )
+        if not updated_invoice:
+            log_info(TRANSFER, f"Invoice {invoice_id} is already paid, skipping settlement")
+        return updated_invoice
     
     async def record_asset_transaction(
         self,
@@ -210,26 +216,31 @@ class InternalPaymentStrategy(SettlementStrategy):
             
             is_self_payment = context.get("is_self_payment", False)
             
-            # Use transaction context manager to ensure atomicity
-            async with transaction() as conn:
-                # Update invoice status to paid
-                status_updated, updated_invoice = await self.update_invoice_status(invoice.id, "paid", conn=conn)
-                if not status_updated:
-                    return False, {"error": "Failed to update invoice status"}
-                
-                # Credit the recipient
-                credit_success = await self.record_asset_transaction(
-                    wallet_id=invoice.wallet_id,
-                    asset_id=invoice.asset_id,
-                    amount=invoice.asset_amount,
-                    tx_type="credit",
-                    payment_hash=payment_hash,
-                    description=invoice.description or "",
-                    conn=conn
-                )
-                
-                if not credit_success:
-                    return False, {"error": "Failed to record asset transaction"}
+            # Use transaction context manager to ensure atomicity. Raising on a
+            # failed credit rolls back the status change, so the invoice stays
+            # settleable instead of being paid without a credit
+            try:
+                async with transaction() as conn:
+                    # Update invoice status to paid; doubles as the idempotency guard
+                    updated_invoice = await self.mark_invoice_paid(invoice.id, conn=conn)
+                    if not updated_invoice:
+                        return True, {"already_settled": True}
+                    
+                    # Credit the recipient
+                    credit_success = await self.record_asset_transaction(
+                        wallet_id=invoice.wallet_id,
+                        asset_id=invoice.asset_id,
+                        amount=invoice.asset_amount,
+                        tx_type="credit",
+                        payment_hash=payment_hash,
+                        description=invoice.description or "",
+                        conn=conn
+                    )
+                    
+                    if not credit_success:
+                        raise TaprootAssetError("Failed to record asset transaction")
+            except TaprootAssetError as e:
+                return False, {"error": str(e)}
             
             payment_type = "self-payment" if is_self_payment else "internal payment"
             log_info(TRANSFER, f"Database updated: Invoice {invoice.id} status set to paid ({payment_type})")
@@ -294,37 +305,41 @@ class InternalPaymentWithSenderStrategy(SettlementStrategy):
                 log_debug(PAYMENT, "No asset ID available from client or invoice")
                 debit_asset_id = None
                 
-            # Use transaction context manager to ensure atomicity
-            async with transaction() as conn:
-                # 1. Update invoice status to paid
-                status_updated, updated_invoice = await self.update_invoice_status(invoice.id, "paid", conn=conn)
-                if not status_updated:
-                    return False, {"error": "Failed to update invoice status"}
-                
-                # 2. Credit the recipient (record transaction and update balance)
-                credit_success = await self.record_asset_transaction(
-                    wallet_id=invoice.wallet_id,
-                    asset_id=invoice.asset_id,
-                    amount=invoice.asset_amount,
-                    tx_type="credit",
-                    payment_hash=payment_hash,
-                    description=invoice.description or "",
-                    conn=conn
-                )
-                
-                # 3. Debit the sender (record transaction and update balance)
-                debit_success = await self.record_asset_transaction(
-                    wallet_id=sender_wallet_id,
-                    asset_id=debit_asset_id,
-                    amount=invoice.asset_amount,
-                    tx_type="debit",
-                    payment_hash=payment_hash,
-                    description=invoice.description or "",
-                    conn=conn
-                )
-                
-                if not credit_success or not debit_success:
-                    return False, {"error": "Failed to record asset transactions"}
+            # Use transaction context manager to ensure atomicity. Raising on a
+            # failed credit or debit rolls back the status change and the other side
+            try:
+                async with transaction() as conn:
+                    # 1. Update invoice status to paid; doubles as the idempotency guard
+                    updated_invoice = await self.mark_invoice_paid(invoice.id, conn=conn)
+                    if not updated_invoice:
+                        return True, {"already_settled": True}
+                    
+                    # 2. Credit the recipient (record transaction and update balance)
+                    credit_success = await self.record_asset_transaction(
+                        wallet_id=invoice.wallet_id,
+                        asset_id=invoice.asset_id,
+                        amount=invoice.asset_amount,
+                        tx_type="credit",
+                        payment_hash=payment_hash,
+                        description=invoice.description or "",
+                        conn=conn
+                    )
+                    
+                    # 3. Debit the sender (record transaction and update balance)
+                    debit_success = await self.record_asset_transaction(
+                        wallet_id=sender_wallet_id,
+                        asset_id=debit_asset_id,
+                        amount=invoice.asset_amount,
+                        tx_type="debit",
+                        payment_hash=payment_hash,
+                        description=invoice.description or "",
+                        conn=conn
+                    )
+                    
+                    if not credit_success or not debit_success:
+                        raise TaprootAssetError("Failed to record asset transactions")
+            except TaprootAssetError as e:
+                return False, {"error": str(e)}
             
             payment_type = "self-payment" if is_self_payment else "internal payment"
             log_info(TRANSFER, f"Database updated: Invoice {invoice.id} status set to paid ({payment_type})")
@@ -391,6 +406,11 @@ class LightningPaymentStrategy(SettlementStrategy):
                 if "invoice is already settled" in e.details().lower():
                     log_info(TRANSFER, f"Lightning invoice {payment_hash[:8]}... was already settled on the node")
                     lightning_settled = True
+                elif e.code() == grpc.StatusCode.DEADLINE_EXCEEDED:
+                    # lnd may still apply the settle; the caller records it
+                    # once the invoice shows up as settled
+                    log_warning(TRANSFER, f"Settling Lightning invoice {payment_hash[:8]}... timed out, outcome unknown")
+                    return False, {"error": "Lightning settlement timed out", "settle_unknown": True}
                 else:
                     error_message = f"gRPC error in settle_invoice: {e.code()}: {e.details()}"
                     log_error(TRANSFER, error_message)
@@ -399,18 +419,37 @@ class LightningPaymentStrategy(SettlementStrategy):
             if not lightning_settled:
                 return False, {"error": error_message or "Lightning settlement failed"}
             
-            # Update the invoice status in the database if we have an invoice record
+            # Mark the invoice paid and credit the recipient in one transaction,
+            # unless another settlement of this invoice already did
             updated_invoice = None
             if invoice:
-                # Use transaction context manager to ensure atomicity
-                async with transaction() as conn:
-                    status_updated, updated_invoice = await self.update_invoice_status(invoice.id, "paid", conn=conn)
+                # Use transaction context manager to ensure atomicity. A failed
+                # credit rolls back the status change; the invoice stays pending
+                # and is settled again when its monitor sees it settled on the node
+                try:
+                    async with transaction() as conn:
+                        updated_invoice = await self.mark_invoice_paid(invoice.id, conn=conn)
+                        if not updated_invoice:
+                            return True, {"already_settled": True}
+                        
+                        credit_success = await self.record_asset_transaction(
+                            wallet_id=invoice.wallet_id,
+                            asset_id=invoice.asset_id,
+                            amount=invoice.asset_amount,
+                            tx_type="credit",
+                            payment_hash=payment_hash,
+                            description=invoice.description or "",
+                            conn=conn
+                        )
+                        if not credit_success:
+                            raise TaprootAssetError(
+                                f"Failed to credit invoice {invoice.id} to wallet {invoice.wallet_id}"
+                            )
+                except TaprootAssetError as e:
+                    log_error(TRANSFER, str(e))
+                    return False, {"error": str(e), "lightning_settled": True}
                 
-                if status_updated:
-                    log_info(TRANSFER, f"Database updated: Invoice {invoice.id} status set to paid")
-                else:
-                    log_error(TRANSFER, f"Failed to update invoice {invoice.id} status in database")
-                    # Note: We don't fail the operation here since the Lightning settlement succeeded
+                log_info(TRANSFER, f"Database updated: Invoice {invoice.id} status set to paid")
             
             # Return success with details
             return True, self.format_result(
@@ -428,9 +467,6 @@ class SettlementService:
     preserving the unique aspects of each.
     """
     
-    # Cache expiry time in seconds
-    SETTLED_PAYMENT_CACHE_EXPIRY = 86400  # 24 hours
-    
     # Strategy instances
     _internal_strategy = InternalPaymentStrategy()
     _internal_with_sender_strategy = InternalPaymentWithSenderStrategy()
@@ -485,7 +521,8 @@ class SettlementService:
         is_self_payment: bool = False,
         user_id: Optional[str] = None,
         wallet_id: Optional[str] = None,
-        sender_info: Optional[Dict[str, Any]] = None
+        sender_info: Optional[Dict[str, Any]] = None,
+        invoice: Optional[TaprootInvoice] = None
     ) -> Tuple[bool, Optional[Dict[str, Any]]]:
         """
         Settle an invoice using the appropriate strategy based on payment type.
@@ -498,6 +535,7 @@ class SettlementService:
             user_id: Optional user ID for notification
             wallet_id: Optional wallet ID for balance updates
             sender_info: Optional information about the sender for internal payments
+            invoice: Optional invoice already resolved by the caller, to avoid another lookup
             
         Returns:
             Tuple containing:
@@ -505,21 +543,12 @@ class SettlementService:
                 - Optional result data dictionary
         """
         log_context = "internal payment" if is_internal else "Lightning payment"
-        with ErrorContext(f"settle_invoice_{log_context}", TRANSFER):
+        with ErrorContext(f"settle_invoice_{log_context}", TRANSFER, payment_hash=payment_hash):
             with LogContext(TRANSFER, f"settling invoice {payment_hash[:8]}... ({log_context})", log_level="info"):
-                # Check if already settled in cache
-                is_settled = cache.get(f"taproot:settled:{payment_hash}")
-                if is_settled:
-                    log_info(TRANSFER, f"Invoice {payment_hash[:8]}... already marked as settled in memory, skipping")
-                    return True, {"already_settled": True}
-                
-                # Check if already settled in database
-                invoice = await get_invoice_by_payment_hash(payment_hash)
-                if invoice and invoice.status == "paid":
-                    log_info(TRANSFER, f"Invoice {payment_hash[:8]}... already paid in database, skipping")
-                    # Add to cache to avoid future DB lookups
-                    cache.set(f"taproot:settled:{payment_hash}", True, expiry=cls.SETTLED_PAYMENT_CACHE_EXPIRY)
-                    return True, {"already_settled": True}
+                # Settling an already paid invoice is guarded by the strategies'
+                # conditional status update, so no separate check is needed here
+                if not invoice:
+                    invoice = await get_invoice_by_payment_hash(payment_hash)
                 
                 # Get or generate preimage
                 preimage_hex = await cls._get_or_generate_preimage(node, payment_hash)
@@ -550,20 +579,9 @@ class SettlementService:
                 
                 # If successful, track settlement
                 if success:
-                    cache.set(f"taproot:settled:{payment_hash}", True, expiry=cls.SETTLED_PAYMENT_CACHE_EXPIRY)
-                    
-                    # For Lightning payments, update asset balance if invoice exists
-                    if not is_internal and invoice:
-                        # Update asset balance if it's not an internal payment
-                        async with transaction() as conn:
-                            await cls._update_asset_balance(
-                                invoice.wallet_id,
-                                invoice.asset_id,
-                                invoice.asset_amount,
-                                payment_hash,
-                                invoice.description,
-                                conn=conn
-                            )
+                    await PaymentMetadataStore.mark_settled(payment_hash)
+                    if result.get("already_settled"):
+                        return success, result
                     
                     # Send WebSocket notifications if invoice exists
                     if invoice:
@@ -589,7 +607,8 @@ class SettlementService:
         is_self_payment: bool = False,
         description: Optional[str] = None,
         preimage: Optional[str] = None,
-        sender_info: Optional[Dict[str, Any]] = None
+        sender_info: Optional[Dict[str, Any]] = None,
+        invoice: Optional[TaprootInvoice] = None
     ) -> Tuple[bool, Dict[str, Any]]:
         """
         Unified method to handle all payment settlement operations.
@@ -609,13 +628,14 @@ class SettlementService:
             description: Optional description
             preimage: Optional preimage
             sender_info: Optional sender information for internal payments
+            invoice: Optional invoice already resolved by the caller
             
         Returns:
             Tuple containing:
                 - Success status (bool)
                 - Result dictionary with payment details
         """
-        with ErrorContext("process_payment_settlement", PAYMENT):
+        with ErrorContext("process_payment_settlement", PAYMENT, payment_hash=payment_hash, asset_id=asset_id):
             log_info(PAYMENT, f"Processing payment settlement: hash={payment_hash[:8]}..., type={'internal' if is_internal else 'external'}")
             
             # Step 1: Settle the invoice if this is an internal payment
@@ -632,7 +652,8 @@ class SettlementService:
                     is_self_payment=is_self_payment,
                     user_id=user_id,
                     wallet_id=wallet_id,
-                    sender_info=sender_info
+                    sender_info=sender_info,
+                    invoice=invoice
                 )
                 
                 if not settle_success:
@@ -725,7 +746,7 @@ class SettlementService:
             log_info(PAYMENT, f"Recording payment: hash={payment_hash[:8]}..., asset_amount={asset_amount}, fee_sats={fee_sats}")
             
             # Check if we've already processed this payment hash to avoid duplicates
-            is_processed = cache.get(f"taproot:settled:{payment_hash}")
+            is_processed = await PaymentMetadataStore.is_settled(payment_hash)
             if is_processed and is_internal:
                 # For internal payments, we already handled both sides in settle_invoice
                 # Just create the payment record for notification purposes
@@ -751,14 +772,15 @@ class SettlementService:
             elif is_processed:
                 log_info(PAYMENT, f"Payment {payment_hash[:8]}... already processed, skipping record creation")
                 return True, None
-                
+                    
             
-            # Use transaction context manager with retry capability
-            async with transaction(conn=conn, max_retries=5, retry_delay=0.2) as tx_conn:
-                try:
+            # Use transaction context manager with retry capability. Errors are
+            # caught outside it, so a failed debit rolls back the payment record
+            try:
+                async with transaction(conn=conn, max_retries=5, retry_delay=0.2) as tx_conn:
                     # Check if the invoice is already paid
-                    invoice = await get_invoice_by_payment_hash(payment_hash, conn=tx_conn)
-                    if invoice and invoice.status == "paid":
+                    invoice_status = await get_invoice_status(payment_hash, conn=tx_conn)
+                    if invoice_status and invoice_status.status == "paid":
                         log_info(PAYMENT, f"Invoice for payment {payment_hash[:8]}... is already paid, skipping payment record")
                         return True, None
                     
@@ -782,7 +804,7 @@ class SettlementService:
                         strategy = cls._internal_strategy
                         
                         # Record the transaction
-                        await strategy.record_asset_transaction(
+                        debit_success = await strategy.record_asset_transaction(
                             wallet_id=wallet_id,
                             asset_id=asset_id,
                             amount=asset_amount,
@@ -791,14 +813,16 @@ class SettlementService:
                             description=description or "",
                             conn=tx_conn
                         )
+                        if not debit_success:
+                            raise TaprootAssetError("Failed to record the payment debit")
                     
-                    # Add to settled payment hashes cache
-                    cache.set(f"taproot:settled:{payment_hash}", True, expiry=cls.SETTLED_PAYMENT_CACHE_EXPIRY)
+                    # Mark the payment hash as settled
+                    await PaymentMetadataStore.mark_settled(payment_hash, conn=tx_conn)
                     
                     log_info(PAYMENT, f"Payment record created successfully for hash={payment_hash[:8]}...")
-                except Exception as e:
-                    log_error(PAYMENT, f"Failed to record payment: {str(e)}")
-                    return False, None
+            except Exception as e:
+                log_error(PAYMENT, f"Failed to record payment: {str(e)}")
+                return False, None
             
             # Send notifications after the transaction is committed
             try:
@@ -823,7 +847,7 @@ class SettlementService:
     async def _get_or_generate_preimage(cls, node, payment_hash: str) -> Optional[str]:
         """Get an existing preimage or generate a new one if needed."""
         # Try to get existing preimage
-        preimage_hex = node._get_preimage(payment_hash)
+        preimage_hex = await node._get_preimage(payment_hash)
         
         # Generate a new one if not found
         if not preimage_hex:
@@ -831,61 +855,10 @@ class SettlementService:
             preimage = hashlib.sha256(f"{payment_hash}_{time.time()}".encode()).digest()
             preimage_hex = preimage.hex()
             # Store it
-            node._store_preimage(payment_hash, preimage_hex)
+            await node._store_preimage(payment_hash, preimage_hex)
             
         return preimage_hex
     
-    @classmethod
-    @with_transaction
-    async def _update_asset_balance(
-        cls,
-        wallet_id: str,
-        asset_id: str,
-        amount: int,
-        payment_hash: str,
-        description: Optional[str] = None,
-        conn=None
-    ) -> bool:
-        """
-        Update the asset balance for a received payment.
-        
-        Args:
-            wallet_id: Wallet ID to update
-            asset_id: Asset ID to update
-            amount: Amount to credit
-            payment_hash: Payment hash for reference
-            description: Optional description for the transaction
-            conn: Optional database connection to reuse
-            
-        Returns:
-            bool: Success status
-        """
-        from ..services.transaction_service import TransactionService
-        
-        with ErrorContext("update_asset_balance", TRANSFER):
-            try:
-                # Always create a transaction record if we have a description
-                create_tx_record = description is not None and description != ""
-                
-                success, _, _ = await TransactionService.record_transaction(
-                    wallet_id=wallet_id,
-                    asset_id=asset_id,
-                    amount=amount,
-                    tx_type="credit",
-                    payment_hash=payment_hash,
-                    description=description or "",
-                    create_tx_record=create_tx_record,
-                    conn=conn
-                )
-                
-                if success:
-                    log_info(TRANSFER, f"Asset balance updated for asset_id={asset_id}, amount={amount}")
-                
-                return success
-            except Exception as e:
-                log_error(TRANSFER, f"Failed to update asset balance: {str(e)}")
-                return False
-    
     @classmethod
     async def _send_settlement_notifications(
         cls,
@@ -905,7 +878,7 @@ class SettlementService:
             # Skip if no user ID to notify
             if not invoice.user_id:
                 return
-                
+                    
             # Get paid timestamp
             paid_at = None
             if updated_invoice and updated_invoice.paid_at:
@@ -943,22 +916,24 @@ class SettlementService:
             try:
                 # Get assets with channel info
                 assets = await node.list_assets()
-                
+                    
                 # Filter to only include assets with channel info
                 filtered_assets = [asset for asset in assets if asset.get("channel_info")]
-                
+                    
                 # Add user balance information
                 for asset in filtered_assets:
                     asset_id_check = asset.get("asset_id")
                     if asset_id_check:
                         balance = await get_asset_balance(invoice.wallet_id, asset_id_check)
                         asset["user_balance"] = balance.balance if balance else 0
-                
+                    
                 # Send assets update notification
                 if filtered_assets:
-                    await NotificationService.notify_assets_update(invoice.user_id, filtered_assets)
+                    await NotificationService.notify_assets_update(
+                        invoice.user_id, filtered_assets, complete=False
+                    )
             except Exception as asset_err:
                 log_error(TRANSFER, f"Failed to send asset updates notification: {str(asset_err)}")
-                
+                    
         except Exception as e:
             log_error(TRANSFER, f"Failed to send settlement notifications: {str(e)}")
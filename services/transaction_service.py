@@ -2,16 +2,25 @@
 Unified Transaction Service for Taproot Assets extension.
 This service encapsulates all transaction recording and balance updating logic.
 """
+from collections import OrderedDict
 from typing import Optional, Tuple, Dict, Any, List
-from datetime import datetime
+from datetime import date, datetime
 
 from lnbits.helpers import urlsafe_short_hash
 
-from ..models import AssetTransaction, AssetBalance
-from ..db_utils import transaction, with_transaction
-from ..logging_utils import log_info, log_error, TRANSFER
+from ..models import AssetTransaction, AssetBalance, AssetDailyHistory, AssetHistorySummary
+from ..db_utils import transaction, with_transaction, after_commit
+from ..logging_utils import log_info, log_warning, log_error, TRANSFER
 from ..error_utils import ErrorContext
-from ..db import db, get_table_name
+from ..tracing import traced
+from ..db import db, get_table_name, read_router
+
+TRANSACTIONS_TABLE = get_table_name("asset_transactions")
+BALANCES_TABLE = get_table_name("asset_balances")
+
+# Statement text for the balance queries, built once at import
+_SELECT_BALANCE = f"SELECT * FROM {BALANCES_TABLE} WHERE wallet_id = :wallet_id AND asset_id = :asset_id"
+_SELECT_WALLET_BALANCES = f"SELECT * FROM {BALANCES_TABLE} WHERE wallet_id = :wallet_id ORDER BY updated_at DESC"
 
 class TransactionService:
     """
@@ -19,6 +28,36 @@ class TransactionService:
     This service encapsulates all transaction recording and balance updating logic.
     """
     
+    # Maximum number of wallet owners kept in memory
+    MAX_WALLET_OWNERS = 10000
+    
+    # Owning user of wallets with ledger writes, so the user's change counter
+    # is bumped too; a wallet never changes owner
+    _wallet_owners: "OrderedDict[str, str]" = OrderedDict()
+    
+    @staticmethod
+    async def _wallet_owner(wallet_id: str) -> Optional[str]:
+        """Get the user ID owning a wallet, from memory or LNbits."""
+        owners = TransactionService._wallet_owners
+        user_id = owners.get(wallet_id)
+        if user_id is not None:
+            owners.move_to_end(wallet_id)
+            return user_id
+        
+        try:
+            from lnbits.core.crud import get_wallet
+            wallet = await get_wallet(wallet_id)
+        except Exception as e:
+            log_warning(TRANSFER, f"Failed to look up owner of wallet {wallet_id}: {str(e)}")
+            return None
+        if not wallet:
+            return None
+        
+        owners[wallet_id] = wallet.user
+        while len(owners) > TransactionService.MAX_WALLET_OWNERS:
+            owners.popitem(last=False)
+        return wallet.user
+    
     @staticmethod
     @with_transaction
     async def record_transaction(
@@ -52,6 +91,9 @@ class TransactionService:
                 - Transaction record if created, None otherwise
                 - Updated balance record
         """
+        from ..crud.transaction_history import add_to_daily_rollups
+        from ..crud.change_counters import ChangeCounters
+        
         with ErrorContext("record_transaction", TRANSFER):
             try:
                 now = datetime.now()
@@ -76,7 +118,8 @@ class TransactionService:
                     )
                     
                     # Insert transaction record
-                    await conn.insert(get_table_name("asset_transactions"), tx)
+                    await conn.insert(TRANSACTIONS_TABLE, tx)
+                    await add_to_daily_rollups([tx], conn=conn)
                     log_info(TRANSFER, f"Transaction record created: {tx_id} for wallet {wallet_id}")
                 
                 # Step 2: Get current balance
@@ -92,7 +135,7 @@ class TransactionService:
                     
                     # Update in database
                     await conn.update(
-                        get_table_name("asset_balances"),
+                        BALANCES_TABLE,
                         balance,
                         "WHERE wallet_id = :wallet_id AND asset_id = :asset_id"
                     )
@@ -110,8 +153,12 @@ class TransactionService:
                     )
                     
                     # Insert new balance
-                    await conn.insert(get_table_name("asset_balances"), balance)
+                    await conn.insert(BALANCES_TABLE, balance)
                 
+                # The user's asset listing includes this wallet's balances
+                user_id = await TransactionService._wallet_owner(wallet_id)
+                read_router.note_write(wallet_id, user_id)
+                after_commit(conn, lambda: ChangeCounters.bump(wallet_id, user_id))
                 log_info(TRANSFER, f"Balance updated for wallet {wallet_id}, asset {asset_id}: {balance_change}")
                 return True, tx, balance
                 
@@ -120,6 +167,101 @@ class TransactionService:
                 return False, None, None
     
     @staticmethod
+    @with_transaction
+    async def record_transactions(
+        wallet_id: str,
+        entries: List[Dict[str, Any]],
+        conn=None
+    ) -> Tuple[bool, List[AssetTransaction], Dict[str, AssetBalance]]:
+        """
+        Record many transactions for one wallet and update balances once per asset.
+        
+        Transaction rows are written with bulk inserts and the balance changes are
+        summed per asset, so a batch touches each balance row a single time.
+        
+        Args:
+            wallet_id: The wallet ID
+            entries: Dicts with asset_id, amount, tx_type and optional payment_hash,
+                     fee and description
+            conn: Optional database connection
+            
+        Returns:
+            Tuple containing:
+                - Success status (bool)
+                - Transaction records created
+                - Updated balance records keyed by asset ID
+        """
+        from ..crud.utils import insert_many
+        from ..crud.transaction_history import add_to_daily_rollups
+        from ..crud.change_counters import ChangeCounters
+        
+        with ErrorContext("record_transactions", TRANSFER):
+            try:
+                now = datetime.now()
+                transactions = []
+                balance_changes: Dict[str, int] = {}
+                last_payment_hashes: Dict[str, str] = {}
+                
+                for entry in entries:
+                    tx = AssetTransaction(
+                        id=urlsafe_short_hash(),
+                        wallet_id=wallet_id,
+                        asset_id=entry["asset_id"],
+                        payment_hash=entry.get("payment_hash"),
+                        amount=entry["amount"],
+                        fee=entry.get("fee", 0),
+                        description=entry.get("description"),
+                        type=entry["tx_type"],
+                        created_at=now
+                    )
+                    transactions.append(tx)
+                    
+                    change = tx.amount if tx.type == 'credit' else -tx.amount
+                    balance_changes[tx.asset_id] = balance_changes.get(tx.asset_id, 0) + change
+                    if tx.payment_hash:
+                        last_payment_hashes[tx.asset_id] = tx.payment_hash
+                
+                await insert_many("asset_transactions", [tx.dict() for tx in transactions], conn=conn)
+                await add_to_daily_rollups(transactions, conn=conn)
+                
+                balances = {}
+                for asset_id, balance_change in balance_changes.items():
+                    balance = await TransactionService.get_asset_balance(wallet_id, asset_id, conn=conn)
+                    if balance:
+                        balance.balance += balance_change
+                        balance.last_payment_hash = last_payment_hashes.get(asset_id, balance.last_payment_hash)
+                        balance.updated_at = now
+                        await conn.update(
+                            BALANCES_TABLE,
+                            balance,
+                            "WHERE wallet_id = :wallet_id AND asset_id = :asset_id"
+                        )
+                    else:
+                        balance = AssetBalance(
+                            id=urlsafe_short_hash(),
+                            wallet_id=wallet_id,
+                            asset_id=asset_id,
+                            balance=balance_change,
+                            last_payment_hash=last_payment_hashes.get(asset_id),
+                            created_at=now,
+                            updated_at=now
+                        )
+                        await conn.insert(BALANCES_TABLE, balance)
+                    balances[asset_id] = balance
+                
+                # The user's asset listing includes this wallet's balances
+                user_id = await TransactionService._wallet_owner(wallet_id)
+                read_router.note_write(wallet_id, user_id)
+                after_commit(conn, lambda: ChangeCounters.bump(wallet_id, user_id))
+                log_info(TRANSFER, f"Recorded {len(transactions)} transactions for wallet {wallet_id} across {len(balances)} assets")
+                return True, transactions, balances
+                
+            except Exception as e:
+                log_error(TRANSFER, f"Failed to record transactions: {str(e)}")
+                return False, [], {}
+    
+    @staticmethod
+    @traced
     async def get_asset_balance(wallet_id: str, asset_id: str, conn=None) -> Optional[AssetBalance]:
         """
         Get asset balance for a specific wallet and asset.
@@ -133,10 +275,7 @@ class TransactionService:
             Optional[AssetBalance]: The asset balance if found, None otherwise
         """
         return await (conn or db).fetchone(
-            f"""
-            SELECT * FROM {get_table_name('asset_balances')}
-            WHERE wallet_id = :wallet_id AND asset_id = :asset_id
-            """,
+            _SELECT_BALANCE,
             {
                 "wallet_id": wallet_id,
                 "asset_id": asset_id
@@ -145,6 +284,7 @@ class TransactionService:
         )
     
     @staticmethod
+    @traced
     async def get_wallet_asset_balances(wallet_id: str) -> List[AssetBalance]:
         """
         Get all asset balances for a wallet.
@@ -155,50 +295,110 @@ class TransactionService:
         Returns:
             List[AssetBalance]: List of asset balances for the wallet
         """
-        return await db.fetchall(
-            f"""
-            SELECT * FROM {get_table_name('asset_balances')}
-            WHERE wallet_id = :wallet_id
-            ORDER BY updated_at DESC
-            """,
-            {"wallet_id": wallet_id},
-            AssetBalance
-        )
+        return await db.fetchall(_SELECT_WALLET_BALANCES, {"wallet_id": wallet_id}, AssetBalance)
     
     @staticmethod
+    @traced
     async def get_asset_transactions(
         wallet_id: Optional[str] = None,
         asset_id: Optional[str] = None,
-        limit: int = 100
-    ) -> List[AssetTransaction]:
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[AssetTransaction], Optional[str]]:
         """
-        Get asset transactions, optionally filtered by wallet and/or asset.
+        Get a page of asset transactions, newest first, optionally filtered by wallet and/or asset.
+        
+        Read through the read router, so it may be served by a replica.
         
         Args:
             wallet_id: Optional wallet ID to filter by
             asset_id: Optional asset ID to filter by
             limit: Maximum number of transactions to return
+            cursor: Cursor returned with the previous page, None for the first page
             
         Returns:
-            List[AssetTransaction]: List of asset transactions
+            Tuple of (transactions, next_cursor); next_cursor is None on the last page
         """
-        # Build query
-        query = f"SELECT * FROM {get_table_name('asset_transactions')}"
-        params = {}
-        where_clauses = []
-
+        from ..crud.utils import get_records_page
+        
+        filters = {}
         if wallet_id:
-            where_clauses.append("wallet_id = :wallet_id")
-            params["wallet_id"] = wallet_id
-
+            filters["wallet_id"] = wallet_id
         if asset_id:
-            where_clauses.append("asset_id = :asset_id")
-            params["asset_id"] = asset_id
+            filters["asset_id"] = asset_id
 
-        if where_clauses:
-            query += " WHERE " + " AND ".join(where_clauses)
+        async with read_router.reader(wallet_id) as conn:
+            return await get_records_page(
+                "asset_transactions", filters, lambda row: AssetTransaction(**row),
+                limit=limit, cursor=cursor, conn=conn
+            )
 
-        query += " ORDER BY created_at DESC LIMIT :limit"
-        params["limit"] = limit
-
-        return await db.fetchall(query, params, AssetTransaction)
+    @staticmethod
+    async def get_history_summary(
+        wallet_id: str,
+        start: date,
+        end: date,
+        asset_id: Optional[str] = None
+    ) -> List[AssetHistorySummary]:
+        """
+        Get per-asset credit/debit totals, counts and fees over a date range.
+        
+        Totals come from the daily rollups, so the cost does not grow with the
+        length of the wallet's history. Assets with a balance but no activity
+        in the range are included with zero totals.
+        
+        Args:
+            wallet_id: The wallet ID
+            start: First day of the range (inclusive)
+            end: Last day of the range (inclusive)
+            asset_id: Optional asset ID to filter by
+            
+        Returns:
+            List[AssetHistorySummary]: One summary per asset
+        """
+        from ..crud.transaction_history import get_history_totals
+        
+        async with read_router.reader(wallet_id) as conn:
+            totals = await get_history_totals(wallet_id, start, end, asset_id, conn=conn)
+        balances = {
+            balance.asset_id: balance.balance
+            for balance in await TransactionService.get_wallet_asset_balances(wallet_id)
+            if not asset_id or balance.asset_id == asset_id
+        }
+        
+        summaries = []
+        for summary_asset_id in sorted(set(totals) | set(balances)):
+            asset_totals = totals.get(summary_asset_id, {})
+            summaries.append(AssetHistorySummary(
+                asset_id=summary_asset_id,
+                start_day=start.isoformat(),
+                end_day=end.isoformat(),
+                **asset_totals,
+                net_amount=asset_totals.get("credit_amount", 0) - asset_totals.get("debit_amount", 0),
+                balance=balances.get(summary_asset_id, 0)
+            ))
+        return summaries
+    
+    @staticmethod
+    async def get_daily_history(
+        wallet_id: str,
+        start: date,
+        end: date,
+        asset_id: Optional[str] = None
+    ) -> List[AssetDailyHistory]:
+        """
+        Get the daily transaction rollups for a wallet over a date range.
+        
+        Args:
+            wallet_id: The wallet ID
+            start: First day of the range (inclusive)
+            end: Last day of the range (inclusive)
+            asset_id: Optional asset ID to filter by
+            
+        Returns:
+            List[AssetDailyHistory]: One row per asset and day with activity, oldest first
+        """
+        from ..crud.transaction_history import get_daily_history
+        
+        async with read_router.reader(wallet_id) as conn:
+            return await get_daily_history(wallet_id, start, end, asset_id, conn=conn)
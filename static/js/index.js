@@ -9,13 +9,10 @@ window.app = Vue.createApp({
   
   data() {
     return {
-      // Assets
-      assets: [],
+      // Assets (the list itself lives in the store)
       assetsLoading: false,
       
-      // Transactions
-      invoices: [],
-      payments: [],
+      // Transactions (invoices and payments live in the store)
       combinedTransactions: [],
       filteredTransactions: [],
       transactionsLoading: false,
@@ -29,6 +26,13 @@ window.app = Vue.createApp({
           descending: true
         }
       },
+      rowsPerPageOptions: [
+        {label: '10', value: 10},
+        {label: '25', value: 25},
+        {label: '50', value: 50},
+        {label: '100', value: 100},
+        {label: 'All', value: 0}
+      ],
       
       // Search and filter
       searchDate: {from: null, to: null},
@@ -95,7 +99,6 @@ window.app = Vue.createApp({
       isSubmitting: false,
 
       // Refresh state tracking
-      refreshInterval: null,
       isRefreshing: false,
       
       // Transition state for animations
@@ -117,7 +120,41 @@ window.app = Vue.createApp({
     }
   },
   computed: {
-    // Filtered assets from local state
+    // Store lists, merged in place by fetches and WebSocket updates
+    assets() {
+      return taprootStore.state.assets;
+    },
+    
+    invoices() {
+      return taprootStore.state.invoices;
+    },
+    
+    payments() {
+      return taprootStore.state.payments;
+    },
+    
+    // Time of the listing shown while tapd is unreachable, null when current
+    assetsStaleSince() {
+      const stale = this.assets.find(asset => asset.stale);
+      return stale ? new Date(stale.as_of * 1000).toLocaleString() : null;
+    },
+    
+    // Rows of the current page; rowsPerPage 0 shows every row
+    pagedTransactions() {
+      const { page, rowsPerPage } = this.transactionsTable.pagination;
+      if (!rowsPerPage) return this.filteredTransactions;
+      
+      const start = (page - 1) * rowsPerPage;
+      return this.filteredTransactions.slice(start, start + rowsPerPage);
+    },
+    
+    pageCount() {
+      const { rowsPerPage } = this.transactionsTable.pagination;
+      if (!rowsPerPage) return 1;
+      return Math.ceil(this.filteredTransactions.length / rowsPerPage) || 1;
+    },
+    
+    // Filtered assets from the store
     filteredAssets() {
       if (!this.assets || this.assets.length === 0) return [];
       
@@ -161,6 +198,9 @@ window.app = Vue.createApp({
       const { page, rowsPerPage } = this.transactionsTable.pagination;
       const totalItems = this.filteredTransactions ? this.filteredTransactions.length : 0;
       
+      if (totalItems > 0 && !rowsPerPage) {
+        return `1-${totalItems} of ${totalItems}`;
+      }
       if (totalItems > 0) {
         const startIndex = Math.min((page - 1) * rowsPerPage + 1, totalItems);
         const endIndex = Math.min(startIndex + rowsPerPage - 1, totalItems);
@@ -216,11 +256,10 @@ window.app = Vue.createApp({
       
       try {
         const wallet = this.g.user.wallets[0];
-        // Get assets from service
-        this.assets = await AssetService.getAssets(wallet);
+        // The service merges changes into the store
+        await AssetService.getAssets(wallet);
       } catch (error) {
         console.error('Failed to fetch assets:', error);
-        this.assets = [];
       } finally {
         this.assetsLoading = false;
         this.isRefreshing = false;
@@ -236,12 +275,8 @@ window.app = Vue.createApp({
       try {
         const wallet = this.g.user.wallets[0];
         
-        // Use InvoiceService but store results locally
-        const invoices = await InvoiceService.getInvoices(wallet, true);
-        this.invoices = invoices;
-        
-        // Combine transactions after getting invoices
-        this.combineTransactions();
+        // The service merges changes into the store; the version watcher recombines
+        await InvoiceService.getInvoices(wallet);
         
         if (!this.transitionEnabled) {
           setTimeout(() => {
@@ -250,7 +285,6 @@ window.app = Vue.createApp({
         }
       } catch (error) {
         console.error('Failed to fetch invoices:', error);
-        this.invoices = [];
       } finally {
         this.transactionsLoading = false;
       }
@@ -264,15 +298,10 @@ window.app = Vue.createApp({
       try {
         const wallet = this.g.user.wallets[0];
         
-        // Use PaymentService but store results locally
-        const payments = await PaymentService.getPayments(wallet, true);
-        this.payments = payments;
-        
-        // Combine transactions after getting payments
-        this.combineTransactions();
+        // The service merges changes into the store; the version watcher recombines
+        await PaymentService.getPayments(wallet);
       } catch (error) {
         console.error('Failed to fetch payments:', error);
-        this.payments = [];
       } finally {
         this.transactionsLoading = false;
       }
@@ -285,12 +314,12 @@ window.app = Vue.createApp({
         this.payments
       );
       
-      // Apply filters to combined transactions
-      this.applyFilters();
+      // Filter again, staying on the current page where it still exists
+      this.filterTransactions();
     },
     
     // Use DataUtils service to filter transactions
-    applyFilters() {
+    filterTransactions() {
       this.filteredTransactions = DataUtils.filterTransactions(
         this.combinedTransactions,
         this.filters,
@@ -298,14 +327,19 @@ window.app = Vue.createApp({
         this.searchDate
       );
       
-      // Reset to first page when filtering
-      if (this.transactionsTable.pagination.page > 1) {
+      // Force correct pagination display if needed
+      const { page, rowsPerPage } = this.transactionsTable.pagination;
+      if (page > 1 && (!rowsPerPage || (page - 1) * rowsPerPage >= this.filteredTransactions.length)) {
         this.transactionsTable.pagination.page = 1;
       }
+    },
+    
+    // Filter after the filters changed, starting from the first page
+    applyFilters() {
+      this.filterTransactions();
       
-      // Force correct pagination display if needed
-      if (this.filteredTransactions.length > 0 && 
-          (this.transactionsTable.pagination.page - 1) * this.transactionsTable.pagination.rowsPerPage >= this.filteredTransactions.length) {
+      // Reset to first page when filtering
+      if (this.transactionsTable.pagination.page > 1) {
         this.transactionsTable.pagination.page = 1;
       }
     },
@@ -960,30 +994,33 @@ window.app = Vue.createApp({
     
     // Refresh methods
     refreshTransactions() {
-      this.getInvoices();
-      this.getPayments();
+      return Promise.all([this.getInvoices(), this.getPayments()]);
     },
     
-    refreshData() {
-      this.getAssets();
-      this.refreshTransactions();
+    // Refresh everything; resolves to whether any data changed, for polling backoff
+    async refreshData() {
+      const versions = () => `${taprootStore.state.assetsVersion}:${taprootStore.state.transactionsVersion}`;
+      const before = versions();
+      await Promise.all([this.getAssets(), this.refreshTransactions()]);
+      return versions() !== before;
     },
     
     startAutoRefresh() {
-      // Only start if not already polling and WebSockets not connected
-      if (this.refreshInterval || this.websocketStatus.connected) return;
+      // Only start if not already polling and no live connection or fallback is active
+      const status = this.connectionStatus();
+      if (RefreshScheduler.isRunning('autoRefresh') || status.connected || status.eventStream || status.fallbackPolling) return;
       
-      this.stopAutoRefresh();
-      this.refreshInterval = setInterval(() => {
-        this.refreshData();
-      }, 10000); // 10 seconds
+      // Backs off while nothing changes, paused while the tab is hidden
+      RefreshScheduler.start('autoRefresh', () => this.refreshData());
+    },
+    
+    connectionStatus() {
+      // The WebSocket manager keeps the live status in the store
+      return window.taprootStore?.state?.websocketStatus || this.websocketStatus;
     },
     
     stopAutoRefresh() {
-      if (this.refreshInterval) {
-        clearInterval(this.refreshInterval);
-        this.refreshInterval = null;
-      }
+      RefreshScheduler.stop('autoRefresh');
     },
     
     // Camera methods for QR code scanning
@@ -1097,17 +1134,16 @@ window.app = Vue.createApp({
       }
     });
     
-    // Watch invoices array for changes
-    this.$watch('invoices', () => {
-      this.combineTransactions();
-      this.applyFilters();
-    }, { deep: true });
+    // A different page size starts again from the first page
+    this.$watch('transactionsTable.pagination.rowsPerPage', () => {
+      this.transactionsTable.pagination.page = 1;
+    });
     
-    // Watch payments array for changes
-    this.$watch('payments', () => {
+    // Recombine when the store's invoices or payments change; the version
+    // counter avoids deep-watching thousands of rows
+    this.$watch(() => taprootStore.state.transactionsVersion, () => {
       this.combineTransactions();
-      this.applyFilters();
-    }, { deep: true });
+    });
     
     // Add watcher for global updatePayments flag (similar to core LNbits implementation)
     if (window.g) {
@@ -1149,14 +1185,12 @@ window.app = Vue.createApp({
       this.getAssets();
       
       // Reconnect WebSockets if disconnected
-      if (!this.websocketStatus.connected) {
+      if (!this.connectionStatus().connected) {
         this.initializeWebSockets();
       }
       
       // Start polling if WebSockets are not connected
-      if (!this.websocketStatus.connected) {
-        this.startAutoRefresh();
-      }
+      this.startAutoRefresh();
     }
   },
   
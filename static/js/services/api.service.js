@@ -4,14 +4,48 @@
  */
 
 const ApiService = {
+  // Last ETag and body per list URL and key, for conditional requests
+  _conditionalCache: new Map(),
+  
+  /**
+   * GET a list endpoint with If-None-Match, reusing the last body on 304
+   * @param {string} url - Endpoint URL
+   * @param {string} apiKey - Key for authentication
+   * @returns {Promise} - Promise that resolves with {data, notModified}
+   */
+  conditionalGet(url, apiKey) {
+    const cacheKey = `${apiKey}:${url}`;
+    const cached = this._conditionalCache.get(cacheKey);
+    const headers = {'X-Api-Key': apiKey};
+    if (cached) {
+      headers['If-None-Match'] = cached.etag;
+    }
+    
+    return axios({
+      method: 'GET',
+      url,
+      headers,
+      validateStatus: status => (status >= 200 && status < 300) || status === 304
+    }).then(response => {
+      if (response.status === 304 && cached) {
+        return {data: cached.data, notModified: true};
+      }
+      const etag = response.headers?.etag;
+      if (etag) {
+        this._conditionalCache.set(cacheKey, {etag, data: response.data});
+      }
+      return {data: response.data, notModified: false};
+    });
+  },
+  
   /**
    * Get list of assets from the Taproot Assets daemon
    * @param {string} adminkey - Admin key for authentication
-   * @returns {Promise} - Promise that resolves with assets data
+   * @returns {Promise} - Promise that resolves with {data, notModified}
    */
   getAssets(adminkey) {
-    return LNbits.api
-      .request('GET', '/taproot_assets/api/v1/taproot/listassets', adminkey)
+    return this
+      .conditionalGet('/taproot_assets/api/v1/taproot/listassets', adminkey)
       .catch(error => {
         console.error('API Error getting assets:', error);
         throw error;
@@ -21,15 +55,11 @@ const ApiService = {
   /**
    * Get invoices for the Taproot Assets extension
    * @param {string} adminkey - Admin key for authentication
-   * @param {boolean} cache - Whether to use cache-busting timestamp 
-   * @returns {Promise} - Promise that resolves with invoices data
+   * @returns {Promise} - Promise that resolves with {data, notModified}
    */
-  getInvoices(adminkey, cache = true) {
-    const timestamp = cache ? new Date().getTime() : null;
-    const url = `/taproot_assets/api/v1/taproot/invoices${timestamp ? `?_=${timestamp}` : ''}`;
-    
-    return LNbits.api
-      .request('GET', url, adminkey)
+  getInvoices(adminkey) {
+    return this
+      .conditionalGet('/taproot_assets/api/v1/taproot/invoices?limit=100', adminkey)
       .catch(error => {
         console.error('API Error getting invoices:', error);
         throw error;
@@ -39,15 +69,11 @@ const ApiService = {
   /**
    * Get payments for the Taproot Assets extension
    * @param {string} adminkey - Admin key for authentication
-   * @param {boolean} cache - Whether to use cache-busting timestamp
-   * @returns {Promise} - Promise that resolves with payments data
+   * @returns {Promise} - Promise that resolves with {data, notModified}
    */
-  getPayments(adminkey, cache = true) {
-    const timestamp = cache ? new Date().getTime() : null;
-    const url = `/taproot_assets/api/v1/taproot/payments${timestamp ? `?_=${timestamp}` : ''}`;
-    
-    return LNbits.api
-      .request('GET', url, adminkey)
+  getPayments(adminkey) {
+    return this
+      .conditionalGet('/taproot_assets/api/v1/taproot/payments?limit=100', adminkey)
       .catch(error => {
         console.error('API Error getting payments:', error);
         throw error;
@@ -103,11 +129,11 @@ const ApiService = {
   /**
    * Get asset balances
    * @param {string} adminkey - Admin key for authentication
-   * @returns {Promise} - Promise that resolves with asset balances
+   * @returns {Promise} - Promise that resolves with {data, notModified}
    */
   getAssetBalances(adminkey) {
-    return LNbits.api
-      .request('GET', '/taproot_assets/api/v1/taproot/asset-balances', adminkey)
+    return this
+      .conditionalGet('/taproot_assets/api/v1/taproot/asset-balances', adminkey)
       .catch(error => {
         console.error('API Error getting asset balances:', error);
         throw error;
@@ -5,7 +5,8 @@
 
 const AssetService = {
   /**
-   * Get all assets with information about channels and balances
+   * Get all assets with information about channels and balances.
+   * Both requests are conditional; when neither changed, the store is left as is.
    * @param {Object} wallet - Wallet object with adminkey
    * @returns {Promise<Array>} - Promise that resolves with assets
    */
@@ -18,29 +19,27 @@ const AssetService = {
       console.log('Fetching assets for wallet', wallet.id);
       
       // Request assets from the API
-      const response = await LNbits.api.request(
-        'GET', 
-        '/taproot_assets/api/v1/taproot/listassets', 
-        wallet.adminkey
-      );
+      const response = await ApiService.getAssets(wallet.adminkey);
       
       if (!response || !response.data) {
         console.warn('No assets returned from API');
         return [];
       }
       
-      // Process the assets
-      const assets = Array.isArray(response.data) ? [...response.data] : [];
+      // Process the assets; copies, as the response body is kept for 304s
+      const assets = Array.isArray(response.data) ? response.data.map(asset => ({...asset})) : [];
+      let notModified = response.notModified;
       
       // Get balances for assets
       if (assets.length > 0) {
         try {
           // Get all balances at once
-          const balancesResponse = await LNbits.api.request(
-            'GET', 
-            '/taproot_assets/api/v1/taproot/asset-balances', 
-            wallet.adminkey
-          );
+          const balancesResponse = await ApiService.getAssetBalances(wallet.adminkey);
+          notModified = notModified && balancesResponse.notModified;
+          
+          if (notModified) {
+            return window.taprootStore.state.assets;
+          }
           
           if (balancesResponse && balancesResponse.data) {
             // Create a map of asset ID to balance
@@ -72,6 +71,11 @@ const AssetService = {
       // Create a global asset map for quick lookups
       this._updateAssetMap(assets);
       
+      // Pick up sequence numbers and the catalog channel for live updates
+      if (this.catalogSeq === null) {
+        this.resync(wallet);
+      }
+      
       return assets;
     } catch (error) {
       console.error('Failed to fetch assets:', error);
@@ -202,42 +206,122 @@ const AssetService = {
     return DataUtils.parseAssetValue(value);
   },
   
+  // Sequence numbers of the last catalog and balances deltas applied, null until synced
+  catalogSeq: null,
+  balancesSeq: null,
+  // Catalog entries by entry key, and {asset_id, user_balance} entries by asset ID
+  _catalog: new Map(),
+  _balances: new Map(),
+  _resyncing: false,
+  
+  /**
+   * Key of an asset entry; assets with channels are listed once per channel
+   * @param {Object} asset - Asset entry
+   * @returns {string} - asset_id, or asset_id:channel_point for channel entries
+   */
+  entryKey(asset) {
+    const channelPoint = asset?.channel_info?.channel_point;
+    return channelPoint ? `${asset.asset_id}:${channelPoint}` : asset.asset_id;
+  },
+  
+  /**
+   * Apply a catalog delta from the shared catalog WebSocket
+   * @param {Object} delta - Message with seq, base_seq, changed and removed
+   */
+  applyCatalogDelta(delta) {
+    if (this._applyDelta('catalogSeq', delta, this._catalog, entry => this.entryKey(entry))) {
+      this._updateAssetMap(delta.changed || []);
+      this._publishAssets();
+    }
+  },
+  
   /**
-   * Process asset data from WebSocket updates
-   * @param {Object} data - WebSocket data with asset information
+   * Apply a balances delta from the user's balances WebSocket
+   * @param {Object} delta - Message with seq, base_seq, changed and removed
    */
-  processWebSocketUpdate(data) {
-    if (data?.type === 'assets_update' && Array.isArray(data.data)) {
-      // Update the asset map for quick lookups
-      this._updateAssetMap(data.data);
+  applyBalancesDelta(delta) {
+    if (this._applyDelta('balancesSeq', delta, this._balances, entry => entry.asset_id)) {
+      this._publishAssets();
+    }
+  },
+  
+  /**
+   * Apply a delta to one of the local states, or resync on a sequence gap
+   * @param {string} seqField - Name of the sequence number property
+   * @param {Object} delta - The delta
+   * @param {Map} entries - The local state
+   * @param {Function} key - Function returning an entry's key
+   * @returns {boolean} - Whether the delta was applied
+   * @private
+   */
+  _applyDelta(seqField, delta, entries, key) {
+    if (this[seqField] !== null && delta.seq <= this[seqField]) {
+      // Already covered by a snapshot or an earlier delta
+      return false;
+    }
+    if (this[seqField] === null || delta.base_seq !== this[seqField]) {
+      // Missed a delta (or never synced), fetch the full state instead
+      const wallet = window.taprootStore?.getters?.getCurrentWallet();
+      if (wallet) {
+        this.resync(wallet);
+      }
+      return false;
+    }
+    
+    (delta.removed || []).forEach(entryKey => entries.delete(entryKey));
+    (delta.changed || []).forEach(entry => entries.set(key(entry), entry));
+    this[seqField] = delta.seq;
+    return true;
+  },
+  
+  /**
+   * Put the catalog, with the user's balances merged in, into the store
+   * @private
+   */
+  _publishAssets() {
+    if (!window.taprootStore?.actions?.setAssets) return;
+    
+    const assets = [...this._catalog.values()].map(entry => ({
+      ...entry,
+      user_balance: this._balances.get(entry.asset_id)?.user_balance || 0
+    }));
+    window.taprootStore.actions.setAssets(assets);
+  },
+  
+  /**
+   * Replace the catalog and balances with the server's current state
+   * and subscribe to the catalog channel it names
+   * @param {Object} wallet - Wallet object with adminkey
+   * @returns {Promise<void>}
+   */
+  async resync(wallet) {
+    if (this._resyncing) return;
+    this._resyncing = true;
+    
+    try {
+      const response = await LNbits.api.request(
+        'GET',
+        '/taproot_assets/api/v1/taproot/assets/state',
+        wallet.adminkey
+      );
+      const state = response?.data;
+      if (!state) return;
       
-      // Update the store if needed
-      if (window.taprootStore?.state?.assets) {
-        // Merge with existing assets
-        const existingAssets = [...window.taprootStore.state.assets];
-        const assetIds = new Set(existingAssets.map(a => a.asset_id));
-        
-        // Update existing and add new
-        const updatedAssets = [...existingAssets];
-        data.data.forEach(asset => {
-          if (asset.asset_id) {
-            if (assetIds.has(asset.asset_id)) {
-              // Update existing
-              const index = updatedAssets.findIndex(a => a.asset_id === asset.asset_id);
-              if (index !== -1) {
-                updatedAssets[index] = {...updatedAssets[index], ...asset};
-              }
-            } else {
-              // Add new
-              updatedAssets.push(asset);
-              assetIds.add(asset.asset_id);
-            }
-          }
-        });
-        
-        // Update the store
-        window.taprootStore.actions.setAssets(updatedAssets);
+      this._catalog = new Map((state.catalog || []).map(entry => [this.entryKey(entry), entry]));
+      this._balances = new Map((state.balances || []).map(entry => [entry.asset_id, entry]));
+      this.catalogSeq = state.catalog_seq;
+      this.balancesSeq = state.balances_seq;
+      
+      this._updateAssetMap(state.catalog || []);
+      this._publishAssets();
+      
+      if (window.WebSocketManager && state.catalog_channel) {
+        WebSocketManager.connectCatalog(state.catalog_channel);
       }
+    } catch (error) {
+      console.error('Failed to resync assets:', error);
+    } finally {
+      this._resyncing = false;
     }
   }
 };
@@ -5,12 +5,11 @@
 
 const InvoiceService = {
   /**
-   * Get all invoices for the current user
+   * Get all invoices for the current user, merging changes into the store
    * @param {Object} wallet - Wallet object with adminkey
-   * @param {boolean} forceFresh - Whether to force fresh data from server
-   * @returns {Promise<Array>} - Promise that resolves with invoices
+   * @returns {Promise<Array>} - Promise that resolves with the store's invoices
    */
-  async getInvoices(wallet, forceFresh = false) {
+  async getInvoices(wallet) {
     try {
       if (!wallet || !wallet.adminkey) {
         throw new Error('Valid wallet is required');
@@ -20,22 +19,24 @@ const InvoiceService = {
       window.taprootStore.actions.setTransactionsLoading(true);
       window.taprootStore.actions.setCurrentWallet(wallet);
       
-      // Request invoices from the API
-      const response = await ApiService.getInvoices(wallet.adminkey, forceFresh);
+      // Request invoices from the API; a 304 means the store is current
+      const response = await ApiService.getInvoices(wallet.adminkey);
       
-      // Process the invoices
-      const invoices = Array.isArray(response?.data)
-        ? response.data.map(invoice => this._mapInvoice(invoice))
-        : [];
-      
-      // Update the store with processed invoices
-      window.taprootStore.actions.setInvoices(invoices);
+      if (!response.notModified) {
+        // Process the invoices (first page of the paginated list)
+        const invoices = Array.isArray(response?.data?.data)
+          ? response.data.data.map(invoice => this._mapInvoice(invoice))
+          : [];
+        
+        // Merge them into the store, so unchanged rows are left alone
+        window.taprootStore.actions.mergeInvoices(invoices);
+      }
       
-      return invoices;
+      return window.taprootStore.state.invoices;
     } catch (error) {
+      // Keep showing the last invoices fetched
       console.error('Failed to fetch invoices:', error);
-      window.taprootStore.actions.setInvoices([]);
-      return [];
+      return window.taprootStore.state.invoices;
     } finally {
       // Ensure loading state is reset
       window.taprootStore.actions.setTransactionsLoading(false);
@@ -122,6 +123,16 @@ const InvoiceService = {
    * @returns {Object|null} - Processed invoice or null
    */
   processWebSocketUpdate(data) {
+    // Batched status changes, e.g. from the expiry reaper
+    if (data?.type === 'invoices_update' && Array.isArray(data.data)) {
+      data.data.forEach(update => {
+        if (update?.id) {
+          window.taprootStore.actions.updateInvoice(update.id, { status: update.status });
+        }
+      });
+      return null;
+    }
+    
     if (!data?.type || data.type !== 'invoice_update' || !data.data) {
       return null;
     }
@@ -5,12 +5,11 @@
 
 const PaymentService = {
   /**
-   * Get all payments for the current user
+   * Get all payments for the current user, merging changes into the store
    * @param {Object} wallet - Wallet object with adminkey
-   * @param {boolean} cache - Whether to use cache-busting timestamp 
-   * @returns {Promise<Array>} - Promise that resolves with payments
+   * @returns {Promise<Array>} - Promise that resolves with the store's payments
    */
-  async getPayments(wallet, cache = true) {
+  async getPayments(wallet) {
     try {
       if (!wallet || !wallet.adminkey) {
         throw new Error('Valid wallet is required');
@@ -20,30 +19,27 @@ const PaymentService = {
       window.taprootStore.actions.setTransactionsLoading(true);
       window.taprootStore.actions.setCurrentWallet(wallet);
       
-      // Request payments from the API
-      const response = await ApiService.getPayments(wallet.adminkey, cache);
+      // Request payments from the API; a 304 means the store is current
+      const response = await ApiService.getPayments(wallet.adminkey);
       
-      if (!response?.data) {
-        window.taprootStore.actions.setPayments([]);
-        return [];
+      if (!response.notModified) {
+        // Process the payments (first page of the paginated list) using DataUtils
+        const payments = Array.isArray(response?.data?.data)
+          ? response.data.data.map(payment => this._mapPayment(payment))
+          : [];
+        
+        // Make sure asset names are available
+        this._ensureAssetNames(payments);
+        
+        // Merge them into the store, so unchanged rows are left alone
+        window.taprootStore.actions.mergePayments(payments);
       }
       
-      // Process the payments using DataUtils
-      const payments = Array.isArray(response.data)
-        ? response.data.map(payment => this._mapPayment(payment))
-        : [];
-      
-      // Make sure asset names are available
-      this._ensureAssetNames(payments);
-      
-      // Update the store
-      window.taprootStore.actions.setPayments(payments);
-      
-      return payments;
+      return window.taprootStore.state.payments;
     } catch (error) {
+      // Keep showing the last payments fetched
       console.error('Failed to fetch payments:', error);
-      window.taprootStore.actions.setPayments([]);
-      return [];
+      return window.taprootStore.state.payments;
     } finally {
       // Ensure loading state is reset
       window.taprootStore.actions.setTransactionsLoading(false);
@@ -0,0 +1,116 @@
+/**
+ * Refresh Scheduler for Taproot Assets extension
+ * Runs polling tasks with exponential backoff, paused while the tab is hidden
+ */
+
+const RefreshScheduler = {
+  // Configuration
+  config: {
+    baseDelay: 10000,  // 10 seconds after a refresh that changed something
+    maxDelay: 120000   // 2 minutes at most after unchanged or failed refreshes
+  },
+
+  // Running tasks by name: {run, delay, timeout, lastRun, running}
+  tasks: new Map(),
+
+  /**
+   * Start polling a task. A task resolving to true (data changed) runs
+   * again after baseDelay; one resolving to false or failing waits twice
+   * as long as last time, up to maxDelay. Nothing runs while the page is hidden.
+   * @param {string} name - Task name; starting a running name replaces it
+   * @param {Function} run - Async function resolving to whether data changed
+   */
+  start(name, run) {
+    this.stop(name);
+    this.tasks.set(name, {
+      run,
+      delay: this.config.baseDelay,
+      timeout: null,
+      lastRun: Date.now(),
+      running: false
+    });
+    this._schedule(name);
+  },
+
+  /**
+   * Stop polling a task
+   * @param {string} name - Task name
+   */
+  stop(name) {
+    const task = this.tasks.get(name);
+    if (task) {
+      clearTimeout(task.timeout);
+      this.tasks.delete(name);
+    }
+  },
+
+  /**
+   * Check if a task is polling
+   * @param {string} name - Task name
+   * @returns {boolean} - Whether the task is running
+   */
+  isRunning(name) {
+    return this.tasks.has(name);
+  },
+
+  /**
+   * Schedule a task's next run after its current delay
+   * @param {string} name - Task name
+   * @param {number} delay - Optional delay overriding the task's own
+   * @private
+   */
+  _schedule(name, delay) {
+    const task = this.tasks.get(name);
+    if (!task || document.hidden) return;
+
+    clearTimeout(task.timeout);
+    task.timeout = setTimeout(() => this._run(name), delay ?? task.delay);
+  },
+
+  /**
+   * Run a task and work out its next delay
+   * @param {string} name - Task name
+   * @private
+   */
+  async _run(name) {
+    const task = this.tasks.get(name);
+    if (!task || task.running) return;
+
+    task.running = true;
+    task.lastRun = Date.now();
+    let changed = false;
+    try {
+      changed = await task.run();
+    } catch (error) {
+      console.error(`Refresh task ${name} failed:`, error);
+    } finally {
+      task.running = false;
+    }
+
+    // The task may have been stopped or replaced while it ran
+    if (this.tasks.get(name) !== task) return;
+
+    task.delay = changed ? this.config.baseDelay : Math.min(task.delay * 2, this.config.maxDelay);
+    this._schedule(name);
+  },
+
+  /**
+   * Pause every task while the page is hidden, and on return run the ones
+   * that are due right away instead of waiting out the full delay
+   * @private
+   */
+  _handleVisibilityChange() {
+    this.tasks.forEach((task, name) => {
+      clearTimeout(task.timeout);
+      task.timeout = null;
+      if (!document.hidden) {
+        this._schedule(name, Math.max(0, task.lastRun + task.delay - Date.now()));
+      }
+    });
+  }
+};
+
+document.addEventListener('visibilitychange', () => RefreshScheduler._handleVisibilityChange());
+
+// Export the scheduler
+window.RefreshScheduler = RefreshScheduler;
@@ -8,7 +8,8 @@ const WebSocketManager = {
   connections: {
     invoices: null,
     payments: null,
-    balances: null
+    balances: null,
+    catalog: null
   },
   
   // Configuration
@@ -23,15 +24,19 @@ const WebSocketManager = {
     reconnectAttempts: 0,
     reconnectTimeout: null,
     fallbackPolling: false,
-    pollingInterval: null,
-    userId: null
+    eventSource: null,
+    userId: null,
+    catalogChannel: null,
+    onPollingRequired: null
   },
   
   /**
    * Initialize the WebSocket manager
    * @param {string} userId - User ID for WebSocket connections
+   * @param {Object} options - onPollingRequired: async refresh used while
+   *                           polling, resolving to whether data changed
    */
-  initialize(userId) {
+  initialize(userId, options = {}) {
     if (!userId) {
       console.error('User ID is required for WebSocket initialization');
       return;
@@ -39,6 +44,7 @@ const WebSocketManager = {
     
     // Set user ID
     this.state.userId = userId;
+    this.state.onPollingRequired = options.onPollingRequired || null;
     
     // Connect to WebSockets
     this.connect();
@@ -58,6 +64,7 @@ const WebSocketManager = {
     this._connectInvoices();
     this._connectPayments();
     this._connectBalances();
+    this._connectCatalog();
     
     // Set connected state
     this.state.connected = true;
@@ -84,7 +91,7 @@ const WebSocketManager = {
       const wsUrl = `${wsProtocol}//${window.location.host}/api/v1/ws/taproot-assets-invoices-${this.state.userId}`;
       
       this.connections.invoices = new WebSocket(wsUrl);
-      this.connections.invoices.onmessage = this._handleInvoiceMessage.bind(this);
+      this.connections.invoices.onmessage = (event) => this._handleFrame(event, this._handleInvoiceMessage);
       this.connections.invoices.onclose = () => this._handleConnectionClose('invoices');
       this.connections.invoices.onerror = (err) => this._handleConnectionError('invoices', err);
     } catch (error) {
@@ -105,7 +112,7 @@ const WebSocketManager = {
       const wsUrl = `${wsProtocol}//${window.location.host}/api/v1/ws/taproot-assets-payments-${this.state.userId}`;
       
       this.connections.payments = new WebSocket(wsUrl);
-      this.connections.payments.onmessage = this._handlePaymentMessage.bind(this);
+      this.connections.payments.onmessage = (event) => this._handleFrame(event, this._handlePaymentMessage);
       this.connections.payments.onclose = () => this._handleConnectionClose('payments');
       this.connections.payments.onerror = (err) => this._handleConnectionError('payments', err);
     } catch (error) {
@@ -126,7 +133,7 @@ const WebSocketManager = {
       const wsUrl = `${wsProtocol}//${window.location.host}/api/v1/ws/taproot-assets-balances-${this.state.userId}`;
       
       this.connections.balances = new WebSocket(wsUrl);
-      this.connections.balances.onmessage = this._handleBalanceMessage.bind(this);
+      this.connections.balances.onmessage = (event) => this._handleFrame(event, this._handleBalanceMessage);
       this.connections.balances.onclose = () => this._handleConnectionClose('balances');
       this.connections.balances.onerror = (err) => this._handleConnectionError('balances', err);
     } catch (error) {
@@ -136,13 +143,70 @@ const WebSocketManager = {
   },
   
   /**
-   * Handle invoice WebSocket message
+   * Subscribe to the shared asset catalog channel
+   * @param {string} channel - Catalog channel name from the asset state endpoint
+   */
+  connectCatalog(channel) {
+    if (!channel) return;
+    if (channel === this.state.catalogChannel && this.isConnected('catalog')) return;
+    
+    if (this.connections.catalog) {
+      // Drop the handlers so closing the old channel doesn't trigger a reconnect
+      this.connections.catalog.onclose = null;
+      this.connections.catalog.onerror = null;
+      this.connections.catalog.close();
+      this.connections.catalog = null;
+    }
+    
+    this.state.catalogChannel = channel;
+    this._connectCatalog();
+  },
+  
+  /**
+   * Connect to the catalog WebSocket, once its channel is known
+   * @private
+   */
+  _connectCatalog() {
+    if (!this.state.catalogChannel) return;
+    
+    try {
+      const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+      const wsUrl = `${wsProtocol}//${window.location.host}/api/v1/ws/${this.state.catalogChannel}`;
+      
+      this.connections.catalog = new WebSocket(wsUrl);
+      this.connections.catalog.onmessage = (event) => this._handleFrame(event, this._handleCatalogMessage);
+      this.connections.catalog.onclose = () => this._handleConnectionClose('catalog');
+      this.connections.catalog.onerror = (err) => this._handleConnectionError('catalog', err);
+    } catch (error) {
+      console.error('Error connecting to catalog WebSocket:', error);
+      this._handleConnectionError('catalog', error);
+    }
+  },
+  
+  /**
+   * Parse a WebSocket frame and pass each message in it to a handler.
+   * The server merges messages sent close together into one batch frame.
    * @param {MessageEvent} event - WebSocket message event
+   * @param {Function} handler - Message handler
    * @private
    */
-  _handleInvoiceMessage(event) {
+  _handleFrame(event, handler) {
     try {
       const data = JSON.parse(event.data);
+      const messages = data?.type === 'batch' && Array.isArray(data.events) ? data.events : [data];
+      messages.forEach(message => handler.call(this, message));
+    } catch (error) {
+      console.error('Error parsing WebSocket frame:', error);
+    }
+  },
+  
+  /**
+   * Handle invoice WebSocket message
+   * @param {Object} data - Parsed message
+   * @private
+   */
+  _handleInvoiceMessage(data) {
+    try {
       console.log('Invoice WebSocket message received:', data);
       
       // First, process balance data if available
@@ -169,8 +233,7 @@ const WebSocketManager = {
             NotificationService.notifyInvoicePaid(processedInvoice);
           }
           
-          // Force refresh of assets to update balances
-          this._refreshAssets();
+          // The new balance arrives as a balances delta, no refetch needed
         }
       }
     } catch (error) {
@@ -180,12 +243,11 @@ const WebSocketManager = {
   
   /**
    * Handle payment WebSocket message
-   * @param {MessageEvent} event - WebSocket message event
+   * @param {Object} data - Parsed message
    * @private
    */
-  _handlePaymentMessage(event) {
+  _handlePaymentMessage(data) {
     try {
-      const data = JSON.parse(event.data);
       console.log('Payment WebSocket message received:', data);
       
       // First, process asset info if available
@@ -193,18 +255,9 @@ const WebSocketManager = {
         this._processAssetInfo(data.data);
       }
       
-      // Process with PaymentService
+      // Merge the payment into the store; balances follow as a balances delta
       if (window.PaymentService) {
-        const processedPayment = PaymentService.processWebSocketUpdate(data);
-        
-        // Check if this is a completed payment notification
-        if (processedPayment && processedPayment.status === 'completed') {
-          console.log('Completed payment detected, triggering UI update');
-          
-          // Force refresh of assets and transactions
-          this._refreshAssets();
-          this._refreshTransactions();
-        }
+        PaymentService.processWebSocketUpdate(data);
       }
     } catch (error) {
       console.error('Error handling payment WebSocket message:', error);
@@ -213,32 +266,38 @@ const WebSocketManager = {
   
   /**
    * Handle balance WebSocket message
-   * @param {MessageEvent} event - WebSocket message event
+   * @param {Object} data - Parsed message
    * @private
    */
-  _handleBalanceMessage(event) {
+  _handleBalanceMessage(data) {
     try {
-      const data = JSON.parse(event.data);
       console.log('Balance WebSocket message received:', data);
       
-      // Process asset data with AssetService
-      if (data?.type === 'assets_update' && Array.isArray(data.data)) {
-        if (window.AssetService && typeof window.AssetService.processWebSocketUpdate === 'function') {
-          // Let AssetService handle the update
-          AssetService.processWebSocketUpdate(data);
-        } else {
-          // Process ourselves if AssetService doesn't have the method
-          this._processAssetUpdate(data.data);
-        }
-        
-        // Also refresh transactions to ensure asset names are up to date
-        this._refreshTransactions();
+      // Apply the balance changes with AssetService; it resyncs on sequence gaps
+      if (data?.type === 'balances_delta' && window.AssetService) {
+        AssetService.applyBalancesDelta(data);
       }
     } catch (error) {
       console.error('Error handling balance WebSocket message:', error);
     }
   },
   
+  /**
+   * Handle catalog WebSocket message
+   * @param {Object} data - Parsed message
+   * @private
+   */
+  _handleCatalogMessage(data) {
+    try {
+      // Apply the catalog changes with AssetService; it resyncs on sequence gaps
+      if (data?.type === 'catalog_delta' && window.AssetService) {
+        AssetService.applyCatalogDelta(data);
+      }
+    } catch (error) {
+      console.error('Error handling catalog WebSocket message:', error);
+    }
+  },
+  
   /**
    * Process asset info from message data
    * @param {Object} data - Message data with asset info
@@ -259,81 +318,53 @@ const WebSocketManager = {
     }
   },
   
-  /**
-   * Process a batch asset update
-   * @param {Array} assets - Array of asset data
-   * @private
-   */
-  _processAssetUpdate(assets) {
-    if (!Array.isArray(assets)) return;
-    
-    // Ensure the global asset map exists
-    if (!window.assetMap) window.assetMap = {};
-    
-    // Update the asset map with all assets
-    assets.forEach(asset => {
-      if (asset.asset_id) {
-        window.assetMap[asset.asset_id] = {
-          name: asset.name || `Asset ${asset.asset_id.substring(0, 8)}...`,
-          type: asset.type || 'unknown',
-          channel_info: asset.channel_info
-        };
-      }
-    });
-    
-    // Update the store
-    if (window.taprootStore?.actions?.setAssets && window.taprootStore.state?.assets) {
-      // Merge with existing assets
-      const existingAssets = [...window.taprootStore.state.assets];
-      const assetIds = new Set(existingAssets.map(a => a.asset_id));
-      
-      // Update existing and add new
-      const updatedAssets = [...existingAssets];
-      assets.forEach(asset => {
-        if (asset.asset_id) {
-          if (assetIds.has(asset.asset_id)) {
-            // Update existing
-            const index = updatedAssets.findIndex(a => a.asset_id === asset.asset_id);
-            if (index !== -1) {
-              updatedAssets[index] = {...updatedAssets[index], ...asset};
-            }
-          } else {
-            // Add new
-            updatedAssets.push(asset);
-          }
-        }
-      });
-      
-      // Update the store
-      window.taprootStore.actions.setAssets(updatedAssets);
-    }
-  },
-  
   /**
    * Refresh assets using the store
+   * @returns {Promise} - Resolves when the refresh is done
    * @private
    */
   _refreshAssets() {
     const wallet = window.taprootStore?.getters?.getCurrentWallet();
     if (wallet && window.AssetService) {
-      AssetService.getAssets(wallet);
+      return AssetService.getAssets(wallet);
     }
+    return Promise.resolve();
   },
   
   /**
    * Refresh transactions using services
+   * @returns {Promise} - Resolves when both refreshes are done
    * @private
    */
   _refreshTransactions() {
     const wallet = window.taprootStore?.getters?.getCurrentWallet();
+    const refreshes = [];
     if (wallet) {
       if (window.InvoiceService) {
-        InvoiceService.getInvoices(wallet, true);
+        refreshes.push(InvoiceService.getInvoices(wallet));
       }
       if (window.PaymentService) {
-        PaymentService.getPayments(wallet, true);
+        refreshes.push(PaymentService.getPayments(wallet));
       }
     }
+    return Promise.all(refreshes);
+  },
+  
+  /**
+   * Refresh everything once while polling
+   * @returns {Promise<boolean>} - Whether any data changed
+   * @private
+   */
+  async _poll() {
+    if (this.state.onPollingRequired) {
+      return this.state.onPollingRequired();
+    }
+    
+    const state = window.taprootStore?.state;
+    const versions = () => `${state?.assetsVersion}:${state?.transactionsVersion}`;
+    const before = versions();
+    await Promise.all([this._refreshAssets(), this._refreshTransactions()]);
+    return versions() !== before;
   },
   
   /**
@@ -451,12 +482,17 @@ const WebSocketManager = {
   },
   
   /**
-   * Start fallback polling for data
+   * Start fallback updates for data: a Server-Sent Events stream carrying
+   * the same messages as the WebSockets, or polling if that fails too
    * @private
    */
   _startFallbackPolling() {
-    // Only start if not already polling
-    if (this.state.fallbackPolling || this.state.pollingInterval) {
+    // Only start if not already polling or streaming
+    if (this.state.fallbackPolling || this.state.eventSource) {
+      return;
+    }
+    
+    if (window.EventSource && this._startEventStream()) {
       return;
     }
     
@@ -468,11 +504,63 @@ const WebSocketManager = {
       fallbackPolling: true
     });
     
-    // Set up polling interval (every 10 seconds)
-    this.state.pollingInterval = setInterval(() => {
-      this._refreshAssets();
+    // Poll with backoff while data stays unchanged; paused while the tab is hidden
+    RefreshScheduler.start('fallbackPolling', () => this._poll());
+  },
+  
+  /**
+   * Open the Server-Sent Events stream
+   * @returns {boolean} - Whether the stream could be opened
+   * @private
+   */
+  _startEventStream() {
+    const wallet = window.taprootStore?.getters?.getCurrentWallet();
+    if (!wallet?.inkey) return false;
+    
+    console.log('Starting Server-Sent Events stream');
+    const url = `/taproot_assets/api/v1/taproot/events?api-key=${encodeURIComponent(wallet.inkey)}`;
+    const source = new EventSource(url);
+    this.state.eventSource = source;
+    
+    // The stream carries the WebSocket messages; EventSource resumes with Last-Event-ID on its own
+    source.addEventListener('invoices', (event) => this._handleFrame(event, this._handleInvoiceMessage));
+    source.addEventListener('payments', (event) => this._handleFrame(event, this._handlePaymentMessage));
+    source.addEventListener('balances', (event) => this._handleFrame(event, this._handleBalanceMessage));
+    source.addEventListener('catalog', (event) => this._handleFrame(event, this._handleCatalogMessage));
+    source.addEventListener('resync', () => {
+      // Some events were missed, refetch everything once
+      const currentWallet = window.taprootStore?.getters?.getCurrentWallet();
+      if (currentWallet && window.AssetService) {
+        AssetService.resync(currentWallet);
+      }
       this._refreshTransactions();
-    }, 10000); // 10 seconds
+    });
+    source.onerror = () => {
+      // EventSource retries by itself unless the server refused the stream
+      if (source.readyState === EventSource.CLOSED) {
+        this._stopEventStream();
+        this._startFallbackPolling();
+      }
+    };
+    
+    this._updateStoreConnectionStatus({
+      eventStream: true
+    });
+    return true;
+  },
+  
+  /**
+   * Close the Server-Sent Events stream
+   * @private
+   */
+  _stopEventStream() {
+    if (this.state.eventSource) {
+      this.state.eventSource.close();
+      this.state.eventSource = null;
+      this._updateStoreConnectionStatus({
+        eventStream: false
+      });
+    }
   },
   
   /**
@@ -480,10 +568,8 @@ const WebSocketManager = {
    * @private
    */
   _stopFallbackPolling() {
-    if (this.state.pollingInterval) {
-      clearInterval(this.state.pollingInterval);
-      this.state.pollingInterval = null;
-    }
+    this._stopEventStream();
+    RefreshScheduler.stop('fallbackPolling');
     this.state.fallbackPolling = false;
     
     // Update store
@@ -557,6 +643,7 @@ const WebSocketManager = {
     
     // Reset state
     this.state.userId = null;
+    this.state.onPollingRequired = null;
     this.state.reconnectAttempts = 0;
   }
 };
@@ -3,6 +3,77 @@
  * Uses Vue.js reactivity system
  */
 
+/**
+ * Whether two versions of an item show the same data. UI flags (_isNew,
+ * _statusChanged, ...) and the relative time are left out, so a refetch of
+ * unchanged rows is recognised as unchanged.
+ * @param {Object} a - Current item
+ * @param {Object} b - New item
+ * @returns {boolean} - Whether the items match
+ */
+function sameItem(a, b) {
+  const strip = item => JSON.stringify(item, (key, value) =>
+    key.startsWith('_') || key === 'timeFrom' ? undefined : value);
+  return strip(a) === strip(b);
+}
+
+/**
+ * Merge items into a reactive list by key, in place. Unchanged items keep
+ * their object, so only rows that changed are re-rendered.
+ * @param {Array} list - Reactive list to update
+ * @param {Array} items - New versions of items
+ * @param {Function} key - Function returning an item's key
+ * @param {Object} options - complete: remove items missing from items;
+ *                           markChanges: flag new rows and status changes,
+ *                           unless the list was empty (initial load)
+ * @returns {boolean} - Whether anything changed
+ */
+function mergeByKey(list, items, key, { complete = false, markChanges = false } = {}) {
+  const positions = new Map(list.map((item, index) => [key(item), index]));
+  const seen = new Set();
+  const mark = markChanges && list.length > 0;
+  let changed = false;
+  
+  items.forEach(item => {
+    const itemKey = key(item);
+    seen.add(itemKey);
+    const index = positions.get(itemKey);
+    
+    if (index === undefined) {
+      if (mark) item._isNew = true;
+      positions.set(itemKey, list.push(item) - 1);
+      changed = true;
+    } else if (!sameItem(list[index], item)) {
+      if (mark && list[index].status !== item.status) {
+        item._previousStatus = list[index].status;
+        item._statusChanged = true;
+      }
+      list[index] = item;
+      changed = true;
+    }
+  });
+  
+  if (complete) {
+    for (let index = list.length - 1; index >= 0; index--) {
+      if (!seen.has(key(list[index]))) {
+        list.splice(index, 1);
+        changed = true;
+      }
+    }
+  }
+  
+  return changed;
+}
+
+// Key of an asset entry; assets with channels are listed once per channel
+const assetKey = asset => {
+  const channelPoint = asset?.channel_info?.channel_point;
+  return channelPoint ? `${asset.asset_id}:${channelPoint}` : asset.asset_id;
+};
+
+// Key of an invoice or payment
+const transactionKey = transaction => transaction.id;
+
 // Create reactive state store
 const taprootStore = {
   // State - reactive data store
@@ -10,11 +81,15 @@ const taprootStore = {
     // Assets
     assets: [],
     assetsLoading: false,
+    // Bumped whenever assets change, so views can watch it instead of deep-watching the list
+    assetsVersion: 0,
     
     // Transactions
     invoices: [],
     payments: [],
     transactionsLoading: false,
+    // Bumped whenever invoices or payments change
+    transactionsVersion: 0,
     
     // Filters and search
     filters: {
@@ -29,7 +104,8 @@ const taprootStore = {
     websocketStatus: {
       connected: false,
       reconnecting: false,
-      fallbackPolling: false
+      fallbackPolling: false,
+      eventStream: false
     },
     
     // Current user wallet
@@ -163,8 +239,8 @@ const taprootStore = {
   actions: {
     // Assets
     setAssets(assets) {
-      if (this.state) {
-        this.state.assets = assets || [];
+      if (this.state && mergeByKey(this.state.assets, assets || [], assetKey, { complete: true })) {
+        this.state.assetsVersion++;
       }
     },
     
@@ -174,6 +250,7 @@ const taprootStore = {
       const index = this.state.assets.findIndex(a => a.asset_id === assetId);
       if (index !== -1) {
         this.state.assets[index] = { ...this.state.assets[index], ...changes };
+        this.state.assetsVersion++;
       }
     },
     
@@ -187,29 +264,23 @@ const taprootStore = {
     setInvoices(invoices) {
       if (this.state) {
         this.state.invoices = invoices || [];
+        this.state.transactionsVersion++;
+      }
+    },
+    
+    // Merge a fetched page of invoices; invoices outside the page are kept
+    mergeInvoices(invoices) {
+      if (this.state && mergeByKey(this.state.invoices, invoices || [], transactionKey, { markChanges: true })) {
+        this.state.transactionsVersion++;
       }
     },
     
     addInvoice(invoice) {
-      if (!this.state || !this.state.invoices) return;
+      if (!this.state || !this.state.invoices || !invoice) return;
       
-      // Check if invoice already exists
-      const index = this.state.invoices.findIndex(i => i.id === invoice.id);
-      if (index !== -1) {
-        // Mark status change
-        if (this.state.invoices[index].status !== invoice.status) {
-          invoice._previousStatus = this.state.invoices[index].status;
-          invoice._statusChanged = true;
-        }
-        
-        // Update existing invoice
-        this.state.invoices[index] = invoice;
-      } else {
-        // Mark as new
-        invoice._isNew = true;
-        
-        // Add new invoice
-        this.state.invoices.unshift(invoice);
+      // Adds new invoices and marks status changes of known ones
+      if (mergeByKey(this.state.invoices, [invoice], transactionKey, { markChanges: true })) {
+        this.state.transactionsVersion++;
       }
     },
     
@@ -226,6 +297,7 @@ const taprootStore = {
         
         // Update invoice
         this.state.invoices[index] = { ...this.state.invoices[index], ...changes };
+        this.state.transactionsVersion++;
       }
     },
     
@@ -233,29 +305,23 @@ const taprootStore = {
     setPayments(payments) {
       if (this.state) {
         this.state.payments = payments || [];
+        this.state.transactionsVersion++;
+      }
+    },
+    
+    // Merge a fetched page of payments; payments outside the page are kept
+    mergePayments(payments) {
+      if (this.state && mergeByKey(this.state.payments, payments || [], transactionKey, { markChanges: true })) {
+        this.state.transactionsVersion++;
       }
     },
     
     addPayment(payment) {
-      if (!this.state || !this.state.payments) return;
+      if (!this.state || !this.state.payments || !payment) return;
       
-      // Check if payment already exists
-      const index = this.state.payments.findIndex(p => p.id === payment.id);
-      if (index !== -1) {
-        // Mark status change
-        if (this.state.payments[index].status !== payment.status) {
-          payment._previousStatus = this.state.payments[index].status;
-          payment._statusChanged = true;
-        }
-        
-        // Update existing payment
-        this.state.payments[index] = payment;
-      } else {
-        // Mark as new
-        payment._isNew = true;
-        
-        // Add new payment
-        this.state.payments.unshift(payment);
+      // Adds new payments and marks status changes of known ones
+      if (mergeByKey(this.state.payments, [payment], transactionKey, { markChanges: true })) {
+        this.state.transactionsVersion++;
       }
     },
     
@@ -272,6 +338,7 @@ const taprootStore = {
         
         // Update payment
         this.state.payments[index] = { ...this.state.payments[index], ...changes };
+        this.state.transactionsVersion++;
       }
     },
     
@@ -0,0 +1,573 @@
+"""
+gRPC client interceptors for Taproot Assets extension.
+Installed on every channel to tapd and lnd: tracing, circuit breakers,
+per-method deadlines, retries of idempotent reads, and latency and status
+metrics.
+"""
+import asyncio
+import random
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import grpc
+import grpc.aio
+
+from ..error_utils import BackendUnavailableError
+from ..logging_utils import log_info, log_warning, NODE
+from ..tracing import SpanContext, set_span_attributes
+
+
+def _method_name(client_call_details: grpc.aio.ClientCallDetails) -> str:
+    """Get "package.Service/Method" from the call details."""
+    method = client_call_details.method
+    if isinstance(method, bytes):
+        method = method.decode()
+    return method.lstrip("/")
+
+
+class TracingUnaryUnaryInterceptor(grpc.aio.UnaryUnaryClientInterceptor):
+    """Records each unary RPC as a client span, from request to response."""
+
+    async def intercept_unary_unary(self, continuation, client_call_details, request):
+        method = _method_name(client_call_details)
+        with SpanContext(f"rpc {method}", "client", **{"rpc.method": method}) as span:
+            try:
+                # Inner interceptors may already raise the call's error here
+                call = await continuation(client_call_details, request)
+                await call
+            except grpc.aio.AioRpcError as e:
+                if span is not None:
+                    span.set_attributes(**{"rpc.status_code": e.code().name})
+                raise
+            return call
+
+
+class TracingUnaryStreamInterceptor(grpc.aio.UnaryStreamClientInterceptor):
+    """
+    Records each server-streaming RPC as a client span, from request to the
+    end of the stream.
+
+    The stream is read by the caller, so the span is never made current:
+    spans started while reading are children of the caller's span.
+    """
+
+    async def intercept_unary_stream(self, continuation, client_call_details, request):
+        method = _method_name(client_call_details)
+        call = await continuation(client_call_details, request)
+        return self._stream(call, SpanContext(f"rpc {method}", "client", activate=False, **{"rpc.method": method}))
+
+    @staticmethod
+    async def _stream(call, span_context: SpanContext):
+        with span_context as span:
+            try:
+                async for response in call:
+                    yield response
+            except grpc.aio.AioRpcError as e:
+                if span is not None:
+                    span.set_attributes(**{"rpc.status_code": e.code().name})
+                raise
+            finally:
+                # Stop the RPC if the caller stopped reading early
+                call.cancel()
+
+
+class _MethodMetrics:
+    """Counters of one RPC method."""
+
+    __slots__ = ("calls", "in_flight", "codes", "buckets", "seconds")
+
+    def __init__(self, bucket_count: int):
+        self.calls = 0
+        self.in_flight = 0
+        self.codes: Dict[str, int] = {}
+        # Calls per latency bucket; the last bucket holds the slower ones
+        self.buckets = [0] * (bucket_count + 1)
+        self.seconds = 0.0
+
+
+class RpcMetrics:
+    """
+    In-memory metrics of the gRPC calls to tapd and lnd, per method.
+
+    Records call counts, in-flight calls, status code counts and a latency
+    histogram. Every attempt counts, so a retried read shows up once per
+    try. Streams count from the request to the end of the stream.
+    """
+
+    # Upper bounds of the latency histogram buckets, in seconds
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    _methods: Dict[str, _MethodMetrics] = {}
+
+    @classmethod
+    def started(cls, method: str) -> None:
+        """Record the start of a call."""
+        metrics = cls._methods.get(method)
+        if metrics is None:
+            metrics = cls._methods[method] = _MethodMetrics(len(cls.LATENCY_BUCKETS))
+        metrics.calls += 1
+        metrics.in_flight += 1
+
+    @classmethod
+    def finished(cls, method: str, code: str, seconds: float) -> None:
+        """Record the end of a call with its status code name and duration."""
+        metrics = cls._methods[method]
+        metrics.in_flight -= 1
+        metrics.codes[code] = metrics.codes.get(code, 0) + 1
+        metrics.buckets[bisect_left(cls.LATENCY_BUCKETS, seconds)] += 1
+        metrics.seconds += seconds
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """
+        Get the metrics of every method called so far.
+
+        Returns:
+            Dict[str, Any]: Per method, the call, in-flight and status code
+                counts, total seconds, and cumulative latency buckets keyed
+                by upper bound ("+Inf" for all calls)
+        """
+        bounds = [str(bound) for bound in cls.LATENCY_BUCKETS] + ["+Inf"]
+        stats = {}
+        for method, metrics in sorted(cls._methods.items()):
+            cumulative = 0
+            histogram = {}
+            for bound, count in zip(bounds, metrics.buckets):
+                cumulative += count
+                histogram[bound] = cumulative
+            stats[method] = {
+                "calls": metrics.calls,
+                "in_flight": metrics.in_flight,
+                "codes": dict(metrics.codes),
+                "seconds": round(metrics.seconds, 6),
+                "latency_buckets": histogram,
+            }
+        return stats
+
+
+def _status_code(error: BaseException) -> str:
+    """Get the status code name a call failed with."""
+    if isinstance(error, grpc.aio.AioRpcError):
+        return error.code().name
+    if isinstance(error, asyncio.CancelledError):
+        return grpc.StatusCode.CANCELLED.name
+    return grpc.StatusCode.UNKNOWN.name
+
+
+class MetricsUnaryUnaryInterceptor(grpc.aio.UnaryUnaryClientInterceptor):
+    """Records latency, status code and in-flight count of each unary call attempt."""
+
+    async def intercept_unary_unary(self, continuation, client_call_details, request):
+        method = _method_name(client_call_details)
+        RpcMetrics.started(method)
+        start = time.monotonic()
+        code = grpc.StatusCode.OK.name
+        try:
+            call = await continuation(client_call_details, request)
+            await call
+            return call
+        except BaseException as e:
+            code = _status_code(e)
+            raise
+        finally:
+            RpcMetrics.finished(method, code, time.monotonic() - start)
+
+
+class MetricsUnaryStreamInterceptor(grpc.aio.UnaryStreamClientInterceptor):
+    """Records latency, status code and in-flight count of each stream, until it ends."""
+
+    async def intercept_unary_stream(self, continuation, client_call_details, request):
+        method = _method_name(client_call_details)
+        RpcMetrics.started(method)
+        start = time.monotonic()
+        try:
+            call = await continuation(client_call_details, request)
+        except BaseException as e:
+            RpcMetrics.finished(method, _status_code(e), time.monotonic() - start)
+            raise
+        return self._stream(call, method, start)
+
+    @staticmethod
+    async def _stream(call, method: str, start: float):
+        code = grpc.StatusCode.OK.name
+        try:
+            async for response in call:
+                yield response
+        except GeneratorExit:
+            code = grpc.StatusCode.CANCELLED.name
+            raise
+        except BaseException as e:
+            code = _status_code(e)
+            raise
+        finally:
+            RpcMetrics.finished(method, code, time.monotonic() - start)
+
+
+class RpcPolicy:
+    """
+    Deadlines and retries of the gRPC calls to tapd and lnd.
+
+    A call made without a timeout gets its method's deadline from DEADLINES,
+    or DEFAULT_DEADLINE_SECONDS; methods mapped to None run without one.
+    Those are invoice subscriptions and payment streams, which last until
+    the invoice or payment resolves; a payment cut off by a deadline may
+    still settle later. Idempotent reads in RETRYABLE_METHODS
+    that fail with a status in RETRYABLE_CODES are tried again, up to
+    MAX_ATTEMPTS times with jittered exponential backoff, as long as the
+    deadline leaves time for another attempt. The deadline covers all
+    attempts together.
+    """
+
+    # Seconds a call may take, by method
+    DEADLINES: Dict[str, Optional[float]] = {
+        "GetNodeInfo": 5.0,
+        "ListAssets": 10.0,
+        "ListChannels": 10.0,
+        "AddAssetBuyOrder": 5.0,
+        "AddInvoice": 5.0,
+        "DecodeAssetPayReq": 10.0,
+        "CancelInvoice": 10.0,
+        # A settle that times out may still be applied; the invoice monitor follows it
+        "SettleInvoice": 15.0,
+        # Moves funds; the stream is read until the payment succeeds or fails
+        "SendPayment": None,
+        "SubscribeSingleInvoice": None,
+    }
+
+    # Seconds a call may take when its method has no entry in DEADLINES
+    DEFAULT_DEADLINE_SECONDS = 30.0
+
+    # Reads that are safe to send again
+    RETRYABLE_METHODS = frozenset({"GetNodeInfo", "ListAssets", "ListChannels"})
+
+    # Status codes a read is retried on
+    RETRYABLE_CODES = frozenset({grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.RESOURCE_EXHAUSTED})
+
+    # Maximum number of attempts of a retryable read
+    MAX_ATTEMPTS = 3
+
+    # Seconds before the first retry; doubles for each further one
+    BACKOFF_SECONDS = 0.2
+
+    @classmethod
+    def deadline(cls, method: str) -> Optional[float]:
+        """
+        Get the deadline of a method.
+
+        Args:
+            method: The full method name, e.g. "lnrpc.Lightning/ListChannels"
+
+        Returns:
+            Optional[float]: Seconds the call may take, or None for no deadline
+        """
+        return cls.DEADLINES.get(method.rsplit("/", 1)[-1], cls.DEFAULT_DEADLINE_SECONDS)
+
+    @classmethod
+    def is_retryable(cls, method: str) -> bool:
+        """Check if a method is an idempotent read that may be retried."""
+        return method.rsplit("/", 1)[-1] in cls.RETRYABLE_METHODS
+
+
+class PolicyUnaryUnaryInterceptor(grpc.aio.UnaryUnaryClientInterceptor):
+    """Applies RpcPolicy deadlines and retries to unary calls."""
+
+    async def intercept_unary_unary(self, continuation, client_call_details, request):
+        method = _method_name(client_call_details)
+        timeout = client_call_details.timeout
+        if timeout is None:
+            timeout = RpcPolicy.deadline(method)
+        if not RpcPolicy.is_retryable(method):
+            return await continuation(client_call_details._replace(timeout=timeout), request)
+
+        expires = time.monotonic() + timeout if timeout is not None else None
+        attempt = 1
+        while True:
+            remaining = expires - time.monotonic() if expires is not None else None
+            try:
+                call = await continuation(client_call_details._replace(timeout=remaining), request)
+                await call
+                return call
+            except grpc.aio.AioRpcError as e:
+                if attempt >= RpcPolicy.MAX_ATTEMPTS or e.code() not in RpcPolicy.RETRYABLE_CODES:
+                    raise
+                backoff = RpcPolicy.BACKOFF_SECONDS * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                if expires is not None and time.monotonic() + backoff >= expires:
+                    raise
+                log_warning(NODE, f"{method} failed with {e.code().name}, retrying (attempt {attempt + 1})")
+                set_span_attributes(**{"rpc.attempts": attempt + 1})
+                await asyncio.sleep(backoff)
+                attempt += 1
+
+
+class PolicyUnaryStreamInterceptor(grpc.aio.UnaryStreamClientInterceptor):
+    """Applies RpcPolicy deadlines to streams; streams are never retried."""
+
+    async def intercept_unary_stream(self, continuation, client_call_details, request):
+        if client_call_details.timeout is None:
+            timeout = RpcPolicy.deadline(_method_name(client_call_details))
+            client_call_details = client_call_details._replace(timeout=timeout)
+        return await continuation(client_call_details, request)
+
+
+class _Breaker:
+    """State of one backend's circuit."""
+
+    __slots__ = ("outcomes", "opened_at", "probing")
+
+    def __init__(self, window: int):
+        # True for each failed or slow call among the last ones
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        # Monotonic time the circuit opened, None while closed
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+
+class CircuitBreaker:
+    """
+    Per-backend circuit breakers for tapd, lnd and the RFQ service.
+
+    The outcomes of the last WINDOW_SIZE unary calls to a backend are kept;
+    a call counts as failed if it ends with a status in FAILURE_CODES or,
+    for methods in SLOW_CALL_METHODS, takes longer than SLOW_CALL_SECONDS.
+    Once at least MIN_CALLS are recorded and FAILURE_RATIO of them failed,
+    the circuit opens: calls to that backend, streams included, raise
+    BackendUnavailableError at once instead of waiting out their deadline.
+    Methods in EXEMPT_METHODS bypass the breaker: they are always let
+    through and their outcomes are not recorded. After OPEN_SECONDS
+    the circuit is half-open and lets one unary call through as a probe; if
+    it succeeds the circuit closes, otherwise it opens again.
+    """
+
+    # Number of recent calls the failure ratio is taken over
+    WINDOW_SIZE = 20
+
+    # Minimum number of recorded calls before the circuit can open
+    MIN_CALLS = 5
+
+    # Share of failed or slow calls that opens the circuit
+    FAILURE_RATIO = 0.5
+
+    # Seconds after which a successful call still counts as failed
+    SLOW_CALL_SECONDS = 5.0
+
+    # Methods with a latency target, whose slow calls count as failed;
+    # others, such as settling an invoice, may take long when healthy
+    SLOW_CALL_METHODS = frozenset({"GetNodeInfo", "ListAssets", "ListChannels", "DecodeAssetPayReq"})
+
+    # Methods that bypass the breaker: settling an invoice that was already
+    # paid, watching invoices, and payments, whose outcome must still be learned
+    EXEMPT_METHODS = frozenset({"SettleInvoice", "SubscribeSingleInvoice", "SendPayment"})
+
+    # Seconds the circuit stays open before a probe is let through
+    OPEN_SECONDS = 15.0
+
+    # Status codes that mean the backend is down or overloaded
+    FAILURE_CODES = frozenset({
+        grpc.StatusCode.UNAVAILABLE,
+        grpc.StatusCode.DEADLINE_EXCEEDED,
+        grpc.StatusCode.RESOURCE_EXHAUSTED,
+    })
+
+    # Backend of each gRPC package; the rest are tapd
+    BACKENDS = {"lnrpc": "lnd", "invoicesrpc": "lnd", "routerrpc": "lnd", "rfqrpc": "rfq"}
+
+    _breakers: Dict[str, _Breaker] = {}
+
+    @classmethod
+    def backend(cls, method: str) -> str:
+        """
+        Get the backend serving a method.
+
+        Args:
+            method: The full method name, e.g. "rfqrpc.Rfq/AddAssetBuyOrder"
+
+        Returns:
+            str: "tapd", "lnd" or "rfq"
+        """
+        return cls.BACKENDS.get(method.split(".", 1)[0], "tapd")
+
+    @classmethod
+    def is_exempt(cls, method: str) -> bool:
+        """Check if a method bypasses the breaker, neither failing fast nor being recorded."""
+        return method.rsplit("/", 1)[-1] in cls.EXEMPT_METHODS
+
+    @classmethod
+    def is_slow(cls, method: str, seconds: float) -> bool:
+        """Check if a successful call took long enough to count as failed."""
+        return method.rsplit("/", 1)[-1] in cls.SLOW_CALL_METHODS and seconds > cls.SLOW_CALL_SECONDS
+
+    @classmethod
+    def _breaker(cls, backend: str) -> _Breaker:
+        breaker = cls._breakers.get(backend)
+        if breaker is None:
+            breaker = cls._breakers[backend] = _Breaker(cls.WINDOW_SIZE)
+        return breaker
+
+    @classmethod
+    def is_open(cls, backend: str) -> bool:
+        """Check if calls to a backend currently fail fast."""
+        return cls._breaker(backend).opened_at is not None
+
+    @classmethod
+    def acquire(cls, backend: str, probe: bool) -> bool:
+        """
+        Let a call to a backend through, or fail it fast.
+
+        Args:
+            backend: The backend called
+            probe: Whether the call may serve as the half-open probe
+
+        Returns:
+            bool: True if the call is the probe, which must be released
+
+        Raises:
+            BackendUnavailableError: If the circuit is open
+        """
+        breaker = cls._breaker(backend)
+        if breaker.opened_at is None:
+            return False
+
+        remaining = breaker.opened_at + cls.OPEN_SECONDS - time.monotonic()
+        if remaining <= 0 and probe and not breaker.probing:
+            breaker.probing = True
+            return True
+        raise BackendUnavailableError(backend, max(remaining, 0.0))
+
+    @classmethod
+    def record(cls, backend: str, failed: bool, probe: bool) -> None:
+        """
+        Record the outcome of a unary call.
+
+        Args:
+            backend: The backend called
+            failed: Whether the call failed or was slow
+            probe: Whether the call was the half-open probe
+        """
+        breaker = cls._breaker(backend)
+        if probe:
+            breaker.probing = False
+            if failed:
+                breaker.opened_at = time.monotonic()
+                log_warning(NODE, f"{backend} probe failed, circuit stays open for {cls.OPEN_SECONDS:.0f}s")
+            else:
+                breaker.opened_at = None
+                breaker.outcomes.clear()
+                log_info(NODE, f"{backend} probe succeeded, circuit closed")
+            return
+        if breaker.opened_at is not None:
+            # A call let through before the circuit opened
+            return
+
+        breaker.outcomes.append(failed)
+        failures = sum(breaker.outcomes)
+        if len(breaker.outcomes) >= cls.MIN_CALLS and failures >= cls.FAILURE_RATIO * len(breaker.outcomes):
+            breaker.opened_at = time.monotonic()
+            log_warning(
+                NODE,
+                f"{backend} circuit opened after {failures} of {len(breaker.outcomes)} calls failed or were slow; "
+                f"failing fast for {cls.OPEN_SECONDS:.0f}s"
+            )
+
+    @classmethod
+    def release(cls, backend: str) -> None:
+        """Give up the probe slot of a probe that ended without an outcome, e.g. cancelled."""
+        cls._breaker(backend).probing = False
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """
+        Get the state of every backend called so far.
+
+        Returns:
+            Dict[str, Any]: Per backend, "closed", "open" or "half_open", and
+                the failed and total counts of the recorded calls
+        """
+        now = time.monotonic()
+        stats = {}
+        for backend, breaker in sorted(cls._breakers.items()):
+            if breaker.opened_at is None:
+                state = "closed"
+            elif breaker.probing or now >= breaker.opened_at + cls.OPEN_SECONDS:
+                state = "half_open"
+            else:
+                state = "open"
+            stats[backend] = {
+                "state": state,
+                "failures": sum(breaker.outcomes),
+                "calls": len(breaker.outcomes),
+            }
+        return stats
+
+
+class CircuitBreakerUnaryUnaryInterceptor(grpc.aio.UnaryUnaryClientInterceptor):
+    """
+    Fails unary calls fast while their backend's circuit is open, and records their outcomes.
+
+    Exempt methods are passed straight through.
+    """
+
+    async def intercept_unary_unary(self, continuation, client_call_details, request):
+        method = _method_name(client_call_details)
+        if CircuitBreaker.is_exempt(method):
+            return await continuation(client_call_details, request)
+        backend = CircuitBreaker.backend(method)
+        probe = CircuitBreaker.acquire(backend, probe=True)
+        start = time.monotonic()
+        failed = None
+        try:
+            call = await continuation(client_call_details, request)
+            await call
+            failed = CircuitBreaker.is_slow(method, time.monotonic() - start)
+            return call
+        except grpc.aio.AioRpcError as e:
+            failed = e.code() in CircuitBreaker.FAILURE_CODES
+            raise
+        finally:
+            if failed is None:
+                # Cancelled or failed locally: says nothing about the backend
+                if probe:
+                    CircuitBreaker.release(backend)
+            else:
+                CircuitBreaker.record(backend, failed, probe)
+
+
+class CircuitBreakerUnaryStreamInterceptor(grpc.aio.UnaryStreamClientInterceptor):
+    """
+    Fails streams fast while their backend's circuit is open.
+
+    Streams such as payments and invoice subscriptions last as long as
+    their subject, so they are neither recorded nor used as probes. Both are
+    exempt, so payments and invoices already in flight are still followed.
+    """
+
+    async def intercept_unary_stream(self, continuation, client_call_details, request):
+        method = _method_name(client_call_details)
+        if not CircuitBreaker.is_exempt(method):
+            CircuitBreaker.acquire(CircuitBreaker.backend(method), probe=False)
+        return await continuation(client_call_details, request)
+
+
+def client_interceptors() -> List[grpc.aio.ClientInterceptor]:
+    """
+    Get the interceptors to install on a gRPC channel.
+
+    Tracing is outermost, so a call's span covers its retries. The circuit
+    breaker comes next, so a call failing fast is never retried and a
+    retried read counts once. Metrics are innermost, so every attempt is
+    measured.
+
+    Returns:
+        List[grpc.aio.ClientInterceptor]: New interceptor instances, in call order
+    """
+    return [
+        TracingUnaryUnaryInterceptor(),
+        TracingUnaryStreamInterceptor(),
+        CircuitBreakerUnaryUnaryInterceptor(),
+        CircuitBreakerUnaryStreamInterceptor(),
+        PolicyUnaryUnaryInterceptor(),
+        PolicyUnaryStreamInterceptor(),
+        MetricsUnaryUnaryInterceptor(),
+        MetricsUnaryStreamInterceptor(),
+    ]
@@ -1,6 +1,8 @@
 import json
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Optional, Tuple
 from loguru import logger
+import grpc.aio
 
 from lnbits.utils.cache import cache
 
@@ -9,6 +11,8 @@ from .taproot_adapter import (
     lightning_pb2
 )
 from ..tapd_settings import ASSET_CACHE_EXPIRY_SECONDS
+from ..logging_utils import log_event, log_warning, ASSET
+from ..error_utils import BackendUnavailableError
 
 class TaprootAssetManager:
     """
@@ -21,6 +25,9 @@ class TaprootAssetManager:
     CHANNEL_ASSET_CACHE_KEY = "taproot:channel_assets:list"
     ASSET_CACHE_EXPIRY = ASSET_CACHE_EXPIRY_SECONDS
 
+    # Last successful listing (wall time, assets), served while tapd or lnd is failing
+    _last_good: Optional[Tuple[float, List[Dict[str, Any]]]] = None
+
     def __init__(self, node):
         """
         Initialize the asset manager with a reference to the node.
@@ -69,6 +76,10 @@ class TaprootAssetManager:
         """
         List all Taproot Assets with caching.
         
+        If tapd or lnd fails, or its circuit breaker is open, the last
+        successful listing is returned instead, with "stale": True and
+        "as_of" (its Unix time) on every asset.
+        
         Args:
             force_refresh: Whether to force a refresh from the node
             
@@ -95,7 +106,7 @@ class TaprootAssetManager:
             logger.info(f"Node host: {self.node.host}")
             logger.info(f"Request params: with_witness={request.with_witness}, include_spent={request.include_spent}, include_leased={request.include_leased}, include_unconfirmed_mints={request.include_unconfirmed_mints}")
             
-            response = await self.node.stub.ListAssets(request, timeout=10)
+            response = await self.node.stub.ListAssets(request)
             logger.info(f"ListAssets RPC completed successfully, got {len(response.assets)} assets")
 
             # Convert response assets to dictionary format
@@ -179,14 +190,25 @@ class TaprootAssetManager:
 
             # Store in cache before returning
             cache.set(self.ASSET_CACHE_KEY, result_assets, expiry=self.ASSET_CACHE_EXPIRY)
+            TaprootAssetManager._last_good = (time.time(), [asset.copy() for asset in result_assets])
             return result_assets
+        except BackendUnavailableError as e:
+            log_warning(ASSET, f"Listing assets failed fast: {str(e)}")
+            return self._stale_assets()
         except Exception as e:
             logger.error(f"Failed to list assets: {str(e)}")
             logger.error(f"Exception type: {type(e)}")
             logger.error(f"Exception details: {repr(e)}")
             import traceback
             logger.error(f"Traceback: {traceback.format_exc()}")
-            return []  # Return empty list on error
+            return self._stale_assets()
+
+    def _stale_assets(self) -> List[Dict[str, Any]]:
+        """Get copies of the last successful listing flagged as stale, or [] if there is none."""
+        if TaprootAssetManager._last_good is None:
+            return []
+        as_of, assets = TaprootAssetManager._last_good
+        return [{**asset, "stale": True, "as_of": as_of} for asset in assets]
 
     async def list_channel_assets(self, force_refresh=False) -> List[Dict[str, Any]]:
         """
@@ -198,7 +220,7 @@ class TaprootAssetManager:
         Returns:
             A list of dictionaries containing channel and asset information.
         """
-        logger.info(f"CHANNEL DEBUG: list_channel_assets called with force_refresh={force_refresh}")
+        log_event(ASSET, "debug", "list_channel_assets", sample="list_channel_assets", force_refresh=force_refresh)
         # Check cache first if not forcing refresh
         if not force_refresh:
             cached_assets = cache.get(self.CHANNEL_ASSET_CACHE_KEY)
@@ -207,15 +229,18 @@ class TaprootAssetManager:
         try:
             # Get channels from LND
             request = lightning_pb2.ListChannelsRequest()
-            response = await self.node.ln_stub.ListChannels(request, timeout=10)
+            response = await self.node.ln_stub.ListChannels(request)
 
-            logger.info(f"DEBUG: ListChannels returned {len(response.channels)} channels")
+            log_event(ASSET, "debug", "ListChannels returned", sample="list_channels", channels=len(response.channels))
 
             channel_assets = []
 
             # Process each channel
             for i, channel in enumerate(response.channels):
-                logger.info(f"DEBUG: Channel {i}: has_custom_data={hasattr(channel, 'custom_channel_data')}, data_length={len(channel.custom_channel_data) if hasattr(channel, 'custom_channel_data') and channel.custom_channel_data else 0}")
+                log_event(
+                    ASSET, "debug", "channel custom data", sample="channel_custom_data",
+                    channel=i, channel_point=lambda: channel.channel_point, data_length=lambda: len(getattr(channel, 'custom_channel_data', b'') or b'')
+                )
                 # Skip channels without custom_channel_data
                 if not hasattr(channel, 'custom_channel_data') or not channel.custom_channel_data:
                     continue
@@ -224,7 +249,10 @@ class TaprootAssetManager:
                     # Parse JSON data
                     asset_data = json.loads(channel.custom_channel_data.decode('utf-8'))
 
-                    logger.info(f"DEBUG: Channel {i} asset_data keys: {list(asset_data.keys())}")
+                    log_event(
+                        ASSET, "debug", "channel asset data", sample="channel_asset_data",
+                        channel=i, channel_point=lambda: channel.channel_point, keys=lambda: list(asset_data.keys())
+                    )
 
                     # Handle new v0.15.0 format with funding_assets
                     if "funding_assets" in asset_data:
@@ -318,6 +346,9 @@ class TaprootAssetManager:
             # Store in cache before returning
             cache.set(self.CHANNEL_ASSET_CACHE_KEY, channel_assets, expiry=self.ASSET_CACHE_EXPIRY)
             return channel_assets
+        except (grpc.aio.AioRpcError, BackendUnavailableError):
+            # lnd failing isn't "no channels"; let list_assets fall back to its last listing
+            raise
         except Exception as e:
             logger.debug(f"Error listing channel assets: {e}")
             return []
@@ -16,22 +16,22 @@ from .taproot_adapter import (
     lightning_pb2,
     invoices_pb2
 )
+from ..services.payment_metadata_store import PaymentMetadataStore
 
 class TaprootInvoiceManager:
     """Handles Taproot Asset invoice creation and monitoring."""
 
     def __init__(self, node):
         self.node = node
-        self._script_key_to_payment_hash = {}
 
-    def _store_script_key_mapping(self, script_key: str, payment_hash: str):
+    async def _store_script_key_mapping(self, script_key: str, payment_hash: str):
         """Store mapping from script key to payment hash."""
-        self._script_key_to_payment_hash[script_key] = payment_hash
+        await PaymentMetadataStore.set_script_key(payment_hash, script_key)
         logger.debug(f"Stored script key mapping: {script_key} -> {payment_hash}")
 
-    def _get_payment_hash_from_script_key(self, script_key: str) -> Optional[str]:
+    async def _get_payment_hash_from_script_key(self, script_key: str) -> Optional[str]:
         """Retrieve payment hash from script key mapping."""
-        payment_hash = self._script_key_to_payment_hash.get(script_key)
+        payment_hash = await PaymentMetadataStore.get_payment_hash_by_script_key(script_key)
         if not payment_hash:
             logger.debug(f"No payment hash found for script key {script_key}")
         return payment_hash
@@ -79,7 +79,7 @@ class TaprootInvoiceManager:
 
             try:
                 # Submit the buy order
-                buy_order_response = await rfq_stub.AddAssetBuyOrder(buy_order_request, timeout=5)
+                buy_order_response = await rfq_stub.AddAssetBuyOrder(buy_order_request)
             except grpc.aio.AioRpcError as e:
                 logger.error(f"gRPC error in AddAssetBuyOrder: {e.code()}: {e.details()}")
                 raise Exception(f"Failed to create buy order: {e.details()}")
@@ -107,7 +107,7 @@ class TaprootInvoiceManager:
             logger.info(f"Generated payment_hash: {payment_hash_hex}")
 
             # Store the preimage with expiry for settlement
-            self.node._store_preimage(payment_hash_hex, preimage_hex)
+            await self.node._store_preimage(payment_hash_hex, preimage_hex)
 
             # Create the invoice request
             request = tapchannel_pb2.AddInvoiceRequest(
@@ -140,7 +140,7 @@ class TaprootInvoiceManager:
 
             try:
                 # Send invoice request to daemon
-                response = await self.node.tapchannel_stub.AddInvoice(request, timeout=5)
+                response = await self.node.tapchannel_stub.AddInvoice(request)
             except grpc.aio.AioRpcError as e:
                 logger.error(f"gRPC error in AddInvoice: {e.code()}: {e.details()}")
                 raise Exception(f"Failed to add invoice: {e.details()}")
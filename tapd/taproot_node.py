@@ -14,7 +14,6 @@ from lnbits.nodes.base import (
     NodeChannel, NodePeerInfo, NodeInfoResponse, NodeInvoice, 
     NodePayment, NodeInvoiceFilters, NodePaymentsFilters, ChannelPoint
 )
-from lnbits.utils.cache import cache
 
 # Import the adapter module for Taproot Asset gRPC interfaces
 from .taproot_adapter import (
@@ -30,14 +29,17 @@ from .taproot_adapter import (
     create_invoices_client
 )
 
+from .interceptors import client_interceptors
+
 # Import the manager modules
 from .taproot_assets import TaprootAssetManager
 from .taproot_invoices import TaprootInvoiceManager
 from .taproot_payments import TaprootPaymentManager
 from .taproot_transfers import TaprootTransferManager
 
-# Import settlement service
+# Import settlement service and payment metadata store
 from ..services.settlement_service import SettlementService
+from ..services.payment_metadata_store import PaymentMetadataStore
 
 # Import logging utilities
 from ..logging_utils import (
@@ -51,16 +53,12 @@ class TaprootAssetsNodeExtension(Node):
     Implementation of Taproot Assets node functionality for the extension.
     This mirrors the core TaprootAssetsNode class.
     """
-    # Cache expiry times in seconds
-    PREIMAGE_CACHE_EXPIRY = 86400  # 24 hours
-    ASSET_ID_CACHE_EXPIRY = 86400  # 24 hours
-
-    def _store_preimage(self, payment_hash: str, preimage: str):
+    async def _store_preimage(self, payment_hash: str, preimage: str):
         """Store a preimage for a given payment hash."""
-        cache.set(f"taproot:preimage:{payment_hash}", preimage, expiry=self.PREIMAGE_CACHE_EXPIRY)
+        await PaymentMetadataStore.set_preimage(payment_hash, preimage)
         log_debug(NODE, f"Stored preimage for payment hash: {payment_hash[:8]}...")
 
-    def _store_asset_id(self, payment_hash: str, asset_id: str):
+    async def _store_asset_id(self, payment_hash: str, asset_id: str):
         """
         Store an asset_id for a given payment hash.
         
@@ -68,10 +66,10 @@ class TaprootAssetsNodeExtension(Node):
             payment_hash: The payment hash
             asset_id: The asset_id corresponding to the payment hash
         """
-        cache.set(f"taproot:asset_id:{payment_hash}", asset_id, expiry=self.ASSET_ID_CACHE_EXPIRY)
+        await PaymentMetadataStore.set_asset_id(payment_hash, asset_id)
         log_debug(NODE, f"Stored asset_id {asset_id[:8]}... for payment hash: {payment_hash[:8]}...")
 
-    def _get_asset_id(self, payment_hash: str) -> Optional[str]:
+    async def _get_asset_id(self, payment_hash: str) -> Optional[str]:
         """
         Retrieve an asset_id for a given payment hash.
         
@@ -81,16 +79,16 @@ class TaprootAssetsNodeExtension(Node):
         Returns:
             str: The asset_id if found, None otherwise
         """
-        asset_id = cache.get(f"taproot:asset_id:{payment_hash}")
+        asset_id = await PaymentMetadataStore.get_asset_id(payment_hash)
         if asset_id:
             log_debug(NODE, f"Found asset_id {asset_id[:8]}... for payment hash: {payment_hash[:8]}...")
         else:
             log_debug(NODE, f"No asset_id found for payment hash: {payment_hash[:8]}...")
         return asset_id
 
-    def _get_preimage(self, payment_hash: str) -> Optional[str]:
+    async def _get_preimage(self, payment_hash: str) -> Optional[str]:
         """Retrieve a preimage for a given payment hash."""
-        preimage = cache.get(f"taproot:preimage:{payment_hash}")
+        preimage = await PaymentMetadataStore.get_preimage(payment_hash)
         if preimage:
             log_debug(NODE, f"Found preimage for payment hash: {payment_hash[:8]}...")
         else:
@@ -162,17 +160,23 @@ class TaprootAssetsNodeExtension(Node):
 
         # Create gRPC channels
         # Create gRPC channels
-        self.channel = grpc.aio.secure_channel(self.host, self.combined_creds)
+        self.channel = grpc.aio.secure_channel(
+            self.host, self.combined_creds, interceptors=client_interceptors()
+        )
         
         self.stub = create_taprootassets_client(self.channel)
 
         # Create Lightning gRPC channel
-        self.ln_channel = grpc.aio.secure_channel(self.host, self.ln_combined_creds)
+        self.ln_channel = grpc.aio.secure_channel(
+            self.host, self.ln_combined_creds, interceptors=client_interceptors()
+        )
         self.ln_stub = create_lightning_client(self.ln_channel)
         self.invoices_stub = create_invoices_client(self.ln_channel)
 
         # Create TaprootAssetChannels gRPC channel
-        self.tap_channel = grpc.aio.secure_channel(self.host, self.combined_creds)
+        self.tap_channel = grpc.aio.secure_channel(
+            self.host, self.combined_creds, interceptors=client_interceptors()
+        )
         self.tapchannel_stub = create_tapchannel_client(self.tap_channel)
 
         # Initialize managers
@@ -458,7 +462,7 @@ class TaprootAssetsNodeExtension(Node):
         peer_pubkey: Optional[str] = None
     ) -> Dict[str, Any]:
         """Create an invoice for a Taproot Asset transfer."""
-        with LogContext(NODE, f"creating asset invoice for {asset_id[:8]}...", log_level="info"):
+        with LogContext(NODE, f"creating asset invoice for {asset_id[:8]}...", log_level="info", asset_id=asset_id):
             return await self.invoice_manager.create_asset_invoice(
                 description, asset_id, asset_amount, expiry, peer_pubkey
             )
@@ -471,7 +475,7 @@ class TaprootAssetsNodeExtension(Node):
         peer_pubkey: Optional[str] = None
     ) -> Dict[str, Any]:
         """Pay a Taproot Asset invoice."""
-        with LogContext(NODE, "paying asset invoice", log_level="info"):
+        with LogContext(NODE, "paying asset invoice", log_level="info", asset_id=asset_id):
             return await self.payment_manager.pay_asset_invoice(
                 payment_request, fee_limit_sats, asset_id, peer_pubkey
             )
@@ -484,7 +488,7 @@ class TaprootAssetsNodeExtension(Node):
         asset_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """Update Taproot Assets after a payment has been made through the LNbits wallet."""
-        with LogContext(NODE, f"updating after payment {payment_hash[:8]}...", log_level="info"):
+        with LogContext(NODE, f"updating after payment {payment_hash[:8]}...", log_level="info", payment_hash=payment_hash):
             return await self.payment_manager.update_after_payment(
                 payment_request, payment_hash, fee_limit_sats, asset_id
             )
@@ -496,7 +500,7 @@ class TaprootAssetsNodeExtension(Node):
         This method delegates to the transfer_manager's implementation
         which includes direct settlement logic.
         """
-        with LogContext(NODE, f"monitoring invoice {payment_hash[:8]}...", log_level="debug"):
+        with LogContext(NODE, f"monitoring invoice {payment_hash[:8]}...", log_level="debug", payment_hash=payment_hash):
             return await self.transfer_manager.monitor_invoice(payment_hash)
 
     async def close(self):
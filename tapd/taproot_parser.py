@@ -13,6 +13,7 @@ from .taproot_adapter import (
     create_taprootassets_client,
     create_tapchannel_client
 )
+from .interceptors import client_interceptors
 
 class TaprootParserClient:
     """
@@ -98,7 +99,9 @@ class TaprootParserClient:
 
             log_debug(PARSER, f"Creating gRPC channels to {self.host}")
             # Create gRPC channels
-            self.channel = grpc.aio.secure_channel(self.host, self.combined_creds)
+            self.channel = grpc.aio.secure_channel(
+                self.host, self.combined_creds, interceptors=client_interceptors()
+            )
             self.stub = create_taprootassets_client(self.channel)
             
             # Create TaprootAssetChannels gRPC channel
@@ -1,7 +1,7 @@
 import asyncio
 import hashlib
 import time
-from typing import Optional, Tuple, Any, Dict, Set
+from typing import Optional, Tuple, Any, Dict, List, Set
 import grpc
 import grpc.aio
 from loguru import logger
@@ -11,15 +11,11 @@ from .taproot_adapter import (
     invoices_pb2
 )
 
-# Import database functions from crud re-exports
-from ..crud import (
-    get_invoice_by_payment_hash,
-    is_internal_payment,
-    is_self_payment
-)
-
-# Import Settlement Service
+# Import Settlement Service and invoice resolver
 from ..services.settlement_service import SettlementService
+from ..services.invoice_resolver import InvoiceResolver
+from ..services.payment_metadata_store import PaymentMetadataStore
+from ..models import InvoiceOwner
 from ..logging_utils import (
     log_debug, log_info, log_warning, log_error, 
     log_exception, TRANSFER, LogContext
@@ -34,6 +30,9 @@ class TaprootTransferManager:
     # Class variable for singleton instance
     _instance = None
     
+    # Running invoice monitor tasks keyed by payment hash
+    _monitors: Dict[str, asyncio.Task] = {}
+    
     @classmethod
     def get_instance(cls, node):
         """
@@ -66,31 +65,66 @@ class TaprootTransferManager:
 
     # Removed unused monitor_asset_transfers method that was not fully implemented
 
-    async def monitor_invoice(self, payment_hash: str):
+    async def resume_monitoring(self, invoices: List[InvoiceOwner]) -> int:
+        """
+        Resume monitoring for pending invoices after a restart.
+
+        Internal payments settle synchronously when they are made, so a
+        pending invoice can only still be paid over Lightning; each one is
+        watched with SubscribeSingleInvoice and settled for its own owner.
+        Metadata for all payment hashes is loaded with one bulk query first,
+        so the settlement checks made by each monitor are served from memory.
+
+        Args:
+            invoices: Ownership projections of the invoices to monitor
+
+        Returns:
+            int: Number of monitors started
+        """
+        invoices = [invoice for invoice in invoices if invoice.payment_hash not in self._monitors]
+        if not invoices:
+            return 0
+
+        await PaymentMetadataStore.prefetch(invoice.payment_hash for invoice in invoices)
+        for invoice in invoices:
+            asyncio.create_task(self.monitor_invoice(invoice.payment_hash, owner=invoice))
+
+        logger.info(f"Resumed monitoring for {len(invoices)} invoices")
+        return len(invoices)
+
+    async def monitor_invoice(self, payment_hash: str, owner: Optional[InvoiceOwner] = None):
         """
         Monitor a specific invoice for state changes.
+
+        Args:
+            payment_hash: The payment hash of the invoice
+            owner: Owner of a pending invoice being resumed; the invoice is
+                then only watched for Lightning payment and settled for this
+                owner instead of the node's wallet
         """
         logger.info(f"Monitoring invoice {payment_hash}")
+        
+        task = asyncio.current_task()
+        if task:
+            self._monitors[payment_hash] = task
 
         try:
-            # Get the invoice from database to determine payment type
-            invoice = await get_invoice_by_payment_hash(payment_hash)
+            user_id = None
+            wallet_id = None
+            if owner:
+                user_id = owner.user_id
+                wallet_id = owner.wallet_id
+            elif hasattr(self.node, 'wallet') and self.node.wallet:
+                user_id = self.node.wallet.user
+                wallet_id = self.node.wallet.id
             
-            # Determine if this is an internal payment
-            is_internal = await is_internal_payment(payment_hash)
+            # Look the invoice up once to determine payment type and ownership
+            classification = None if owner else await InvoiceResolver().classify(payment_hash, user_id)
             
             # For internal payments, handle settlement via SettlementService
-            if is_internal:
+            if classification and classification.is_internal:
                 # Check if it's a self-payment (same user) or just internal (different users)
-                is_self = False
-                user_id = None
-                wallet_id = None
-                
-                if hasattr(self.node, 'wallet') and self.node.wallet:
-                    user_id = self.node.wallet.user
-                    wallet_id = self.node.wallet.id
-                    if user_id:
-                        is_self = await is_self_payment(payment_hash, user_id)
+                is_self = classification.is_self
                 
                 if is_self:
                     logger.info(f"Self-payment detected for {payment_hash}, using SettlementService")
@@ -104,7 +138,8 @@ class TaprootTransferManager:
                     is_internal=True,
                     is_self_payment=is_self,
                     user_id=user_id,
-                    wallet_id=wallet_id
+                    wallet_id=wallet_id,
+                    invoice=classification.invoice
                 )
                 
                 if success:
@@ -122,6 +157,7 @@ class TaprootTransferManager:
             request = invoices_pb2.SubscribeSingleInvoiceRequest(r_hash=payment_hash_bytes)
 
             # Subscribe to invoice updates
+            settle_unknown = False
             async for invoice in self.node.invoices_stub.SubscribeSingleInvoice(request):
                 # Map state to human-readable form
                 state_map = {0: "OPEN", 1: "SETTLED", 2: "CANCELED", 3: "ACCEPTED"}
@@ -135,14 +171,7 @@ class TaprootTransferManager:
                     # Extract and store script key if available
                     script_key_hex = await self._extract_script_key_from_invoice(invoice)
                     if script_key_hex:
-                        self.node.invoice_manager._store_script_key_mapping(script_key_hex, payment_hash)
-                    
-                    # Get wallet info if available
-                    user_id = None
-                    wallet_id = None
-                    if hasattr(self.node, 'wallet') and self.node.wallet:
-                        user_id = self.node.wallet.user
-                        wallet_id = self.node.wallet.id
+                        await self.node.invoice_manager._store_script_key_mapping(script_key_hex, payment_hash)
                     
                     # Delegate to SettlementService for settlement
                     success, result = await SettlementService.settle_invoice(
@@ -156,6 +185,12 @@ class TaprootTransferManager:
                     
                     if success:
                         logger.info(f"Lightning payment successfully settled: {payment_hash}")
+                    elif result.get("settle_unknown"):
+                        # The settle may still be applied; keep watching and
+                        # record it if the invoice turns SETTLED
+                        logger.warning(f"Settlement of {payment_hash} timed out - waiting for the invoice state")
+                        settle_unknown = True
+                        continue
                     else:
                         from ..error_utils import handle_error
                         error_msg = result.get('error', 'Unknown error')
@@ -165,7 +200,23 @@ class TaprootTransferManager:
                     
                 # Process already SETTLED state (1)
                 elif invoice.state == 1:  # SETTLED state
-                    logger.info(f"Invoice {payment_hash} is already SETTLED")
+                    if owner or settle_unknown:
+                        # Settled on the node while still pending here, e.g. its credit
+                        # failed and was rolled back; the settlement is recorded now
+                        logger.info(f"Invoice {payment_hash} is SETTLED on the node but pending - recording settlement")
+                        success, result = await SettlementService.settle_invoice(
+                            payment_hash=payment_hash,
+                            node=self.node,
+                            is_internal=False,
+                            is_self_payment=False,
+                            user_id=user_id,
+                            wallet_id=wallet_id
+                        )
+                        if not success:
+                            from ..error_utils import handle_error
+                            handle_error("settle_lightning_payment", Exception(result.get('error', 'Unknown error')), payment_hash)
+                    else:
+                        logger.info(f"Invoice {payment_hash} is already SETTLED")
                     break
                     
                 # Process CANCELED state (2)
@@ -173,9 +224,31 @@ class TaprootTransferManager:
                     logger.warning(f"Invoice {payment_hash} was CANCELED")
                     break
 
+        except asyncio.CancelledError:
+            logger.info(f"Stopped monitoring invoice {payment_hash}")
         except Exception as e:
             from ..error_utils import handle_error
             error_result = handle_error("monitor_invoice", e, payment_hash)
+        finally:
+            if task and self._monitors.get(payment_hash) is task:
+                del self._monitors[payment_hash]
+
+    @classmethod
+    def cancel_monitor(cls, payment_hash: str) -> bool:
+        """
+        Stop monitoring an invoice.
+        
+        Args:
+            payment_hash: The payment hash of the monitored invoice
+            
+        Returns:
+            bool: True if a running monitor was cancelled
+        """
+        task = cls._monitors.pop(payment_hash, None)
+        if not task or task.done():
+            return False
+        task.cancel()
+        return True
 
     async def _extract_script_key_from_invoice(self, invoice) -> Optional[str]:
         """Extract script key from invoice HTLCs."""
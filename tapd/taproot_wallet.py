@@ -237,7 +237,7 @@ class TaprootWalletExtension(Wallet):
             asset_id_to_store = payment_result.get("asset_id", asset_id)
             
             if payment_hash and asset_id_to_store:
-                self.node._store_asset_id(payment_hash, asset_id_to_store)
+                await self.node._store_asset_id(payment_hash, asset_id_to_store)
                 
             return payment_result
 
@@ -40,6 +40,30 @@ class TaprootSettings:
         default_fee = config_values.get("TAPD_DEFAULT_SAT_FEE") or os.environ.get("TAPD_DEFAULT_SAT_FEE", "1")
         self.default_sat_fee = int(default_fee)
         
+        # Read replica settings (Postgres only)
+        replica_urls = config_values.get("TAPD_DB_REPLICA_URLS") or os.environ.get("TAPD_DB_REPLICA_URLS", "")
+        self.db_replica_urls = [url.strip() for url in replica_urls.split(",") if url.strip()]
+        sticky_seconds = (
+            config_values.get("TAPD_DB_REPLICA_STICKY_SECONDS") or
+            os.environ.get("TAPD_DB_REPLICA_STICKY_SECONDS", "5")
+        )
+        self.db_replica_sticky_seconds = float(sticky_seconds)
+        
+        # Logging settings: per-component minimum levels, e.g. "PAYMENT=info,WS=warning"
+        self.log_levels = config_values.get("TAPD_LOG_LEVELS") or os.environ.get("TAPD_LOG_LEVELS", "")
+        sample_seconds = (
+            config_values.get("TAPD_LOG_SAMPLE_SECONDS") or
+            os.environ.get("TAPD_LOG_SAMPLE_SECONDS", "10")
+        )
+        self.log_sample_seconds = float(sample_seconds)
+        
+        # Tracing settings: spans are exported as JSON lines and/or to an OTLP/HTTP collector
+        self.trace_file = config_values.get("TAPD_TRACE_FILE") or os.environ.get("TAPD_TRACE_FILE") or None
+        self.trace_otlp_url = (
+            config_values.get("TAPD_TRACE_OTLP_URL") or
+            os.environ.get("TAPD_TRACE_OTLP_URL") or None
+        )
+        
         # Only log config details if we have standalone configuration
         if self.has_standalone_config:
             logger.info("Taproot Assets settings loaded for standalone tapd mode")
@@ -0,0 +1,126 @@
+"""
+Shared fixtures for the Taproot Assets extension tests.
+
+The extension is imported from this checkout as the taproot_assets package.
+Its database is bound when it is imported, so LNbits is pointed at a
+throwaway SQLite folder first, or at TAPROOT_ASSETS_TEST_DATABASE_URL when
+that is set. Tests marked postgres only run in the latter case. Tests of
+modules that don't need LNbits load them with the extension fixture, and
+run without it.
+"""
+import asyncio
+import importlib.util
+import os
+import sys
+import tempfile
+import types
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+POSTGRES_URL = os.environ.get("TAPROOT_ASSETS_TEST_DATABASE_URL")
+
+os.environ.setdefault("LNBITS_DATA_FOLDER", tempfile.mkdtemp(prefix="taproot_assets_tests_"))
+if POSTGRES_URL:
+    os.environ["LNBITS_DATABASE_URL"] = POSTGRES_URL
+
+
+class _PlainCheckout:
+    """Collects the checkout as a plain directory instead of a package."""
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_collect_directory(self, path, parent):
+        if path == ROOT:
+            return pytest.Dir.from_parent(parent, path=path)
+        return None
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "postgres: needs a Postgres database in TAPROOT_ASSETS_TEST_DATABASE_URL"
+    )
+    if importlib.util.find_spec("lnbits") is None:
+        # pytest imports a package's __init__.py before running the tests in
+        # it, and the checkout's needs LNbits
+        config.pluginmanager.register(_PlainCheckout())
+
+
+def pytest_collection_modifyitems(config, items):
+    # Skipped before setup, which would import the extension package
+    if importlib.util.find_spec("lnbits") is None:
+        skip_lnbits = pytest.mark.skip(reason="LNbits is not installed")
+        for item in items:
+            if "migrated_db" in getattr(item, "fixturenames", ()):
+                item.add_marker(skip_lnbits)
+        return
+
+    if POSTGRES_URL:
+        return
+    skip_postgres = pytest.mark.skip(reason="TAPROOT_ASSETS_TEST_DATABASE_URL is not set")
+    for item in items:
+        if "postgres" in item.keywords:
+            item.add_marker(skip_postgres)
+
+
+def _import_extension():
+    """Import this checkout as the taproot_assets package."""
+    if "taproot_assets" in sys.modules:
+        return sys.modules["taproot_assets"]
+    spec = importlib.util.spec_from_file_location(
+        "taproot_assets", ROOT / "__init__.py", submodule_search_locations=[str(ROOT)]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["taproot_assets"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def extension():
+    """
+    Import a module of this checkout by name, e.g. "tapd.interceptors".
+
+    Without LNbits the packages on the way are registered bare, so their
+    __init__.py files, which need LNbits, aren't run; the module's own
+    imports must be installed.
+    """
+    def import_module(name: str):
+        if importlib.util.find_spec("lnbits") is not None:
+            _import_extension()
+        else:
+            parts = name.split(".")[:-1]
+            for depth in range(len(parts) + 1):
+                package_name = ".".join(["taproot_assets", *parts[:depth]])
+                if package_name not in sys.modules:
+                    package = types.ModuleType(package_name)
+                    package.__path__ = [str(ROOT.joinpath(*parts[:depth]))]
+                    sys.modules[package_name] = package
+        return importlib.import_module(f"taproot_assets.{name}")
+
+    return import_module
+
+
+@pytest.fixture(scope="session")
+def run():
+    """Run a coroutine on one event loop shared by the whole session."""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def migrated_db(run):
+    """The extension database with all migrations applied."""
+    _import_extension()
+    from taproot_assets import migrations
+    from taproot_assets.db import db
+
+    async def migrate():
+        for name, migration in sorted(vars(migrations).items()):
+            if name.startswith("m0") and callable(migration):
+                async with db.connect() as conn:
+                    await migration(conn)
+
+    run(migrate())
+    return db
@@ -0,0 +1,221 @@
+"""
+Circuit breaker and retry checks for the gRPC client interceptors.
+
+Calls go through the interceptors with a fake continuation standing in for
+the channel, and a fake clock, so no tapd or lnd is needed.
+"""
+import pytest
+
+grpc = pytest.importorskip("grpc")
+pytest.importorskip("grpc.aio")
+pytest.importorskip("loguru")
+# error_utils, which defines BackendUnavailableError, imports fastapi
+pytest.importorskip("fastapi")
+
+
+class FakeClock:
+    """Stands in for the time module of the interceptors."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class FakeChannel:
+    """
+    Continuation that answers each call with the next outcome.
+
+    An outcome is a status code to fail with, or None to succeed. Each call
+    takes `seconds` on the fake clock.
+    """
+
+    def __init__(self, clock: FakeClock, outcomes=(), seconds: float = 0.0):
+        self.clock = clock
+        self.outcomes = list(outcomes)
+        self.seconds = seconds
+        self.calls = []
+
+    async def __call__(self, client_call_details, request):
+        self.calls.append(client_call_details)
+        self.clock.now += self.seconds
+        code = self.outcomes.pop(0) if self.outcomes else None
+        if code is not None:
+            raise grpc.aio.AioRpcError(code, grpc.aio.Metadata(), grpc.aio.Metadata(), details=code.name)
+        return _Done()
+
+
+class _Done:
+    """A finished call."""
+
+    def __await__(self):
+        return iter(())
+
+
+def _details(method: str, timeout=None):
+    return grpc.aio.ClientCallDetails(f"/{method}", timeout, None, None, None)
+
+
+@pytest.fixture
+def interceptors(extension, monkeypatch):
+    module = extension("tapd.interceptors")
+    monkeypatch.setattr(module.CircuitBreaker, "_breakers", {})
+    return module
+
+
+@pytest.fixture
+def clock(interceptors, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(interceptors, "time", clock)
+    return clock
+
+
+def _unary(interceptors, run, channel, method: str):
+    """Make one unary call through the breaker; returns the error raised, if any."""
+    interceptor = interceptors.CircuitBreakerUnaryUnaryInterceptor()
+    try:
+        run(interceptor.intercept_unary_unary(channel, _details(method), None))
+    except Exception as e:
+        return e
+    return None
+
+
+def _state(interceptors, backend: str) -> str:
+    return interceptors.CircuitBreaker.stats()[backend]["state"]
+
+
+def test_breaker_opens_and_recovers_after_probe(interceptors, clock, run, extension):
+    breaker = interceptors.CircuitBreaker
+    unavailable = extension("error_utils").BackendUnavailableError
+    channel = FakeChannel(clock, [grpc.StatusCode.UNAVAILABLE] * breaker.MIN_CALLS)
+
+    for _ in range(breaker.MIN_CALLS):
+        assert isinstance(_unary(interceptors, run, channel, "lnrpc.Lightning/ListChannels"), grpc.aio.AioRpcError)
+    assert _state(interceptors, "lnd") == "open"
+
+    # Fails fast without reaching lnd, for unary calls and streams
+    assert isinstance(_unary(interceptors, run, channel, "lnrpc.Lightning/ListChannels"), unavailable)
+    stream = interceptors.CircuitBreakerUnaryStreamInterceptor()
+    with pytest.raises(unavailable):
+        run(stream.intercept_unary_stream(channel, _details("lnrpc.Lightning/SubscribeChannelEvents"), None))
+    assert len(channel.calls) == breaker.MIN_CALLS
+
+    # Other backends are unaffected
+    assert _unary(interceptors, run, channel, "taprpc.TaprootAssets/ListAssets") is None
+
+    clock.now += breaker.OPEN_SECONDS
+    assert _state(interceptors, "lnd") == "half_open"
+    assert _unary(interceptors, run, channel, "lnrpc.Lightning/GetNodeInfo") is None
+    assert _state(interceptors, "lnd") == "closed"
+    assert _unary(interceptors, run, channel, "lnrpc.Lightning/ListChannels") is None
+
+
+def test_failed_probe_keeps_breaker_open(interceptors, clock, run, extension):
+    breaker = interceptors.CircuitBreaker
+    unavailable = extension("error_utils").BackendUnavailableError
+    channel = FakeChannel(clock, [grpc.StatusCode.UNAVAILABLE] * (breaker.MIN_CALLS + 1))
+    for _ in range(breaker.MIN_CALLS):
+        _unary(interceptors, run, channel, "taprpc.TaprootAssets/ListAssets")
+
+    clock.now += breaker.OPEN_SECONDS
+    assert isinstance(_unary(interceptors, run, channel, "taprpc.TaprootAssets/ListAssets"), grpc.aio.AioRpcError)
+    assert _state(interceptors, "tapd") == "open"
+    assert isinstance(_unary(interceptors, run, channel, "taprpc.TaprootAssets/ListAssets"), unavailable)
+
+
+def test_errors_from_a_healthy_backend_dont_open_breaker(interceptors, clock, run):
+    channel = FakeChannel(clock, [grpc.StatusCode.NOT_FOUND] * 10)
+    for _ in range(10):
+        _unary(interceptors, run, channel, "invoicesrpc.Invoices/LookupInvoiceV2")
+    assert _state(interceptors, "lnd") == "closed"
+
+
+def test_exempt_methods_never_trip_or_fail_fast(interceptors, clock, run):
+    breaker = interceptors.CircuitBreaker
+    channel = FakeChannel(clock, [grpc.StatusCode.UNAVAILABLE] * 10, seconds=breaker.SLOW_CALL_SECONDS + 1)
+    for _ in range(10):
+        _unary(interceptors, run, channel, "invoicesrpc.Invoices/SettleInvoice")
+    assert "lnd" not in breaker.stats()
+
+    # Open the circuit with other calls; exempt calls still go through
+    channel = FakeChannel(clock, [grpc.StatusCode.UNAVAILABLE] * breaker.MIN_CALLS)
+    for _ in range(breaker.MIN_CALLS):
+        _unary(interceptors, run, channel, "lnrpc.Lightning/ListChannels")
+    assert _state(interceptors, "lnd") == "open"
+
+    assert _unary(interceptors, run, channel, "invoicesrpc.Invoices/SettleInvoice") is None
+    stream = interceptors.CircuitBreakerUnaryStreamInterceptor()
+    for method in ("invoicesrpc.Invoices/SubscribeSingleInvoice", "tapchannelrpc.TaprootAssetChannels/SendPayment"):
+        run(stream.intercept_unary_stream(channel, _details(method), None))
+    assert len(channel.calls) == breaker.MIN_CALLS + 3
+
+
+def test_slow_calls_count_only_for_methods_with_latency_target(interceptors, clock, run):
+    breaker = interceptors.CircuitBreaker
+    channel = FakeChannel(clock, seconds=breaker.SLOW_CALL_SECONDS + 1)
+
+    for _ in range(breaker.MIN_CALLS):
+        assert _unary(interceptors, run, channel, "tapchannelrpc.TaprootAssetChannels/AddInvoice") is None
+    assert breaker.stats()["tapd"] == {"state": "closed", "failures": 0, "calls": breaker.MIN_CALLS}
+
+    # Streams last as long as their subject and are never recorded
+    stream = interceptors.CircuitBreakerUnaryStreamInterceptor()
+    run(stream.intercept_unary_stream(channel, _details("taprpc.TaprootAssets/SubscribeReceiveEvents"), None))
+    assert breaker.stats()["tapd"]["calls"] == breaker.MIN_CALLS
+
+    for _ in range(breaker.MIN_CALLS):
+        assert _unary(interceptors, run, channel, "taprpc.TaprootAssets/ListAssets") is None
+    assert _state(interceptors, "tapd") == "open"
+
+
+def _policy_call(interceptors, run, channel, method: str, timeout=None):
+    interceptor = interceptors.PolicyUnaryUnaryInterceptor()
+    return run(interceptor.intercept_unary_unary(channel, _details(method, timeout), None))
+
+
+@pytest.fixture
+def no_backoff(interceptors, monkeypatch):
+    monkeypatch.setattr(interceptors.RpcPolicy, "BACKOFF_SECONDS", 0.0)
+
+
+def test_idempotent_reads_are_retried(interceptors, run, no_backoff):
+    channel = FakeChannel(FakeClock(), [grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.RESOURCE_EXHAUSTED])
+    _policy_call(interceptors, run, channel, "lnrpc.Lightning/ListChannels")
+    assert len(channel.calls) == 3
+    assert all(details.timeout is not None for details in channel.calls)
+
+
+def test_retries_stop_after_max_attempts(interceptors, run, no_backoff):
+    attempts = interceptors.RpcPolicy.MAX_ATTEMPTS
+    channel = FakeChannel(FakeClock(), [grpc.StatusCode.UNAVAILABLE] * (attempts + 1))
+    with pytest.raises(grpc.aio.AioRpcError):
+        _policy_call(interceptors, run, channel, "taprpc.TaprootAssets/ListAssets")
+    assert len(channel.calls) == attempts
+
+
+@pytest.mark.parametrize("method, code", [
+    # Not idempotent
+    ("tapchannelrpc.TaprootAssetChannels/AddInvoice", grpc.StatusCode.UNAVAILABLE),
+    ("invoicesrpc.Invoices/SettleInvoice", grpc.StatusCode.UNAVAILABLE),
+    # Not a transient status
+    ("lnrpc.Lightning/ListChannels", grpc.StatusCode.INVALID_ARGUMENT),
+    ("lnrpc.Lightning/ListChannels", grpc.StatusCode.DEADLINE_EXCEEDED),
+])
+def test_calls_not_retried(interceptors, run, no_backoff, method, code):
+    channel = FakeChannel(FakeClock(), [code])
+    with pytest.raises(grpc.aio.AioRpcError):
+        _policy_call(interceptors, run, channel, method)
+    assert len(channel.calls) == 1
+
+
+def test_deadlines(interceptors, run):
+    channel = FakeChannel(FakeClock())
+    _policy_call(interceptors, run, channel, "tapchannelrpc.TaprootAssetChannels/AddInvoice")
+    _policy_call(interceptors, run, channel, "tapchannelrpc.TaprootAssetChannels/AddInvoice", timeout=1.0)
+    assert [details.timeout for details in channel.calls] == [interceptors.RpcPolicy.DEADLINES["AddInvoice"], 1.0]
+
+    stream = interceptors.PolicyUnaryStreamInterceptor()
+    for method in ("tapchannelrpc.TaprootAssetChannels/SendPayment", "invoicesrpc.Invoices/SubscribeSingleInvoice"):
+        run(stream.intercept_unary_stream(channel, _details(method), None))
+    assert [details.timeout for details in channel.calls[2:]] == [None, None]
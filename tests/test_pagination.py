@@ -0,0 +1,65 @@
+"""
+Keyset pagination cursor checks.
+
+Cursors come back from clients, so anything that isn't a cursor this
+extension produced must be rejected as a bad request rather than fail the
+query.
+"""
+import base64
+from datetime import datetime, timezone
+
+import pytest
+
+
+@pytest.fixture
+def cursors(extension):
+    return extension("crud.cursors")
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("created_at, record_id", [
+    (datetime(2024, 5, 1, 12, 30, 15, 123456), "abc123"),
+    (datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc), "abc123"),
+    # IDs are opaque and may contain the separator
+    (datetime(2024, 5, 1), "a|b|c"),
+])
+def test_cursor_round_trip(cursors, created_at, record_id):
+    cursor = cursors.encode_cursor(created_at, record_id)
+    assert "=" not in cursor
+    assert base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    assert cursors.decode_cursor(cursor) == (created_at, record_id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not a cursor",
+    "!!!!",
+    "é",
+    # Valid base64 that isn't a cursor
+    _b64(b"no separator"),
+    _b64(b"not a date|abc"),
+    _b64(b"2024-05-01T12:30:00|"),
+    _b64(b"\xff\xfe|abc"),
+    # A valid cursor with a character the decoder would otherwise skip
+    _b64(b"2024-05-01T12:30:00|abc")[:4] + "*" + _b64(b"2024-05-01T12:30:00|abc")[4:],
+])
+def test_malformed_cursor_raises_value_error(cursors, cursor):
+    with pytest.raises(ValueError):
+        cursors.decode_cursor(cursor)
+
+
+def test_malformed_cursor_is_bad_request(extension, run):
+    pytest.importorskip("lnbits")
+    from fastapi import HTTPException
+
+    services = {
+        "invoices": extension("services.invoice_service").InvoiceService.get_user_invoices,
+        "payments": extension("services.payment_service").PaymentService.get_user_payments,
+    }
+    for name, list_page in services.items():
+        with pytest.raises(HTTPException) as error:
+            run(list_page("user", limit=10, cursor=_b64(b"not a date|abc")))
+        assert error.value.status_code == 400, name
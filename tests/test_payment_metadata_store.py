@@ -0,0 +1,51 @@
+"""
+Concurrency checks for the payment metadata store's memory tier.
+"""
+import asyncio
+
+import pytest
+
+PAYMENT_HASH = "ab" * 32
+
+
+@pytest.fixture
+def store_module(extension, monkeypatch):
+    pytest.importorskip("lnbits")
+    module = extension("services.payment_metadata_store")
+    monkeypatch.setattr(module.PaymentMetadataStore, "_entries", module.OrderedDict())
+    monkeypatch.setattr(module.PaymentMetadataStore, "_script_keys", module.OrderedDict())
+
+    async def upsert_payment_metadata(payment_hash, conn=None, **fields):
+        return None
+
+    monkeypatch.setattr(module, "upsert_payment_metadata", upsert_payment_metadata)
+    return module
+
+
+def test_concurrent_loads_keep_the_first_entry(store_module, monkeypatch, run):
+    store = store_module.PaymentMetadataStore
+
+    async def scenario():
+        release_slow_read = asyncio.Event()
+        reads = 0
+
+        async def get_payment_metadata(payment_hash, conn=None):
+            nonlocal reads
+            reads += 1
+            if reads == 1:
+                # The first read finishes after the second one stored a preimage
+                await release_slow_read.wait()
+            return None
+
+        monkeypatch.setattr(store_module, "get_payment_metadata", get_payment_metadata)
+
+        slow_load = asyncio.ensure_future(store.get_preimage(PAYMENT_HASH))
+        await asyncio.sleep(0)
+        await store.set_preimage(PAYMENT_HASH, "cd" * 32)
+        release_slow_read.set()
+
+        # The slow read found no row, but must not replace the newer entry
+        await slow_load
+        return await store.get_preimage(PAYMENT_HASH)
+
+    assert run(scenario()) == "cd" * 32
@@ -0,0 +1,149 @@
+"""
+Query plan checks for the hot queries.
+
+Each query run on every request or settlement is EXPLAINed against the
+migrated schema and must be served by the index named for it, so dropping
+an index or rewriting a query without a matching one fails here. Keep
+HOT_QUERIES in step with crud/* and TransactionService.
+"""
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import pytest
+
+PAGE = "ORDER BY created_at DESC, id DESC LIMIT :limit"
+
+# Either index serves the pending-invoice scans; SQLite prefers the status index without statistics
+PENDING_INVOICE_INDEXES = ("invoices_pending_expires_at_idx", "invoices_status_idx")
+
+# name: (query with {table} placeholders, parameters, accepted indexes or None for any index)
+HOT_QUERIES = {
+    "invoice_by_payment_hash": (
+        "SELECT * FROM {invoices} WHERE payment_hash = :payment_hash",
+        {"payment_hash": "00"},
+        ("invoices_payment_hash_unique_idx",),
+    ),
+    "invoices_page": (
+        f"SELECT * FROM {{invoices}} WHERE user_id = :user_id {PAGE}",
+        {"user_id": "user", "limit": 101},
+        ("invoices_user_created_at_id_idx",),
+    ),
+    "expired_pending_invoices": (
+        """
+        SELECT * FROM {invoices}
+        WHERE status = 'pending' AND expires_at IS NOT NULL AND expires_at < :now
+        ORDER BY expires_at LIMIT :limit
+        """,
+        {"now": datetime.now(), "limit": 200},
+        PENDING_INVOICE_INDEXES,
+    ),
+    "pending_invoice_owners": (
+        """
+        SELECT id, payment_hash, user_id, wallet_id FROM {invoices}
+        WHERE status = 'pending' AND (expires_at IS NULL OR expires_at >= :now)
+        ORDER BY created_at LIMIT :limit
+        """,
+        {"now": datetime.now(), "limit": 1000},
+        PENDING_INVOICE_INDEXES,
+    ),
+    "payment_by_payment_hash": (
+        "SELECT * FROM {payments} WHERE payment_hash = :payment_hash",
+        {"payment_hash": "00"},
+        ("payments_payment_hash_idx",),
+    ),
+    "payments_page": (
+        f"SELECT * FROM {{payments}} WHERE user_id = :user_id {PAGE}",
+        {"user_id": "user", "limit": 101},
+        ("payments_user_created_at_id_idx",),
+    ),
+    "wallet_transactions_page": (
+        f"SELECT * FROM {{transactions}} WHERE wallet_id = :wallet_id {PAGE}",
+        {"wallet_id": "wallet", "limit": 101},
+        ("asset_transactions_wallet_created_at_id_idx",),
+    ),
+    "wallet_asset_transactions_page": (
+        f"SELECT * FROM {{transactions}} WHERE wallet_id = :wallet_id AND asset_id = :asset_id {PAGE}",
+        {"wallet_id": "wallet", "asset_id": "asset", "limit": 101},
+        ("asset_transactions_wallet_asset_created_at_id_idx",),
+    ),
+    "asset_balance": (
+        "SELECT * FROM {balances} WHERE wallet_id = :wallet_id AND asset_id = :asset_id",
+        {"wallet_id": "wallet", "asset_id": "asset"},
+        None,
+    ),
+    "wallet_asset_balances": (
+        "SELECT * FROM {balances} WHERE wallet_id = :wallet_id ORDER BY updated_at DESC",
+        {"wallet_id": "wallet"},
+        ("asset_balances_wallet_updated_at_idx",),
+    ),
+    "user_assets": (
+        "SELECT * FROM {assets} WHERE user_id = :user_id ORDER BY created_at DESC LIMIT :limit",
+        {"user_id": "user", "limit": 100},
+        ("assets_user_created_at_idx",),
+    ),
+    "metadata_by_payment_hash": (
+        "SELECT * FROM {metadata} WHERE payment_hash = :payment_hash",
+        {"payment_hash": "00"},
+        None,
+    ),
+    "metadata_by_script_key": (
+        "SELECT * FROM {metadata} WHERE script_key = :script_key",
+        {"script_key": "00"},
+        ("payment_metadata_script_key_idx",),
+    ),
+}
+
+
+def _query(name: str) -> str:
+    from taproot_assets.db import get_table_name
+
+    return HOT_QUERIES[name][0].format(
+        invoices=get_table_name("invoices"),
+        payments=get_table_name("payments"),
+        transactions=get_table_name("asset_transactions"),
+        balances=get_table_name("asset_balances"),
+        assets=get_table_name("assets"),
+        metadata=get_table_name("payment_metadata"),
+    )
+
+
+async def _explain(db, name: str, disable_seqscan: bool = False) -> List[str]:
+    """The plan lines for a hot query."""
+    explain = "EXPLAIN QUERY PLAN" if db.type == "SQLITE" else "EXPLAIN"
+    async with db.connect() as conn:
+        if disable_seqscan:
+            # Small test tables would otherwise hide a missing index
+            await conn.execute("SET LOCAL enable_seqscan = off")
+        rows = await conn.fetchall(f"{explain} {_query(name)}", HOT_QUERIES[name][1])
+    # The plan text is the last column on both SQLite ("detail") and Postgres ("QUERY PLAN")
+    return [str(list(dict(row).values())[-1]).strip() for row in rows]
+
+
+def _assert_uses_index(plan: List[str], full_scans: List[str], expected: Optional[Tuple[str, ...]]) -> None:
+    assert not full_scans, f"full table scan: {'; '.join(plan)}"
+    if expected:
+        assert any(index in line for line in plan for index in expected), (
+            f"none of {', '.join(expected)} used: {'; '.join(plan)}"
+        )
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_sqlite_hot_query_uses_index(name, migrated_db, run):
+    if migrated_db.type != "SQLITE":
+        pytest.skip("database is not SQLite")
+
+    plan = run(_explain(migrated_db, name))
+    # "SEARCH t USING INDEX ..." is an index lookup, "SCAN t" reads every row
+    full_scans = [line for line in plan if line.startswith("SCAN ") and "INDEX" not in line]
+    _assert_uses_index(plan, full_scans, HOT_QUERIES[name][2])
+
+
+@pytest.mark.postgres
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_postgres_hot_query_uses_index(name, migrated_db, run):
+    if migrated_db.type == "SQLITE":
+        pytest.skip("database is not Postgres")
+
+    plan = run(_explain(migrated_db, name, disable_seqscan=True))
+    full_scans = [line for line in plan if "Seq Scan" in line]
+    _assert_uses_index(plan, full_scans, HOT_QUERIES[name][2])
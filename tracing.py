@@ -0,0 +1,288 @@
+"""
+Tracing utilities for Taproot Assets extension.
+Records timed spans linked through contextvars and exports them in-process
+as JSON lines or to a local OTLP/HTTP collector.
+"""
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from loguru import logger
+
+from .tapd_settings import taproot_settings
+
+# Arguments recorded as span attributes when a traced function takes them
+TRACED_ARGUMENTS = ("payment_hash", "asset_id", "wallet_id", "user_id", "invoice_id")
+
+# OTLP span kinds
+_SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "taproot_assets_span", default=None
+)
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = (
+        "name", "kind", "trace_id", "span_id", "parent_id", "attributes",
+        "start_ns", "_start_monotonic", "duration_ns", "error", "_token"
+    )
+
+    def __init__(self, name: str, kind: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self._start_monotonic = time.monotonic_ns()
+        self.duration_ns: Optional[int] = None
+        self.error: Optional[str] = None
+        self._token: Optional[contextvars.Token] = None
+
+    def set_attributes(self, **attributes: Any) -> None:
+        """Add attributes to the span."""
+        self.attributes.update(attributes)
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """Stop the span's clock and hand it to the exporter."""
+        if self.duration_ns is not None:
+            return
+        self.duration_ns = time.monotonic_ns() - self._start_monotonic
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        SpanExporter.record(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The span as a JSON-friendly dict."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start_ns / 1e9,
+            "duration_ms": round((self.duration_ns or 0) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """The span in OTLP/JSON form."""
+        otlp = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": _SPAN_KINDS.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.start_ns + (self.duration_ns or 0)),
+            "attributes": [
+                {"key": key, "value": {"stringValue": str(value)}}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            otlp["parentSpanId"] = self.parent_id
+        return otlp
+
+
+class SpanContext:
+    """
+    Context manager running a block as a span.
+
+    The span becomes the current span inside the block, so spans started
+    there, in the same task or in tasks created from it, become its
+    children. With tracing disabled this does nothing.
+    """
+
+    __slots__ = ("name", "kind", "attributes", "activate", "span")
+
+    def __init__(self, name: str, kind: str = "internal", activate: bool = True, **attributes: Any):
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.activate = activate
+        self.span: Optional[Span] = None
+
+    def __enter__(self) -> Optional[Span]:
+        if SpanExporter.enabled:
+            self.span = Span(self.name, self.kind, _current_span.get(), self.attributes)
+            if self.activate:
+                self.span._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        span = self.span
+        if span is None:
+            return False
+        if span._token is not None:
+            try:
+                _current_span.reset(span._token)
+            except ValueError:
+                # Exited in another context, e.g. from a generator; restore the parent there
+                _current_span.set(None)
+        # A closed generator isn't a failure of the operation it was running
+        span.finish(None if exc_type is GeneratorExit else exc_val)
+        return False
+
+
+def span(name: str, kind: str = "internal", **attributes: Any) -> SpanContext:
+    """
+    Start a span for a block of code.
+
+    Args:
+        name: Span name, e.g. "PaymentService.process_payment"
+        kind: "internal", "server" (an API request) or "client" (an RPC)
+        **attributes: Attributes such as payment_hash or asset_id
+
+    Returns:
+        SpanContext: Context manager yielding the span, or None if tracing is off
+    """
+    return SpanContext(name, kind, **attributes)
+
+
+def current_span() -> Optional[Span]:
+    """Get the span of the running block, if any."""
+    return _current_span.get()
+
+
+def set_span_attributes(**attributes: Any) -> None:
+    """
+    Add attributes to the current span, e.g. a payment hash once it is known.
+
+    Args:
+        **attributes: Attributes to add
+    """
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def traced(func: Optional[Callable] = None, *, name: Optional[str] = None, kind: str = "internal") -> Callable:
+    """
+    Decorator running each call of an async function as a span.
+
+    Arguments named in TRACED_ARGUMENTS are recorded as attributes. Use it
+    bare (@traced) or with options (@traced(name="...")).
+
+    Args:
+        func: The async function to trace
+        name: Span name; defaults to <module>.<qualified name>
+        kind: Span kind
+
+    Returns:
+        The wrapped function, or a decorator when called with options only
+    """
+    if func is None:
+        return functools.partial(traced, name=name, kind=kind)
+
+    span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+    signature = inspect.signature(func)
+    recorded = [argument for argument in TRACED_ARGUMENTS if argument in signature.parameters]
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if not SpanExporter.enabled:
+            return await func(*args, **kwargs)
+
+        attributes = {}
+        if recorded:
+            bound = signature.bind_partial(*args, **kwargs).arguments
+            attributes = {argument: bound[argument] for argument in recorded if bound.get(argument) is not None}
+        with SpanContext(span_name, kind, **attributes):
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+class SpanExporter:
+    """
+    In-process exporter for finished spans.
+
+    Spans are buffered and written in batches every FLUSH_SECONDS, as JSON
+    lines to TAPD_TRACE_FILE and/or as OTLP/JSON to TAPD_TRACE_OTLP_URL (a
+    local collector's /v1/traces endpoint). Tracing is enabled when either
+    is set. At most MAX_PENDING spans wait for export; older ones are
+    dropped beyond that, so a stalled collector can't grow memory.
+    """
+
+    # Seconds between exports
+    FLUSH_SECONDS = 1.0
+
+    # Maximum number of finished spans waiting for export
+    MAX_PENDING = 10000
+
+    # Seconds an OTLP export may take
+    EXPORT_TIMEOUT_SECONDS = 5.0
+
+    file_path: Optional[str] = taproot_settings.trace_file
+    otlp_url: Optional[str] = taproot_settings.trace_otlp_url
+    enabled = bool(file_path or otlp_url)
+
+    _pending: Deque[Span] = deque(maxlen=MAX_PENDING)
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def record(cls, finished: Span) -> None:
+        """Queue a finished span and make sure an export is scheduled."""
+        cls._pending.append(finished)
+        if cls._task is None:
+            try:
+                cls._task = asyncio.get_running_loop().create_task(cls._flush())
+            except RuntimeError:
+                # No running loop; the span goes out with the next export
+                pass
+
+    @classmethod
+    async def _flush(cls) -> None:
+        """Export pending spans until none are left."""
+        try:
+            while cls._pending:
+                await asyncio.sleep(cls.FLUSH_SECONDS)
+                batch = list(cls._pending)
+                cls._pending.clear()
+                try:
+                    await cls._export(batch)
+                except Exception as e:
+                    logger.warning(f"Failed to export {len(batch)} spans: {str(e)}")
+        finally:
+            cls._task = None
+
+    @classmethod
+    async def _export(cls, batch: List[Span]) -> None:
+        if cls.file_path:
+            lines = "".join(json.dumps(finished.to_dict(), default=str) + "\n" for finished in batch)
+            await asyncio.get_running_loop().run_in_executor(None, cls._append, lines)
+
+        if cls.otlp_url:
+            import httpx
+
+            payload = {
+                "resourceSpans": [{
+                    "resource": {"attributes": [
+                        {"key": "service.name", "value": {"stringValue": "taproot_assets"}}
+                    ]},
+                    "scopeSpans": [{
+                        "scope": {"name": "taproot_assets"},
+                        "spans": [finished.to_otlp() for finished in batch],
+                    }],
+                }]
+            }
+            async with httpx.AsyncClient(timeout=cls.EXPORT_TIMEOUT_SECONDS) as client:
+                response = await client.post(cls.otlp_url, json=payload)
+                response.raise_for_status()
+
+    @classmethod
+    def _append(cls, lines: str) -> None:
+        with open(cls.file_path, "a") as f:
+            f.write(lines)
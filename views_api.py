@@ -1,21 +1,31 @@
+import time
 from http import HTTPStatus
 from typing import Optional
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Header, Query, Response
+from fastapi.responses import StreamingResponse
 from lnbits.core.models import User, WalletTypeInfo
-from lnbits.decorators import check_user_exists, require_admin_key
+from lnbits.decorators import check_admin, check_user_exists, require_admin_key, require_invoice_key
 from pydantic import BaseModel
 
 from .error_utils import raise_http_exception, handle_api_error
 from .logging_utils import log_debug, log_info, log_warning, log_error, API
-from .models import TaprootInvoiceRequest, TaprootPaymentRequest, LnurlPayRequest, LnurlInfoRequest
+from .models import TaprootInvoiceRequest, TaprootPaymentRequest, TaprootBatchPaymentRequest, LnurlPayRequest, LnurlInfoRequest
 
 # Import services
 from .services.asset_service import AssetService
 from .services.invoice_service import InvoiceService
 from .services.payment_service import PaymentService
 from .services.lnurl_service import LnurlService
+from .services.payment_job_service import PaymentJobService
+from .services.batch_payment_service import BatchPaymentService
+from .services.export_service import ExportService
+from .services.balance_verification_service import BalanceVerificationService
+from .services.event_stream_service import EventStreamService
+from .services.asset_state_store import AssetStateStore
+from .crud import InvoiceCache, ChangeCounters
+from .tapd.interceptors import RpcMetrics, CircuitBreaker
 
 # The parent router in __init__.py already adds the "/taproot_assets" prefix
 # So we only need to add the API path here
@@ -29,6 +39,40 @@ def clean_lnurl(lnurl_string: str) -> str:
     return lnurl_string
 
 
+# Seconds a /listassets ETag stays valid; channel state changes in tapd
+# without a write here, so the ETag can't depend on counters alone
+ASSETS_ETAG_TTL_SECONDS = 30
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """Check an If-None-Match header against an ETag, using weak comparison."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return etag in (candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates)
+
+
+def conditional_response(etag: str, if_none_match: Optional[str], response: Response) -> Optional[Response]:
+    """
+    Answer a conditional GET from its ETag.
+
+    Args:
+        etag: The ETag of the current data
+        if_none_match: The request's If-None-Match header
+        response: The endpoint's response, which gets the ETag header
+
+    Returns:
+        A 304 response if the client's copy is current, None otherwise
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(etag, if_none_match):
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
 @taproot_assets_api_router.get("/parse-invoice", status_code=HTTPStatus.OK)
 @handle_api_error
 async def api_parse_invoice(
@@ -185,11 +229,52 @@ async def api_parse_invoice(
 @taproot_assets_api_router.get("/listassets", status_code=HTTPStatus.OK)
 @handle_api_error
 async def api_list_assets(
+    response: Response,
     wallet: WalletTypeInfo = Depends(require_admin_key),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
 ):
-    """List all Taproot Assets for the current user with balance information."""
+    """
+    List all Taproot Assets for the current user with balance information.
+
+    The ETag covers the user's and wallet's writes, the asset catalog last
+    sent and an ASSETS_ETAG_TTL_SECONDS time bucket, after which tapd is
+    asked again. A stale listing, served while tapd is failing, gets no
+    ETag and a Warning header.
+    """
+    etag = ChangeCounters.etag(
+        "assets",
+        ChangeCounters.get(wallet.wallet.user),
+        ChangeCounters.get(wallet.wallet.id),
+        AssetStateStore.catalog_seq(),
+        int(time.time() // ASSETS_ETAG_TTL_SECONDS),
+    )
+    not_modified = conditional_response(etag, if_none_match, response)
+    if not_modified:
+        return not_modified
+
     log_debug(API, f"Listing assets for wallet {wallet.wallet.id}")
-    return await AssetService.list_assets(wallet)
+    assets = await AssetService.list_assets(wallet)
+    if assets and assets[0].get("stale"):
+        # Don't let clients keep the stale listing as current once tapd is back
+        del response.headers["ETag"]
+        response.headers["Warning"] = '110 - "Response is Stale"'
+    return assets
+
+
+@taproot_assets_api_router.get("/assets/state", status_code=HTTPStatus.OK)
+@handle_api_error
+async def api_asset_state(
+    wallet: WalletTypeInfo = Depends(require_admin_key),
+):
+    """
+    Get the asset catalog, the user's balances and their sequence numbers.
+
+    Clients call this to find the catalog WebSocket channel, and whenever a
+    catalog or balances delta doesn't follow the last sequence number they
+    applied.
+    """
+    log_debug(API, f"Getting asset state for wallet {wallet.wallet.id}")
+    return await AssetService.get_asset_state(wallet)
 
 
 @taproot_assets_api_router.post("/invoice", status_code=HTTPStatus.CREATED)
@@ -207,32 +292,108 @@ async def api_create_invoice(
 @handle_api_error
 async def api_pay_invoice(
     data: TaprootPaymentRequest,
+    response: Response,
     wallet: WalletTypeInfo = Depends(require_admin_key),
 ):
-    """Pay a Taproot Asset invoice."""
+    """
+    Pay a Taproot Asset invoice.
+
+    With async_payment set, the payment runs in the background and a payment
+    job is returned immediately with status 202. Poll /payments/jobs/{payment_id}
+    or listen on the payments WebSocket channel for the outcome.
+    """
     log_info(API, f"Processing payment request for wallet {wallet.wallet.id}")
+    if data.async_payment:
+        response.status_code = HTTPStatus.ACCEPTED
+        return await PaymentJobService.submit_payment(data, wallet)
     return await PaymentService.process_payment(data, wallet)
 
 
+@taproot_assets_api_router.post("/pay/batch", status_code=HTTPStatus.OK)
+@handle_api_error
+async def api_pay_invoices_batch(
+    data: TaprootBatchPaymentRequest,
+    wallet: WalletTypeInfo = Depends(require_admin_key),
+):
+    """
+    Pay a list of Taproot Asset invoices.
+
+    Payments sharing an asset channel run in parallel up to
+    max_concurrency_per_channel. Returns per-invoice results and totals.
+    """
+    log_info(API, f"Processing batch of {len(data.payment_requests)} payments for wallet {wallet.wallet.id}")
+    return await BatchPaymentService.process_batch(data, wallet)
+
+
+@taproot_assets_api_router.get("/payments/jobs/{payment_id}", status_code=HTTPStatus.OK)
+@handle_api_error
+async def api_get_payment_job(
+    payment_id: str,
+    wallet: WalletTypeInfo = Depends(require_admin_key),
+):
+    """Get the status of a payment submitted with async_payment."""
+    log_debug(API, f"Getting payment job {payment_id} for user {wallet.wallet.user}")
+    job = PaymentJobService.get_job(payment_id, wallet.wallet.user)
+    if not job:
+        raise_http_exception(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail="Payment job not found",
+        )
+    return job
+
 
 @taproot_assets_api_router.get("/payments", status_code=HTTPStatus.OK)
 @handle_api_error
 async def api_list_payments(
+    response: Response,
     wallet: WalletTypeInfo = Depends(require_admin_key),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
 ):
-    """List all Taproot Asset payments for the current user."""
+    """
+    List Taproot Asset payments for the current user, newest first, one page at a time.
+
+    Without cursor and limit, the newest 100 are returned as a bare list,
+    as before pagination.
+    """
+    etag = ChangeCounters.etag("payments", ChangeCounters.get(wallet.wallet.user), cursor, limit)
+    not_modified = conditional_response(etag, if_none_match, response)
+    if not_modified:
+        return not_modified
+
     log_debug(API, f"Listing payments for user {wallet.wallet.user}")
-    return await PaymentService.get_user_payments(wallet.wallet.user)
+    page = await PaymentService.get_user_payments(wallet.wallet.user, limit=limit or 100, cursor=cursor)
+    if cursor is None and limit is None:
+        return page.data
+    return page
 
 
 @taproot_assets_api_router.get("/invoices", status_code=HTTPStatus.OK)
 @handle_api_error
 async def api_list_invoices(
+    response: Response,
     wallet: WalletTypeInfo = Depends(require_admin_key),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
 ):
-    """List all Taproot Asset invoices for the current user."""
+    """
+    List Taproot Asset invoices for the current user, newest first, one page at a time.
+
+    Without cursor and limit, the newest 100 are returned as a bare list,
+    as before pagination.
+    """
+    etag = ChangeCounters.etag("invoices", ChangeCounters.get(wallet.wallet.user), cursor, limit)
+    not_modified = conditional_response(etag, if_none_match, response)
+    if not_modified:
+        return not_modified
+
     log_debug(API, f"Listing invoices for user {wallet.wallet.user}")
-    return await InvoiceService.get_user_invoices(wallet.wallet.user)
+    page = await InvoiceService.get_user_invoices(wallet.wallet.user, limit=limit or 100, cursor=cursor)
+    if cursor is None and limit is None:
+        return page.data
+    return page
 
 
 @taproot_assets_api_router.get("/invoices/{invoice_id}", status_code=HTTPStatus.OK)
@@ -261,9 +422,16 @@ async def api_update_invoice_status(
 @taproot_assets_api_router.get("/asset-balances", status_code=HTTPStatus.OK)
 @handle_api_error
 async def api_get_asset_balances(
+    response: Response,
     wallet: WalletTypeInfo = Depends(require_admin_key),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
 ):
     """Get all asset balances for the current wallet."""
+    etag = ChangeCounters.etag("balances", ChangeCounters.get(wallet.wallet.id))
+    not_modified = conditional_response(etag, if_none_match, response)
+    if not_modified:
+        return not_modified
+
     log_debug(API, f"Getting asset balances for wallet {wallet.wallet.id}")
     return await AssetService.get_asset_balances(wallet)
 
@@ -284,11 +452,145 @@ async def api_get_asset_balance(
 async def api_get_asset_transactions(
     wallet: WalletTypeInfo = Depends(require_admin_key),
     asset_id: Optional[str] = None,
-    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=500),
 ):
-    """Get asset transactions for the current wallet."""
+    """
+    Get asset transactions for the current wallet, newest first, one page at a time.
+
+    limit was accepted before pagination, so only a cursor selects the paged
+    response; pass an empty one for the first page. Otherwise the
+    transactions are returned as a bare list.
+    """
     log_debug(API, f"Getting asset transactions for wallet {wallet.wallet.id}, asset_id={asset_id or 'all'}, limit={limit}")
-    return await AssetService.get_asset_transactions(wallet, asset_id, limit)
+    page = await AssetService.get_asset_transactions(wallet, asset_id, limit, cursor or None)
+    if cursor is None:
+        return page.data
+    return page
+
+
+@taproot_assets_api_router.get("/asset-balance/{asset_id}/as-of", status_code=HTTPStatus.OK)
+@handle_api_error
+async def api_get_asset_balance_as_of(
+    asset_id: str,
+    at: datetime = Query(..., description="Point in time (ISO 8601)"),
+    wallet: WalletTypeInfo = Depends(require_admin_key),
+):
+    """Get the ledger balance of an asset in the current wallet at a point in time."""
+    log_debug(API, f"Getting balance of asset {asset_id} for wallet {wallet.wallet.id} as of {at.isoformat()}")
+    return await BalanceVerificationService.get_balance_as_of(wallet.wallet.id, asset_id, at)
+
+
+@taproot_assets_api_router.post("/verify-balances", status_code=HTTPStatus.OK)
+@handle_api_error
+async def api_verify_balances(
+    wallet: WalletTypeInfo = Depends(require_admin_key),
+):
+    """Check the current wallet's asset balances against the transaction ledger and report any drift."""
+    log_info(API, f"Verifying asset balances for wallet {wallet.wallet.id}")
+    return await BalanceVerificationService.verify_wallet(wallet.wallet.id)
+
+
+@taproot_assets_api_router.get("/asset-history/summary", status_code=HTTPStatus.OK)
+@handle_api_error
+async def api_get_asset_history_summary(
+    wallet: WalletTypeInfo = Depends(require_admin_key),
+    asset_id: Optional[str] = None,
+    start: Optional[date] = Query(None, description="First day of the range (YYYY-MM-DD)"),
+    end: Optional[date] = Query(None, description="Last day of the range (YYYY-MM-DD), defaults to today (UTC)"),
+):
+    """Get per-asset credit/debit totals, counts and fees for the current wallet over a date range."""
+    log_debug(API, f"Getting asset history summary for wallet {wallet.wallet.id}, asset_id={asset_id or 'all'}")
+    return await AssetService.get_history_summary(wallet, start, end, asset_id)
+
+
+@taproot_assets_api_router.get("/asset-history/daily", status_code=HTTPStatus.OK)
+@handle_api_error
+async def api_get_asset_history_daily(
+    wallet: WalletTypeInfo = Depends(require_admin_key),
+    asset_id: Optional[str] = None,
+    start: Optional[date] = Query(None, description="First day of the range (YYYY-MM-DD)"),
+    end: Optional[date] = Query(None, description="Last day of the range (YYYY-MM-DD), defaults to today (UTC)"),
+):
+    """Get daily credit/debit totals, counts and fees for the current wallet over a date range."""
+    log_debug(API, f"Getting daily asset history for wallet {wallet.wallet.id}, asset_id={asset_id or 'all'}")
+    return await AssetService.get_daily_history(wallet, start, end, asset_id)
+
+
+@taproot_assets_api_router.get("/export/{kind}", status_code=HTTPStatus.OK)
+@handle_api_error
+async def api_export(
+    kind: str,
+    wallet: WalletTypeInfo = Depends(require_admin_key),
+    format: str = Query("csv", description="csv or ndjson"),
+    asset_id: Optional[str] = None,
+):
+    """
+    Stream all transactions (for the current wallet), invoices or payments
+    (for the current user), oldest first, as CSV or NDJSON.
+    """
+    if kind not in ExportService.EXPORTS:
+        raise_http_exception(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail=f"Unknown export: {kind}",
+        )
+    if format not in ExportService.FORMATS:
+        raise_http_exception(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Unsupported format: {format}",
+        )
+    return StreamingResponse(
+        ExportService.stream_export(kind, format, wallet.wallet.user, wallet.wallet.id, asset_id),
+        media_type=ExportService.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="taproot-assets-{kind}.{format}"'},
+    )
+
+
+@taproot_assets_api_router.get("/events", status_code=HTTPStatus.OK)
+@handle_api_error
+async def api_event_stream(
+    wallet: WalletTypeInfo = Depends(require_invoice_key),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Stream the user's invoice, payment, balance and catalog events as Server-Sent Events.
+
+    Carries the same messages as the WebSocket channels, for clients that
+    can't keep a WebSocket open. EventSource can't send headers, so pass the
+    invoice key as ?api-key=. Reconnecting clients resume after Last-Event-ID;
+    a "resync" event means some events were missed and data should be refetched.
+    """
+    user_id = wallet.wallet.user
+    log_info(API, f"Opening event stream for user {user_id}")
+    channels = {
+        f"taproot-assets-invoices-{user_id}": "invoices",
+        f"taproot-assets-payments-{user_id}": "payments",
+        f"taproot-assets-balances-{user_id}": "balances",
+        AssetStateStore.CATALOG_CHANNEL: "catalog",
+    }
+    return StreamingResponse(
+        EventStreamService.stream(channels, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@taproot_assets_api_router.get("/stats/invoice-cache", status_code=HTTPStatus.OK)
+@handle_api_error
+async def api_invoice_cache_stats(
+    user: User = Depends(check_admin),
+):
+    """Get hit, miss and size counters of the invoice cache."""
+    return InvoiceCache.stats()
+
+
+@taproot_assets_api_router.get("/stats/rpc", status_code=HTTPStatus.OK)
+@handle_api_error
+async def api_rpc_stats(
+    user: User = Depends(check_admin),
+):
+    """Get the gRPC call metrics per method and the circuit breaker state per backend."""
+    return {"methods": RpcMetrics.stats(), "breakers": CircuitBreaker.stats()}
 
 
 @taproot_assets_api_router.post("/sync-balances", status_code=HTTPStatus.OK)